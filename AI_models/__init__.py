@@ -0,0 +1,39 @@
+"""Bloom AI models
+
+Prompt builders, LLM helpers and the emotion pipeline. Submodules are
+imported on first attribute access so that importing the package does not
+pull in OpenCV, NumPy or TensorFlow.
+"""
+import importlib
+
+_EXPORTS = {
+    "analyze_career_path": "career_path",
+    "build_career_prompt": "career_path",
+    "generate_recommendations": "recommender",
+    "build_recommendation_prompt": "recommender",
+    "generate_profile_summary": "summary",
+    "stream_profile_summary": "summary",
+    "build_profile_summary_prompt": "summary",
+    "score_assessments": "career_scoring",
+    "EmotionClassifier": "emotion_classifier",
+    "FaceDetector": "face_detection",
+    "FaceTracker": "face_detection",
+    "analyze_videos": "session_analysis",
+    "LLMGateway": "llm_gateway",
+    "Task": "llm_gateway",
+    "get_llm_gateway": "llm_gateway",
+    "LLMClient": "llm_client",
+    "LLMError": "llm_client",
+    "get_llm_client": "llm_client",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
@@ -1,23 +1,14 @@
-import base64
-import requests
-import io
-from dotenv import load_dotenv
-import os
-import logging
+# Run from the repository root: python -m AI_models.career_path
+import asyncio
 import json
-import pandas as pd
-
-# Setup logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+import logging
+import os
 
-# Load environment variables
-load_dotenv()
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+from AI_models.career_scoring import CAREERS
+from AI_models.llm_gateway import Task, get_llm_gateway
+from AI_models.utils import as_dict
 
-if not GROQ_API_KEY:
-    raise ValueError("GROQ API KEY is not set in the .env file")
+logger = logging.getLogger(__name__)
 
 '''
 1.) Space Exploration (1-10)
@@ -45,24 +36,8 @@ Additional Information Questions:
 8.) Hobbies
 "What activities do you enjoy doing in your free time?"
 "What do you like to do for fun?" '''
-# json_input = """
-# {
-#   "responses": {
-#     "space_exploration": 10,
-#     "scientific_experiments": 10,
-#     "helping_others": 7.5,
-#     "patience": 2.5,
-#     "creativity": 10,
-#     "empathy": 7.5
-#   },
-#   "additional_info": {
-#     "favorite_subjects": ["Science", "Mathematics"],
-#     "hobbies": ["Building models", "Reading about space"]
-#   }
-# }
-# """
-
-json_input = """
+
+EXAMPLE_ASSESSMENT = """
 {
   "responses": {
     "space_exploration": 10,
@@ -78,51 +53,68 @@ json_input = """
   }
 }
 """
-student_data = json.loads(json_input)
-assessment_df = pd.DataFrame([student_data])
-print(assessment_df)    
-
-def analyze_career_path(assessment_df):
-    student_responses = assessment_df['responses'][0]  # Access the first row of 'responses' column
-    query = (
-        f"Analyze the career assessment responses for the student with ASD. "
-        f"Based on their responses (scale 1-10):\n"
-        f"Space Exploration: {student_responses['space_exploration']}\n"
-        f"Scientific Experiments: {student_responses['scientific_experiments']}\n"
-        f"Helping Others: {student_responses['helping_others']}\n"
-        f"Patience: {student_responses['patience']}\n"
-        f"Creativity: {student_responses['creativity']}\n"
-        f"Empathy: {student_responses['empathy']}\n"
-        f"Additional Information:\n"
-        f"Favorite Subjects: {', '.join(assessment_df['additional_info'][0]['favorite_subjects'])}\n"
-        f"Hobbies: {', '.join(assessment_df['additional_info'][0]['hobbies'])}\n"
-        f"Recommend a Career Path out of the following options:(Astronaut/Scientist/Doctor) based on their responses and ASD considerations\n"
-        f"ONLY respond with the recommended career path and only one. Do not add any explanation."
-    )
-    messages = [
-        {
-            "role": "user",
-            "content": [
-                {"type": "text", "text": query}
-            ]
-        }
-    ]
-
-    # API Request
-    response = requests.post(
-        GROQ_API_URL,
-        json={"model": "llama-3.2-90b-vision-preview", "messages": messages, "max_tokens": 4000},
-        headers={"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"},
-        timeout=30
-    )
-
-    if response.status_code == 200:
-        result = response.json()
-        return result
-
-    else:
-        logger.error(f"API Error: {response.status_code} - {response.text}")
-        return {"error": f"API Error: {response.status_code}"}
-
-recommendation = analyze_career_path(assessment_df)
-print(recommendation["choices"][0]["message"]["content"])
+
+
+# Bump whenever CAREER_TASK's template or choices change: cached
+# recommendations are keyed on it and on the model
+PROMPT_VERSION = 1
+
+# One-word answer from a fixed list: small model, tiny budget, validated choice
+CAREER_TASK = Task(
+    "career_path",
+    "Analyze the career assessment responses for the student with ASD. "
+    "Based on their responses (scale 1-10):\n"
+    "Space Exploration: $space_exploration\n"
+    "Scientific Experiments: $scientific_experiments\n"
+    "Helping Others: $helping_others\n"
+    "Patience: $patience\n"
+    "Creativity: $creativity\n"
+    "Empathy: $empathy\n"
+    "Additional Information:\n"
+    "Favorite Subjects: $favorite_subjects\n"
+    "Hobbies: $hobbies\n"
+    "Recommend a Career Path out of the following options:($careers) based on their responses and ASD considerations\n"
+    "ONLY respond with the recommended career path and only one. Do not add any explanation.",
+    tier="small",
+    max_tokens=10,
+    choices=CAREERS,
+)
+
+
+def career_fields(assessment):
+    """Template fields of CAREER_TASK for an assessment dict or model"""
+    assessment = as_dict(assessment)
+    fields = dict(as_dict(assessment['responses']))
+    additional_info = as_dict(assessment['additional_info'])
+    fields['favorite_subjects'] = ', '.join(additional_info['favorite_subjects'])
+    fields['hobbies'] = ', '.join(additional_info['hobbies'])
+    fields['careers'] = '/'.join(CAREERS)
+    return fields
+
+
+def build_career_prompt(assessment):
+    """Build the career recommendation prompt from an assessment dict or model"""
+    return CAREER_TASK.render(career_fields(assessment))
+
+
+async def analyze_career_path(assessment, gateway=None):
+    """Ask the LLM for a career path, always one of CAREERS; raises LLMError on failure"""
+    gateway = gateway or get_llm_gateway()
+    return await gateway.run(CAREER_TASK, career_fields(assessment))
+
+
+def main():
+    from dotenv import load_dotenv
+
+    logging.basicConfig(level=logging.INFO)
+    load_dotenv()
+    if not os.getenv("GROQ_API_KEY"):
+        raise ValueError("GROQ API KEY is not set in the .env file")
+
+    student_data = json.loads(EXAMPLE_ASSESSMENT)
+    print(student_data)
+    print(asyncio.run(analyze_career_path(student_data)))
+
+
+if __name__ == "__main__":
+    main()
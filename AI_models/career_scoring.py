@@ -0,0 +1,99 @@
+import re
+from collections import namedtuple
+
+import numpy as np
+
+from .utils import as_dict
+
+CAREERS = ["Astronaut", "Scientist", "Doctor"]
+SCORE_FIELDS = [
+    "space_exploration",
+    "scientific_experiments",
+    "helping_others",
+    "patience",
+    "creativity",
+    "empathy",
+]
+
+# Per-career weights over the six centred 1-10 scores, one row per career
+SCORE_WEIGHTS = np.array([
+    # space  science  helping  patience  creativity  empathy
+    [1.0,    0.3,     0.0,     0.2,      0.3,        0.0],  # Astronaut
+    [0.2,    1.0,     0.0,     0.4,      0.4,        0.0],  # Scientist
+    [0.0,    0.3,     1.0,     0.3,      0.0,        0.8],  # Doctor
+], dtype=np.float32)
+
+# Words in favourite subjects and hobbies that point towards a career. Words
+# match whole (or with a plural "s"); a trailing "*" marks a stem matched as a
+# word prefix, so "star" matches "stars" but not "start"
+CAREER_KEYWORDS = [
+    ("space", "planet*", "star", "stargaz*", "astronom*", "rocket*", "astronaut", "physics", "galax*", "moon",
+     "telescope"),
+    ("science", "experiment*", "chemistry", "math*", "lab", "robot*", "coding", "comput*", "build*", "model*"),
+    ("biolog*", "medic*", "health*", "doctor", "anatom*", "help*", "care", "caring", "nurs*", "animal",
+     "first aid"),
+]
+KEYWORD_WEIGHT = 0.6
+MAX_KEYWORD_HITS = 2
+
+CareerScores = namedtuple("CareerScores", ["choices", "margins", "probabilities"])
+
+
+def _keyword_pattern(keyword):
+    if keyword.endswith("*"):
+        return re.compile(rf"\b{re.escape(keyword[:-1])}")
+    return re.compile(rf"\b{re.escape(keyword)}s?\b")
+
+
+_KEYWORD_PATTERNS = [[_keyword_pattern(keyword) for keyword in keywords] for keywords in CAREER_KEYWORDS]
+
+
+def _keyword_hits(items):
+    # Lower-case words separated by single spaces, so patterns only see word boundaries
+    text = " ".join(re.findall(r"[a-z]+", " ".join(items).casefold()))
+    return [
+        min(sum(pattern.search(text) is not None for pattern in patterns), MAX_KEYWORD_HITS)
+        for patterns in _KEYWORD_PATTERNS
+    ]
+
+
+def build_features(assessments):
+    """Return the (N, 6) centred score matrix and the (N, 3) keyword hit matrix"""
+    scores = np.empty((len(assessments), len(SCORE_FIELDS)), dtype=np.float32)
+    hits = np.empty((len(assessments), len(CAREERS)), dtype=np.float32)
+    for i, assessment in enumerate(assessments):
+        data = as_dict(assessment)
+        responses = as_dict(data["responses"])
+        info = as_dict(data["additional_info"])
+        scores[i] = [responses[field] for field in SCORE_FIELDS]
+        hits[i] = _keyword_hits(list(info["favorite_subjects"]) + list(info["hobbies"]))
+    # Map the 1-10 scale onto [-1, 1]
+    scores = (np.clip(scores, 1, 10) - 5.5) / 4.5
+    return scores, hits
+
+
+def score_assessments(assessments):
+    """Score many assessments against the career profiles in one array operation
+
+    Returns the chosen career per assessment, the probability margin between
+    the best and second best career, and the full (N, 3) probability matrix.
+    """
+    if not assessments:
+        return CareerScores([], np.empty(0, dtype=np.float32),
+                            np.empty((0, len(CAREERS)), dtype=np.float32))
+    scores, hits = build_features(assessments)
+    logits = scores @ SCORE_WEIGHTS.T + KEYWORD_WEIGHT * hits / MAX_KEYWORD_HITS
+    logits -= logits.max(axis=1, keepdims=True)
+    probabilities = np.exp(logits)
+    probabilities /= probabilities.sum(axis=1, keepdims=True)
+
+    top2 = np.sort(probabilities, axis=1)[:, -2:]
+    margins = top2[:, 1] - top2[:, 0]
+    choices = [CAREERS[i] for i in probabilities.argmax(axis=1)]
+    return CareerScores(choices, margins, probabilities)
+
+
+def score_assessment(assessment):
+    """Score a single assessment, returning ``(career, margin)``"""
+    result = score_assessments([assessment])
+    return result.choices[0], float(result.margins[0])
@@ -1,54 +1,57 @@
+# Run from the repository root: python -m AI_models.emotion
 import cv2
-from deepface import DeepFace
 
-# Load face cascade classifier
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+from AI_models.emotion_classifier import EmotionClassifier
+from AI_models.face_detection import FaceDetector, FaceTracker
 
-# Start capturing video
-cap = cv2.VideoCapture(0)
 
-while True:
-    # Capture frame-by-frame
-    ret, frame = cap.read()
-    
-    # Flip the frame horizontally
-    frame = cv2.flip(frame, 1)
+def main(source=0):
+    """Show real-time emotion detection for a camera or video file"""
+    # Run the face cascade on a half-resolution copy every 5 frames and track
+    # faces with optical flow in between
+    face_tracker = FaceTracker(FaceDetector(scale=0.5), detect_every=5, redetect_threshold=0.5)
 
-    # Convert frame to grayscale
-    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    # Emotion model is built once and shared by every face in the frame
+    classifier = EmotionClassifier(allowed_emotions=['happy', 'angry', 'neutral'])
 
-    # Convert grayscale frame to RGB format
-    rgb_frame = cv2.cvtColor(gray_frame, cv2.COLOR_GRAY2RGB)
+    # Start capturing video
+    cap = cv2.VideoCapture(source)
 
-    # Detect faces in the frame
-    faces = face_cascade.detectMultiScale(gray_frame, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+    while True:
+        # Capture frame-by-frame
+        ret, frame = cap.read()
+        if not ret:
+            break
 
-    for (x, y, w, h) in faces:
-        # Extract the face ROI (Region of Interest)
-        face_roi = rgb_frame[y:y + h, x:x + w]
+        # Flip the frame horizontally
+        frame = cv2.flip(frame, 1)
 
-        allowed_emotions = ['happy', 'angry', 'neutral']
-        # Analyze with DeepFace
-        result = DeepFace.analyze(face_roi, actions=['emotion'], enforce_detection=False)
-        # Get emotion predictions dictionary
-        emotion_predictions = result[0]['emotion']
-        # Filter out unwanted emotions
-        filtered_emotions = {k: v for k, v in emotion_predictions.items() if k in allowed_emotions}
-        # Determine the dominant emotion among the allowed ones
-        emotion = max(filtered_emotions, key=filtered_emotions.get)
+        # Convert frame to grayscale
+        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
-        # Draw rectangle around face and label with predicted emotion
-        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
-        cv2.putText(frame, emotion, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
+        # Detect or track faces in the frame
+        faces = [track.box for track in face_tracker.update(gray_frame)]
 
-    # Display the resulting frame
-    cv2.imshow('Real-time Emotion Detection', frame)
+        # Extract the face ROIs (Regions of Interest) and classify them in one batch
+        face_rois = [gray_frame[y:y + h, x:x + w] for (x, y, w, h) in faces]
+        batch = classifier.classify(face_rois)
 
-    # Press 'q' to exit
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+        for (x, y, w, h), emotion in zip(faces, batch.labels):
+            # Draw rectangle around face and label with predicted emotion
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
+            cv2.putText(frame, emotion, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
 
-# Release the capture and close all windows
-cap.release()
-cv2.destroyAllWindows()
+        # Display the resulting frame
+        cv2.imshow('Real-time Emotion Detection', frame)
 
+        # Press 'q' to exit
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
+
+    # Release the capture and close all windows
+    cap.release()
+    cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class EmotionWindow:
+    """Fixed-capacity, time-stamped ring buffer of emotion detections
+
+    Per-label counts are maintained incrementally on insert and eviction, so
+    reading the distribution over the last ``window_seconds`` only touches the
+    entries that expired since the previous read.
+    """
+
+    def __init__(self, capacity=600, window_seconds=10.0):
+        self.capacity = int(capacity)
+        self.window_seconds = float(window_seconds)
+        self._times = [0.0] * self.capacity
+        self._labels = [None] * self.capacity
+        self._head = 0
+        self._size = 0
+        self._counts = {}
+        self._lock = threading.Lock()
+        self.last_update = None
+        self.listeners = []
+
+    def __len__(self):
+        with self._lock:
+            return self._size
+
+    def _pop_oldest(self):
+        label = self._labels[self._head]
+        self._labels[self._head] = None
+        remaining = self._counts[label] - 1
+        if remaining:
+            self._counts[label] = remaining
+        else:
+            del self._counts[label]
+        self._head = (self._head + 1) % self.capacity
+        self._size -= 1
+
+    def _expire(self, now):
+        cutoff = now - self.window_seconds
+        while self._size and self._times[self._head] < cutoff:
+            self._pop_oldest()
+
+    def record(self, emotions, now=None):
+        """Add one or more detected emotion labels"""
+        if isinstance(emotions, str):
+            emotions = [emotions]
+        now = time.time() if now is None else now
+        with self._lock:
+            for emotion in emotions:
+                if self._size == self.capacity:
+                    self._pop_oldest()
+                tail = (self._head + self._size) % self.capacity
+                self._times[tail] = now
+                self._labels[tail] = emotion
+                self._size += 1
+                self._counts[emotion] = self._counts.get(emotion, 0) + 1
+            self.last_update = now
+        for listener in self.listeners:
+            listener(self, now)
+
+    def counts(self, now=None):
+        """Return ``(counts, total)`` for detections inside the time window"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._expire(now)
+            return dict(self._counts), self._size
+
+    def most_common(self, now=None):
+        """Return ``(emotion, count, total)`` or ``(None, 0, 0)`` when the window is empty"""
+        counts, total = self.counts(now)
+        if not total:
+            return None, 0, 0
+        emotion = max(counts, key=counts.get)
+        return emotion, counts[emotion], total
+
+    def clear(self):
+        with self._lock:
+            self._labels = [None] * self.capacity
+            self._head = 0
+            self._size = 0
+            self._counts = {}
+
+
+class EmotionFeed:
+    """Change events for one session's EmotionWindow
+
+    An event is emitted only when the dominant emotion changes or its share
+    of the window moves by at least ``delta`` percentage points. The last
+    ``history`` events are kept with increasing ids so a reconnecting client
+    can resume from the id it saw last. Async waiters are woken
+    thread-safely, since detections are recorded on capture threads.
+    """
+
+    def __init__(self, window, delta=10.0, history=64):
+        self.window = window
+        self.delta = float(delta)
+        self._events = deque(maxlen=history)
+        self._next_id = 1
+        self._last = None
+        self._lock = threading.Lock()
+        self._waiters = set()
+        window.listeners.append(self.observe)
+
+    def snapshot(self, now=None):
+        """Return the current dominant emotion, its share and the distribution"""
+        counts, total = self.window.counts(now)
+        if not total:
+            return {"emotion": "neutral", "confidence": 100.0, "total_detections": 0, "distribution": {}}
+        emotion = max(counts, key=counts.get)
+        distribution = {k: (v / total) * 100 for k, v in counts.items()}
+        return {
+            "emotion": emotion,
+            "confidence": distribution[emotion],
+            "total_detections": total,
+            "distribution": distribution,
+        }
+
+    @property
+    def last_id(self):
+        return self._next_id - 1
+
+    def observe(self, window=None, now=None):
+        """Emit an event if the dominant emotion or its confidence moved enough"""
+        with self._lock:
+            data = self.snapshot(now)
+            last = self._last
+            if last is not None and last["emotion"] == data["emotion"] and \
+                    abs(last["confidence"] - data["confidence"]) < self.delta:
+                return None
+            self._last = data
+            event = (self._next_id, data)
+            self._next_id += 1
+            self._events.append(event)
+            waiters = list(self._waiters)
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(waiter.set)
+            except RuntimeError:
+                # The waiter's event loop is already closed
+                pass
+        return event
+
+    def events_after(self, last_id):
+        """Return buffered events newer than ``last_id``, or None if the client must resync
+
+        None covers both events that were dropped from the history and ids
+        this feed never issued, e.g. from before a restart or an eviction.
+        """
+        with self._lock:
+            if last_id > self._next_id - 1:
+                return None
+            if last_id == self._next_id - 1:
+                return []
+            if not self._events or self._events[0][0] > last_id + 1:
+                return None
+            return [event for event in self._events if event[0] > last_id]
+
+    async def wait(self, last_id, timeout):
+        """Wait until an event newer than ``last_id`` exists; False on timeout"""
+        loop = asyncio.get_running_loop()
+        waiter = (loop, asyncio.Event())
+        with self._lock:
+            if self._next_id - 1 > last_id:
+                return True
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+class SessionRegistry:
+    """Per-session EmotionWindow lookup with least-recently-used eviction"""
+
+    def __init__(self, capacity=600, window_seconds=10.0, max_sessions=1000):
+        self.capacity = capacity
+        self.window_seconds = window_seconds
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._feeds = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def get(self, session_id):
+        """Return the aggregator for ``session_id``, creating it on first use"""
+        with self._lock:
+            window = self._sessions.get(session_id)
+            if window is None:
+                window = EmotionWindow(self.capacity, self.window_seconds)
+                self._sessions[session_id] = window
+                while len(self._sessions) > self.max_sessions:
+                    evicted, _ = self._sessions.popitem(last=False)
+                    self._feeds.pop(evicted, None)
+            else:
+                self._sessions.move_to_end(session_id)
+            return window
+
+    def peek(self, session_id):
+        """Return the aggregator for ``session_id`` without creating it"""
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def feed(self, session_id, delta=10.0):
+        """Return the change feed for ``session_id``, creating it on first use"""
+        window = self.get(session_id)
+        with self._lock:
+            feed = self._feeds.get(session_id)
+            if feed is None or feed.window is not window:
+                feed = EmotionFeed(window, delta)
+                self._feeds[session_id] = feed
+            return feed
+
+    def remove(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._feeds.pop(session_id, None)
@@ -0,0 +1,154 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Output order of DeepFace's facial expression model
+EMOTION_LABELS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+ALLOWED_EMOTIONS = ['happy', 'angry', 'neutral']
+MODEL_INPUT_SIZE = (48, 48)
+
+EmotionBatch = namedtuple("EmotionBatch", ["labels", "confidences", "probabilities"])
+
+
+def load_emotion_model():
+    """Build DeepFace's emotion model and return the underlying Keras model"""
+    from deepface import DeepFace
+
+    try:
+        model = DeepFace.build_model(model_name="Emotion", task="facial_attribute")
+    except TypeError:
+        # Older DeepFace releases take the model name only
+        model = DeepFace.build_model("Emotion")
+    return getattr(model, "model", model)
+
+
+def preprocess_faces(face_rois, size=MODEL_INPUT_SIZE, out=None):
+    """Stack face crops into a (N, 48, 48, 1) float32 batch in [0, 1]
+
+    ``out`` may be a preallocated array (for example a shared-memory view)
+    with room for at least N crops; the batch is written into its head.
+    """
+    if out is None:
+        batch = np.empty((len(face_rois), size[1], size[0], 1), dtype=np.float32)
+    else:
+        batch = out[:len(face_rois)]
+    for i, roi in enumerate(face_rois):
+        if roi.ndim == 3:
+            roi = cv2.cvtColor(roi, cv2.COLOR_RGB2GRAY)
+        batch[i, :, :, 0] = cv2.resize(roi, size, interpolation=cv2.INTER_AREA)
+    batch /= 255.0
+    return batch
+
+
+class EmotionClassifier:
+    """Batched facial emotion classifier
+
+    All face crops handed to ``classify`` run through the model in a single
+    forward pass. The dominant allowed emotion is picked with one argmax over
+    the probability matrix instead of a dict comprehension per face. Keras
+    models are not thread-safe, so forward passes from different threads
+    (the camera producer and ingest connections) run one at a time.
+    """
+
+    def __init__(self, allowed_emotions=None, model=None):
+        allowed = allowed_emotions or ALLOWED_EMOTIONS
+        self.allowed_emotions = list(allowed)
+        self._allowed_idx = np.array([EMOTION_LABELS.index(e) for e in self.allowed_emotions])
+        self._model = model
+        self._lock = threading.Lock()
+        self._predict_lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = load_emotion_model()
+        return self._model
+
+    def warm_up(self, batch_size=4):
+        """Load the model and run a dummy batch through it
+
+        Returns the load and first-inference times in seconds so callers can
+        report them.
+        """
+        started = time.perf_counter()
+        self.model
+        loaded = time.perf_counter()
+        dummy = np.zeros((batch_size, MODEL_INPUT_SIZE[1], MODEL_INPUT_SIZE[0], 1), dtype=np.float32)
+        self.predict(dummy)
+        finished = time.perf_counter()
+        return {"emotion_model_load": loaded - started, "emotion_model_warmup": finished - loaded}
+
+    def predict(self, batch):
+        """Return the (N, 7) emotion probability matrix in percent for a preprocessed batch"""
+        if len(batch) == 0:
+            return np.empty((0, len(EMOTION_LABELS)), dtype=np.float32)
+        model = self.model
+        with self._predict_lock:
+            probabilities = model.predict(batch, verbose=0)
+        return np.asarray(probabilities, dtype=np.float32) * 100.0
+
+    def select(self, probabilities):
+        """Pick the dominant allowed emotion for every row of a probability matrix"""
+        filtered = probabilities[:, self._allowed_idx]
+        best = filtered.argmax(axis=1)
+        labels = [self.allowed_emotions[i] for i in best]
+        confidences = filtered[np.arange(len(best)), best]
+        return EmotionBatch(labels, confidences, probabilities)
+
+    def classify(self, face_rois):
+        """Classify a list of face crops with one batched forward pass"""
+        if not face_rois:
+            return EmotionBatch([], np.empty(0, dtype=np.float32),
+                                np.empty((0, len(EMOTION_LABELS)), dtype=np.float32))
+        return self.select(self.predict(preprocess_faces(face_rois)))
+
+
+class EmotionBatcher:
+    """Collect face crops over a short window of frames and classify them together
+
+    ``add`` queues the crops of one frame under a caller supplied key. Once
+    ``max_frames`` frames or ``max_faces`` crops are pending the window is
+    classified in one pass and ``(key, labels, confidences)`` tuples are
+    returned in insertion order; otherwise an empty list is returned.
+    """
+
+    def __init__(self, classifier, max_frames=8, max_faces=64):
+        self.classifier = classifier
+        self.max_frames = max_frames
+        self.max_faces = max_faces
+        self._keys = []
+        self._counts = []
+        self._rois = []
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key, face_rois):
+        self._keys.append(key)
+        self._counts.append(len(face_rois))
+        self._rois.extend(face_rois)
+        if len(self._keys) >= self.max_frames or len(self._rois) >= self.max_faces:
+            return self.flush()
+        return []
+
+    def flush(self):
+        """Classify everything pending and return per-frame results"""
+        if not self._keys:
+            return []
+        batch = self.classifier.classify(self._rois)
+        results = []
+        offset = 0
+        for key, count in zip(self._keys, self._counts):
+            results.append((key, batch.labels[offset:offset + count],
+                            batch.confidences[offset:offset + count]))
+            offset += count
+        self._keys, self._counts, self._rois = [], [], []
+        return results
@@ -0,0 +1,128 @@
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from .emotion_classifier import EmotionClassifier
+from .face_detection import FaceDetector, FaceTracker
+from .metrics import EMOTION_CACHE_LOOKUPS, VIDEO_FACES, VIDEO_STAGE_SECONDS
+
+FaceResult = namedtuple("FaceResult", ["track_id", "box", "emotion", "confidence"])
+
+
+class FaceEmotionCache:
+    """Per-track emotion results reused while the face crop stays the same
+
+    Each crop is reduced to a ``size`` thumbnail; if its mean absolute
+    difference from the thumbnail of the last classified crop of the same
+    track is below ``threshold`` grey levels and that result is younger
+    than ``max_age`` seconds, the previous emotion is reused and the crop
+    skips inference.
+    """
+
+    def __init__(self, threshold=6.0, max_age=1.0, size=(16, 16)):
+        self.threshold = float(threshold)
+        self.max_age = float(max_age)
+        self.size = size
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def signature(self, face_roi):
+        return cv2.resize(face_roi, self.size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def lookup(self, track_id, signature, now):
+        """Return the cached ``(emotion, confidence)`` of a track, or None if it must be reclassified"""
+        entry = self._entries.get(track_id)
+        if entry is not None:
+            cached_signature, emotion, confidence, stored_at = entry
+            if now - stored_at <= self.max_age and \
+                    float(np.abs(signature - cached_signature).mean()) < self.threshold:
+                self.hits += 1
+                EMOTION_CACHE_LOOKUPS.labels("hit").inc()
+                return emotion, confidence
+        self.misses += 1
+        EMOTION_CACHE_LOOKUPS.labels("miss").inc()
+        return None
+
+    def store(self, track_id, signature, emotion, confidence, now):
+        self._entries[track_id] = (signature, emotion, confidence, now)
+
+    def retain(self, track_ids):
+        """Forget tracks that are no longer present"""
+        for track_id in set(self._entries) - set(track_ids):
+            del self._entries[track_id]
+
+    @property
+    def skip_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "skip_rate": self.skip_rate, "tracks": len(self._entries)}
+
+
+class EmotionPipeline:
+    """Face detection/tracking followed by batched emotion classification
+
+    One pipeline holds the tracking state of a single video stream, so each
+    camera or ingesting client gets its own instance. The classifier (and
+    its model) can be shared between pipelines. With a FaceEmotionCache,
+    only faces whose crops changed (or whose result went stale) are
+    classified. A pipeline with a ``source`` name reports its face count
+    under that label; unnamed per-client pipelines leave the gauge alone.
+    """
+
+    def __init__(self, classifier=None, tracker=None, detect_every=5, redetect_threshold=0.5, cache=None,
+                 source=None):
+        self.classifier = classifier or EmotionClassifier()
+        self.tracker = tracker or FaceTracker(
+            FaceDetector(), detect_every=detect_every, redetect_threshold=redetect_threshold
+        )
+        self.cache = cache
+        self._faces_gauge = VIDEO_FACES.labels(source) if source else None
+
+    def analyze(self, gray_frame):
+        """Return a FaceResult for every face in a grayscale frame"""
+        started = time.perf_counter()
+        tracks = self.tracker.update(gray_frame)
+        detected = time.perf_counter()
+        VIDEO_STAGE_SECONDS.labels("detect").observe(detected - started)
+        if self._faces_gauge is not None:
+            self._faces_gauge.set(len(tracks))
+        if self.cache is not None:
+            self.cache.retain([track.id for track in tracks])
+        if not tracks:
+            return []
+        face_rois = [gray_frame[y:y + h, x:x + w] for (x, y, w, h) in (t.box for t in tracks)]
+
+        results = [None] * len(tracks)
+        signatures = [None] * len(tracks)
+        if self.cache is not None:
+            now = time.monotonic()
+            for i, (track, face_roi) in enumerate(zip(tracks, face_rois)):
+                signatures[i] = self.cache.signature(face_roi)
+                cached = self.cache.lookup(track.id, signatures[i], now)
+                if cached is not None:
+                    results[i] = FaceResult(track.id, track.box, *cached)
+
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            batch = self.classifier.classify([face_rois[i] for i in pending])
+            for i, emotion, confidence in zip(pending, batch.labels, batch.confidences):
+                track = tracks[i]
+                results[i] = FaceResult(track.id, track.box, emotion, float(confidence))
+                if self.cache is not None:
+                    self.cache.store(track.id, signatures[i], emotion, float(confidence), now)
+        VIDEO_STAGE_SECONDS.labels("classify").observe(time.perf_counter() - detected)
+        return results
+
+
+def draw_results(frame, results):
+    """Draw a box and emotion label for every face result"""
+    for result in results:
+        x, y, w, h = result.box
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
+        cv2.putText(frame, result.emotion, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
+    return frame
@@ -0,0 +1,231 @@
+import logging
+import os
+import threading
+from itertools import count
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# The repo ships its own copy of the frontal face cascade
+DEFAULT_CASCADE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'haarcascade_frontalface_default.xml')
+
+_cascades = {}
+_cascades_lock = threading.Lock()
+
+
+def load_cascade(path=DEFAULT_CASCADE):
+    """Load a Haar cascade once per process and share it between detectors"""
+    with _cascades_lock:
+        cascade = _cascades.get(path)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(path)
+            if cascade.empty():
+                raise ValueError(f"Could not load face cascade from {path}")
+            _cascades[path] = cascade
+        return cascade
+
+
+class FaceDetector:
+    """Haar cascade face detector working on a downscaled copy of the frame
+
+    Detection runs at ``scale`` times the native resolution (cost falls
+    roughly with the square of the scale) and boxes are mapped back to full
+    resolution so emotion crops keep their detail. With ``detect_width`` the
+    scale is instead picked per frame so detection runs at most that many
+    pixels wide; frames already narrower are never upscaled or shrunk
+    further. When ``regions`` are
+    passed to ``detect``, only those areas, grown by ``roi_margin`` times
+    the box size, are scanned.
+    """
+
+    def __init__(self, cascade_path=DEFAULT_CASCADE, scale_factor=1.1, min_neighbors=5, min_size=(30, 30),
+                 scale=1.0, roi_margin=0.5, detect_width=None):
+        self.cascade = load_cascade(cascade_path)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+        self.scale = min(1.0, max(0.1, float(scale)))
+        self.roi_margin = roi_margin
+        self.detect_width = detect_width
+
+    def scale_for(self, frame_width):
+        """Downscale factor used for a frame ``frame_width`` pixels wide"""
+        if not self.detect_width:
+            return self.scale
+        return min(1.0, max(0.1, self.detect_width / frame_width))
+
+    def _detect_scaled(self, gray_frame, scale, offset_x=0, offset_y=0):
+        image = gray_frame
+        if scale < 1.0:
+            image = cv2.resize(gray_frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        min_size = (max(1, round(self.min_size[0] * scale)), max(1, round(self.min_size[1] * scale)))
+        faces = self.cascade.detectMultiScale(
+            image, scaleFactor=self.scale_factor,
+            minNeighbors=self.min_neighbors, minSize=min_size
+        )
+        return [
+            (round(x / scale) + offset_x, round(y / scale) + offset_y, round(w / scale), round(h / scale))
+            for (x, y, w, h) in faces
+        ]
+
+    def _expand(self, box, frame_w, frame_h):
+        x, y, w, h = box
+        mx, my = round(w * self.roi_margin), round(h * self.roi_margin)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(frame_w, x + w + mx), min(frame_h, y + h + my)
+        return x0, y0, x1, y1
+
+    def detect(self, gray_frame, regions=None):
+        """Return face boxes as a list of (x, y, w, h) tuples in full-resolution coordinates"""
+        frame_h, frame_w = gray_frame.shape[:2]
+        scale = self.scale_for(frame_w)
+        if not regions:
+            return self._detect_scaled(gray_frame, scale)
+
+        boxes = []
+        for region in regions:
+            x0, y0, x1, y1 = self._expand(region, frame_w, frame_h)
+            for box in self._detect_scaled(gray_frame[y0:y1, x0:x1], scale, x0, y0):
+                # Neighbouring regions can overlap and find the same face twice
+                if all(_iou(box, other) < 0.5 for other in boxes):
+                    boxes.append(box)
+        return boxes
+
+
+class Track:
+    """A face box carried between detections"""
+
+    def __init__(self, track_id, box):
+        self.id = track_id
+        self.box = box
+        self.points = None
+        self.initial_points = 0
+        self.confidence = 1.0
+
+
+def _iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+class FaceTracker:
+    """Run the face detector every N frames and track boxes with optical flow in between
+
+    Between detections each face box is moved by the median Lucas-Kanade
+    displacement of corner features found inside it. A track's confidence is
+    the share of its features still tracked; the detector runs again as soon
+    as any track drops below ``redetect_threshold`` or ``detect_every``
+    frames have passed. ``detect_every=1`` detects on every frame.
+    Re-detections only scan the areas around the current tracks, except
+    every ``full_scan_every``-th detection which scans the whole frame to
+    pick up new faces.
+    """
+
+    def __init__(self, detector=None, detect_every=5, redetect_threshold=0.5,
+                 max_corners=30, min_points=4, full_scan_every=3):
+        self.detector = detector or FaceDetector()
+        self.full_scan_every = max(1, int(full_scan_every))
+        self.detect_every = max(1, int(detect_every))
+        self.redetect_threshold = redetect_threshold
+        self.max_corners = max_corners
+        self.min_points = min_points
+        self.tracks = []
+        self._prev_gray = None
+        self._since_detect = 0
+        self._ids = count(1)
+        self.detections = 0
+        self.frames = 0
+
+    def reset(self):
+        self.tracks = []
+        self._prev_gray = None
+        self._since_detect = 0
+
+    def update(self, gray_frame):
+        """Return the current list of tracks for a grayscale frame"""
+        self.frames += 1
+        if self._prev_gray is not None and self._prev_gray.shape != gray_frame.shape:
+            self.reset()
+        if self._needs_detection():
+            self._detect(gray_frame)
+        else:
+            self._track(gray_frame)
+            if self.tracks and min(t.confidence for t in self.tracks) < self.redetect_threshold:
+                self._detect(gray_frame)
+        self._prev_gray = gray_frame
+        return self.tracks
+
+    def _needs_detection(self):
+        return (
+            self._prev_gray is None
+            or not self.tracks
+            or self._since_detect >= self.detect_every - 1
+        )
+
+    def _detect(self, gray_frame):
+        self.detections += 1
+        self._since_detect = 0
+        regions = None
+        if self.tracks and self.detections % self.full_scan_every:
+            regions = [track.box for track in self.tracks]
+        boxes = self.detector.detect(gray_frame, regions)
+
+        # Keep ids stable for faces that overlap an existing track
+        previous = list(self.tracks)
+        tracks = []
+        for box in boxes:
+            best, best_iou = None, 0.3
+            for track in previous:
+                overlap = _iou(box, track.box)
+                if overlap > best_iou:
+                    best, best_iou = track, overlap
+            if best is not None:
+                previous.remove(best)
+                track = best
+                track.box = box
+            else:
+                track = Track(next(self._ids), box)
+            track.confidence = 1.0
+            self._seed_points(track, gray_frame)
+            tracks.append(track)
+        self.tracks = tracks
+
+    def _seed_points(self, track, gray_frame):
+        if self.detect_every == 1:
+            return
+        x, y, w, h = track.box
+        mask = np.zeros_like(gray_frame)
+        mask[y:y + h, x:x + w] = 255
+        points = cv2.goodFeaturesToTrack(gray_frame, self.max_corners, 0.01, 3, mask=mask)
+        track.points = points
+        track.initial_points = 0 if points is None else len(points)
+
+    def _track(self, gray_frame):
+        self._since_detect += 1
+        frame_h, frame_w = gray_frame.shape[:2]
+        for track in self.tracks:
+            if track.points is None or track.initial_points < self.min_points:
+                track.confidence = 0.0
+                continue
+            new_points, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray_frame, track.points, None)
+            if new_points is None:
+                track.confidence = 0.0
+                continue
+            good = status.reshape(-1) == 1
+            if good.sum() < self.min_points:
+                track.confidence = 0.0
+                continue
+            dx, dy = np.median((new_points[good] - track.points[good]).reshape(-1, 2), axis=0)
+            x, y, w, h = track.box
+            x = int(min(max(round(x + dx), 0), frame_w - w))
+            y = int(min(max(round(y + dy), 0), frame_h - h))
+            track.box = (x, y, w, h)
+            track.points = new_points[good].reshape(-1, 1, 2)
+            track.confidence = good.sum() / track.initial_points
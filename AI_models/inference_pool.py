@@ -0,0 +1,361 @@
+import itertools
+import logging
+import multiprocessing as mp
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .emotion_classifier import (
+    EMOTION_LABELS,
+    MODEL_INPUT_SIZE,
+    EmotionClassifier,
+    preprocess_faces,
+)
+
+logger = logging.getLogger(__name__)
+
+INPUT_SHAPE = (MODEL_INPUT_SIZE[1], MODEL_INPUT_SIZE[0], 1)
+
+
+class PoolBusyError(RuntimeError):
+    """Raised when no shared-memory slot frees up in time"""
+
+
+class WorkerCrashedError(RuntimeError):
+    """Raised for jobs that were running on a worker process that died"""
+
+
+class JobTimeoutError(WorkerCrashedError):
+    """Raised for a job that overran its deadline; its worker is restarted"""
+
+
+def _slot_views(shm, max_faces):
+    inputs = np.ndarray((max_faces,) + INPUT_SHAPE, dtype=np.float32, buffer=shm.buf)
+    outputs = np.ndarray(
+        (max_faces, len(EMOTION_LABELS)), dtype=np.float32,
+        buffer=shm.buf, offset=inputs.nbytes,
+    )
+    return inputs, outputs
+
+
+def _serve(worker_id, classifier, views, tasks, results):
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        job_id, slot, count = task
+        try:
+            inputs, outputs = views[slot]
+            outputs[:count] = classifier.predict(inputs[:count])
+            results.put(("done", worker_id, job_id, None))
+        except Exception as e:
+            results.put(("done", worker_id, job_id, repr(e)))
+
+
+def _worker_main(worker_id, slot_names, max_faces, tasks, results):
+    """Worker process: load the emotion model once, then serve jobs from shared memory"""
+    # Attach to this worker's slots; the parent owns and unlinks them
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    views = [_slot_views(shm, max_faces) for shm in slots]
+    try:
+        classifier = EmotionClassifier()
+        classifier.warm_up()
+        results.put(("ready", worker_id, None, None))
+        _serve(worker_id, classifier, views, tasks, results)
+    finally:
+        # Views must be released before the segments can be closed
+        del views
+        for shm in slots:
+            shm.close()
+
+
+class _Worker:
+    def __init__(self, worker_id, slots):
+        self.id = worker_id
+        self.slots = slots
+        self.process = None
+        self.tasks = None
+        self.ready = threading.Event()
+        self.restarts = 0
+
+
+class InferencePool:
+    """Pool of worker processes, each holding its own loaded emotion model
+
+    Every worker owns ``slots_per_worker`` shared-memory slots sized for
+    ``max_faces`` preprocessed crops plus their output probabilities. The
+    parent writes a batch straight into a free slot, sends only
+    ``(job_id, slot, count)`` over the worker's queue and reads the
+    probabilities back from the same slot, so no pixel data is pickled.
+    Free slots double as backpressure: ``submit`` waits up to ``timeout``
+    for one and raises PoolBusyError otherwise. A monitor thread restarts
+    workers that die, and terminates and restarts workers whose oldest job
+    is still running ``job_timeout`` seconds after it was submitted, so a
+    hung worker cannot hold on to its slots. Jobs lost either way are
+    failed and their slots returned.
+    """
+
+    def __init__(self, workers=2, slots_per_worker=2, max_faces=32, start_method="spawn",
+                 job_timeout=30.0):
+        self.num_workers = max(1, int(workers))
+        self.slots_per_worker = max(1, int(slots_per_worker))
+        self.max_faces = int(max_faces)
+        self.job_timeout = float(job_timeout)
+        self._ctx = mp.get_context(start_method)
+        self._shms = []
+        self._views = []
+        self._workers = []
+        self._free = queue.Queue()
+        self._jobs = {}
+        self._job_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._results = None
+        self._threads = []
+        self._started = False
+        self._closing = False
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def started(self):
+        return self._started
+
+    def start(self, timeout=None):
+        """Spawn the workers and wait until their models are loaded"""
+        with self._lock:
+            if self._started:
+                return
+            slot_bytes = self.max_faces * (int(np.prod(INPUT_SHAPE)) + len(EMOTION_LABELS)) * 4
+            self._results = self._ctx.Queue()
+            for worker_id in range(self.num_workers):
+                slots = []
+                for _ in range(self.slots_per_worker):
+                    shm = shared_memory.SharedMemory(create=True, size=slot_bytes)
+                    slot = len(self._shms)
+                    self._shms.append(shm)
+                    self._views.append(_slot_views(shm, self.max_faces))
+                    slots.append(slot)
+                    self._free.put(slot)
+                self._workers.append(_Worker(worker_id, slots))
+            for worker in self._workers:
+                self._spawn(worker)
+            self._started = True
+            self._threads = [
+                threading.Thread(target=self._collect, name="inference-results", daemon=True),
+                threading.Thread(target=self._monitor, name="inference-monitor", daemon=True),
+            ]
+            for thread in self._threads:
+                thread.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker in self._workers:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not worker.ready.wait(remaining):
+                raise TimeoutError("Inference workers did not become ready in time")
+
+    def _spawn(self, worker):
+        worker.ready.clear()
+        worker.tasks = self._ctx.Queue()
+        names = [self._shms[slot].name for slot in worker.slots]
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker.id, names, self.max_faces, worker.tasks, self._results),
+            name=f"emotion-worker-{worker.id}",
+            daemon=True,
+        )
+        worker.process.start()
+
+    def _worker_for_slot(self, slot):
+        return self._workers[slot // self.slots_per_worker]
+
+    def _release(self, slot):
+        self._free.put(slot)
+
+    def _collect(self):
+        while not self._closing:
+            try:
+                kind, worker_id, job_id, error = self._results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            if kind == "ready":
+                self._workers[worker_id].ready.set()
+                continue
+            with self._lock:
+                job = self._jobs.pop(job_id, None)
+            if job is None:
+                continue
+            future, slot, count, _ = job
+            if error is None:
+                probabilities = self._views[slot][1][:count].copy()
+                self.completed += 1
+                future.set_result(probabilities)
+            else:
+                self.failed += 1
+                future.set_exception(RuntimeError(f"Emotion worker failed: {error}"))
+            self._release(slot)
+
+    def _overdue(self, worker, now):
+        with self._lock:
+            return any(deadline <= now for _, slot, _, deadline in self._jobs.values()
+                       if self._worker_for_slot(slot) is worker)
+
+    def _monitor(self):
+        while not self._closing:
+            time.sleep(1.0)
+            for worker in self._workers:
+                if self._closing:
+                    return
+                hung = False
+                if worker.process.is_alive():
+                    if not self._overdue(worker, time.monotonic()):
+                        continue
+                    logger.error(f"Emotion worker {worker.id} overran its job deadline, restarting")
+                    hung = True
+                    # The slots may only be reused once the process can no longer write to them
+                    worker.process.terminate()
+                    worker.process.join(5.0)
+                    if worker.process.is_alive():
+                        worker.process.kill()
+                        worker.process.join()
+                else:
+                    logger.error(f"Emotion worker {worker.id} died (exit code {worker.process.exitcode}), restarting")
+                self._restart(worker, hung)
+
+    def _restart(self, worker, hung):
+        # submit() registers and enqueues jobs under the same lock, so
+        # every job is either failed here or sent to the new queue
+        with self._lock:
+            if self._closing:
+                return
+            lost = [(job_id, job) for job_id, job in self._jobs.items()
+                    if self._worker_for_slot(job[1]) is worker]
+            for job_id, _ in lost:
+                del self._jobs[job_id]
+            worker.restarts += 1
+            self._spawn(worker)
+        now = time.monotonic()
+        for _, (future, slot, _, deadline) in lost:
+            self.failed += 1
+            if hung and deadline <= now:
+                future.set_exception(JobTimeoutError(f"Emotion worker {worker.id} did not finish the job in time"))
+            else:
+                future.set_exception(WorkerCrashedError(f"Emotion worker {worker.id} crashed"))
+            self._release(slot)
+
+    def submit(self, face_rois, timeout=5.0):
+        """Preprocess up to ``max_faces`` crops into a free slot and dispatch them
+
+        Returns a concurrent.futures.Future resolving to the (N, 7)
+        probability matrix in percent, or failing with JobTimeoutError if
+        the worker has not finished it ``job_timeout`` seconds from now.
+        A pool that was not started yet is started here, waiting at most
+        ``timeout`` for its workers.
+        """
+        if not self._started:
+            try:
+                self.start(timeout=timeout)
+            except TimeoutError:
+                raise PoolBusyError("Inference workers are still starting")
+        if len(face_rois) > self.max_faces:
+            raise ValueError(f"At most {self.max_faces} faces per job")
+        try:
+            slot = self._free.get(timeout=timeout)
+        except queue.Empty:
+            raise PoolBusyError("All inference slots are busy")
+
+        future = Future()
+        job_id = next(self._job_ids)
+        try:
+            preprocess_faces(face_rois, out=self._views[slot][0])
+            with self._lock:
+                if self._closing:
+                    raise WorkerCrashedError("Inference pool closed")
+                deadline = time.monotonic() + self.job_timeout
+                self._jobs[job_id] = (future, slot, len(face_rois), deadline)
+                self._worker_for_slot(slot).tasks.put((job_id, slot, len(face_rois)))
+        except Exception:
+            with self._lock:
+                self._jobs.pop(job_id, None)
+            self._release(slot)
+            raise
+        return future
+
+    def predict(self, face_rois, timeout=10.0):
+        """Return the probability matrix for any number of crops, split across workers"""
+        chunks = [face_rois[i:i + self.max_faces] for i in range(0, len(face_rois), self.max_faces)]
+        futures = [self.submit(chunk, timeout=timeout) for chunk in chunks]
+        if not futures:
+            return np.empty((0, len(EMOTION_LABELS)), dtype=np.float32)
+        return np.concatenate([future.result(timeout=timeout) for future in futures])
+
+    def stats(self):
+        return {
+            "workers": self.num_workers,
+            "alive": sum(1 for w in self._workers if w.process is not None and w.process.is_alive()),
+            "restarts": sum(w.restarts for w in self._workers),
+            "free_slots": self._free.qsize(),
+            "in_flight": len(self._jobs),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    def close(self, timeout=5.0):
+        """Stop the workers and release the shared memory
+
+        The pool can be started again afterwards.
+        """
+        with self._lock:
+            if not self._started or self._closing:
+                return
+            self._closing = True
+        for worker in self._workers:
+            try:
+                worker.tasks.put(None)
+            except (OSError, ValueError):
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        # Both threads poll _closing at least every second
+        for thread in self._threads:
+            thread.join()
+        with self._lock:
+            for future, _, _, _ in self._jobs.values():
+                future.set_exception(WorkerCrashedError("Inference pool closed"))
+            self._jobs.clear()
+            self._views = []
+            for shm in self._shms:
+                shm.close()
+                shm.unlink()
+            self._shms = []
+            self._workers = []
+            self._free = queue.Queue()
+            self._results.close()
+            self._results = None
+            self._threads = []
+            self._started = False
+            self._closing = False
+
+
+class PooledEmotionClassifier(EmotionClassifier):
+    """EmotionClassifier that runs its forward passes on an InferencePool"""
+
+    def __init__(self, pool, allowed_emotions=None):
+        super().__init__(allowed_emotions=allowed_emotions)
+        self.pool = pool
+
+    def warm_up(self, batch_size=4, timeout=300.0):
+        started = time.perf_counter()
+        self.pool.start(timeout=timeout)
+        return {"inference_pool_start": time.perf_counter() - started}
+
+    def classify(self, face_rois):
+        if not face_rois:
+            return super().classify(face_rois)
+        return self.select(self.pool.predict(face_rois))
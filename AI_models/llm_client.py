@@ -0,0 +1,311 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+
+import httpx
+
+from .metrics import LLM_ERRORS, LLM_REQUEST_SECONDS, LLM_RETRIES, LLM_TOKENS
+from .rate_limit import RateLimiter
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+DEFAULT_MODEL = "llama-3.2-90b-vision-preview"
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Raised when the LLM API cannot produce a completion"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _record_usage(model, usage):
+    if not usage:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.labels(model, kind[:-len("_tokens")]).inc(usage[kind])
+
+
+def _record_error(model, error):
+    LLM_ERRORS.labels(model, error.status_code or "unknown").inc()
+
+
+class LLMClient:
+    """Async Groq chat-completions client with a shared keep-alive connection pool
+
+    Every call gets an overall deadline covering all of its attempts.
+    Responses with status 429 or 5xx and transport errors are retried with
+    full-jitter exponential backoff, honouring ``Retry-After`` when present.
+    Identical concurrent prompts are coalesced into a single upstream call,
+    and an optional RateLimiter paces attempts by the API's quota headers.
+    ``api_url`` defaults to ``GROQ_API_URL`` so the client can be pointed at
+    a local stub server.
+    """
+
+    def __init__(self, api_url=None, api_key=None, timeout=30.0, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, max_connections=20, http2=None,
+                 coalesce=True, rate_limiter=None):
+        self.api_url = api_url or os.getenv("GROQ_API_URL", DEFAULT_API_URL)
+        self._api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_connections = max_connections
+        self.http2 = _http2_available() if http2 is None else http2
+        self.coalesce = coalesce
+        self.rate_limiter = rate_limiter
+        self._inflight = SingleFlight()
+        self._client = None
+
+    @property
+    def api_key(self):
+        return self._api_key or os.getenv("GROQ_API_KEY")
+
+    def _get_client(self):
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60.0,
+                ),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def chat(self, messages, model=DEFAULT_MODEL, max_tokens=4000, timeout=None, **params):
+        """Send a chat completion request and return the decoded JSON response
+
+        Concurrent calls with an identical payload share one upstream request
+        unless the client was created with ``coalesce=False``.
+        """
+        if not self.api_key:
+            raise LLMError("API key not configured", status_code=500)
+
+        payload = {"model": model, "messages": messages, "max_tokens": max_tokens, **params}
+        if not self.coalesce:
+            return await self._post(payload, timeout)
+        key = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return await self._inflight.do(key, lambda: self._post(payload, timeout))
+
+    @staticmethod
+    def _estimate_prompt_tokens(payload):
+        # Roughly four characters per token; completion tokens are picked up
+        # from the rate-limit headers of the response instead
+        return len(json.dumps(payload["messages"])) // 4
+
+    async def _post(self, payload, timeout=None):
+        model = payload["model"]
+        started = time.perf_counter()
+        try:
+            result = await self._post_with_retries(payload, timeout)
+        except LLMError as e:
+            _record_error(model, e)
+            LLM_REQUEST_SECONDS.labels(model, "chat", "error").observe(time.perf_counter() - started)
+            raise
+        LLM_REQUEST_SECONDS.labels(model, "chat", "ok").observe(time.perf_counter() - started)
+        _record_usage(model, result.get("usage"))
+        return result
+
+    async def _post_with_retries(self, payload, timeout=None):
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        deadline = time.monotonic() + (timeout or self.timeout)
+        client = self._get_client()
+
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LLMError("Deadline exceeded waiting for the LLM API", status_code=504)
+
+            if self.rate_limiter is not None:
+                try:
+                    await asyncio.wait_for(
+                        self.rate_limiter.acquire(self._estimate_prompt_tokens(payload)), remaining
+                    )
+                except asyncio.TimeoutError:
+                    raise LLMError("Deadline exceeded waiting for the LLM rate limit", status_code=429)
+                remaining = deadline - time.monotonic()
+
+            response = None
+            try:
+                response = await client.post(self.api_url, json=payload, headers=headers, timeout=remaining)
+                if self.rate_limiter is not None:
+                    self.rate_limiter.update(response.headers, response.status_code)
+            except httpx.TimeoutException:
+                raise LLMError("Deadline exceeded waiting for the LLM API", status_code=504)
+            except httpx.TransportError as e:
+                logger.error(f"Request error: {e}")
+                if attempt >= self.max_retries:
+                    raise LLMError(f"Error communicating with Groq API: {str(e)}", status_code=500)
+            else:
+                if response.status_code == 200:
+                    try:
+                        return response.json()
+                    except ValueError:
+                        logger.error(f"Malformed response: {response.text[:200]}")
+                        raise LLMError("Malformed response from Groq API", status_code=502)
+                logger.error(f"API Error: {response.status_code} - {response.text}")
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    raise LLMError(f"Groq API error: {response.text}", status_code=response.status_code)
+
+            delay = self._backoff(attempt, response)
+            if time.monotonic() + delay >= deadline:
+                status_code = response.status_code if response is not None else 504
+                raise LLMError("Deadline exceeded while retrying the LLM API", status_code=status_code)
+            reason = response.status_code if response is not None else "transport"
+            LLM_RETRIES.labels(payload["model"], reason).inc()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def stream_chat(self, messages, model=DEFAULT_MODEL, max_tokens=4000, timeout=None, on_usage=None,
+                          **params):
+        """Request a streamed completion and yield content deltas as they arrive
+
+        Retries on 429/5xx only happen before the first token; once text has
+        been yielded a failure is raised as LLMError. ``on_usage`` is called
+        with the token usage if the API reports it at the end of the stream.
+        """
+        if not self.api_key:
+            raise LLMError("API key not configured", status_code=500)
+
+        payload = {"model": model, "messages": messages, "max_tokens": max_tokens, "stream": True, **params}
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        deadline = time.monotonic() + (timeout or self.timeout)
+        client = self._get_client()
+
+        # Stays "cancelled" if the consumer stops reading before the end
+        started = time.perf_counter()
+        outcome = "cancelled"
+        try:
+            attempt = 0
+            while True:
+                # The deadline bounds the wait for the first byte, not the whole stream
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LLMError("Deadline exceeded waiting for the LLM API", status_code=504)
+
+                if self.rate_limiter is not None:
+                    try:
+                        await asyncio.wait_for(
+                            self.rate_limiter.acquire(self._estimate_prompt_tokens(payload)), remaining
+                        )
+                    except asyncio.TimeoutError:
+                        raise LLMError("Deadline exceeded waiting for the LLM rate limit", status_code=429)
+                    remaining = max(deadline - time.monotonic(), 0.001)
+
+                stream_timeout = httpx.Timeout(self.timeout, connect=remaining, pool=remaining)
+                try:
+                    async with client.stream("POST", self.api_url, json=payload, headers=headers,
+                                             timeout=stream_timeout) as response:
+                        if self.rate_limiter is not None:
+                            self.rate_limiter.update(response.headers, response.status_code)
+                        if response.status_code == 200:
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[len("data:"):].strip()
+                                if data == "[DONE]":
+                                    outcome = "ok"
+                                    return
+                                try:
+                                    chunk = json.loads(data)
+                                except ValueError:
+                                    logger.error(f"Malformed stream chunk: {data[:200]}")
+                                    raise LLMError("Malformed streaming response from Groq API", status_code=502)
+                                usage = chunk.get("usage") or chunk.get("x_groq", {}).get("usage")
+                                if usage:
+                                    _record_usage(model, usage)
+                                    if on_usage is not None:
+                                        on_usage(usage)
+                                if not chunk.get("choices"):
+                                    continue
+                                choice = chunk["choices"][0]
+                                if choice.get("finish_reason") == "length":
+                                    logger.warning(f"Streamed completion was cut off at max_tokens={max_tokens}")
+                                delta = choice.get("delta", {}).get("content")
+                                if delta:
+                                    yield delta
+                            outcome = "ok"
+                            return
+                        body = (await response.aread()).decode(errors="replace")
+                        logger.error(f"API Error: {response.status_code} - {body}")
+                        if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                            raise LLMError(f"Groq API error: {body}", status_code=response.status_code)
+                except httpx.TimeoutException:
+                    raise LLMError("Deadline exceeded waiting for the LLM API", status_code=504)
+                except httpx.TransportError as e:
+                    logger.error(f"Request error: {e}")
+                    raise LLMError(f"Error communicating with Groq API: {str(e)}", status_code=500)
+
+                delay = self._backoff(attempt, response)
+                if time.monotonic() + delay >= deadline:
+                    raise LLMError("Deadline exceeded while retrying the LLM API", status_code=response.status_code)
+                LLM_RETRIES.labels(model, response.status_code).inc()
+                await asyncio.sleep(delay)
+                attempt += 1
+        except LLMError as e:
+            outcome = "error"
+            _record_error(model, e)
+            raise
+        finally:
+            LLM_REQUEST_SECONDS.labels(model, "stream", outcome).observe(time.perf_counter() - started)
+
+    async def complete(self, prompt, model=DEFAULT_MODEL, max_tokens=4000, timeout=None, **params):
+        """Send a single user prompt and return the stripped completion text"""
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt}
+                ]
+            }
+        ]
+        result = await self.chat(messages, model=model, max_tokens=max_tokens, timeout=timeout, **params)
+        return result["choices"][0]["message"]["content"].strip()
+
+
+_shared_client = None
+
+
+def get_llm_client():
+    """Return the process-wide LLMClient, paced by GROQ_MAX_RPS and GROQ_BURST"""
+    global _shared_client
+    if _shared_client is None:
+        rate_limiter = RateLimiter(
+            rate=float(os.getenv("GROQ_MAX_RPS", "10")),
+            burst=int(os.getenv("GROQ_BURST", "10")),
+        )
+        _shared_client = LLMClient(rate_limiter=rate_limiter)
+    return _shared_client
@@ -0,0 +1,194 @@
+import logging
+import os
+import re
+import string
+import threading
+
+from .llm_client import DEFAULT_MODEL, LLMError, get_llm_client
+from .metrics import LLM_INVALID_ANSWERS, LLM_TASK_TOKENS
+
+logger = logging.getLogger(__name__)
+
+SMALL_MODEL = "llama-3.1-8b-instant"
+
+
+def model_for_tier(tier):
+    """Resolve a model tier to a Groq model, overridable by GROQ_SMALL_MODEL / GROQ_LARGE_MODEL"""
+    if tier == "small":
+        return os.getenv("GROQ_SMALL_MODEL", SMALL_MODEL)
+    if tier == "large":
+        return os.getenv("GROQ_LARGE_MODEL", DEFAULT_MODEL)
+    raise ValueError(f"Unknown model tier {tier!r}")
+
+
+class InvalidAnswerError(LLMError):
+    """Raised when a constrained task's answer is not one of its choices"""
+
+    def __init__(self, task, answer, choices):
+        super().__init__(f"{task} answered {answer!r}, expected one of {', '.join(choices)}", status_code=502)
+        self.answer = answer
+        self.choices = choices
+
+
+# Lead-ins a model may put before a constrained answer, e.g. "Recommended: Doctor"
+ANSWER_PREFIXES = ("recommended career path", "recommended career", "recommended learning mode", "recommended",
+                   "recommendation", "career path", "career", "learning mode", "answer")
+
+
+def match_choice(text, choices):
+    """Return the choice ``text`` names, or None
+
+    Case, punctuation, a leading article and one known prefix from
+    ANSWER_PREFIXES are ignored; anything else around the choice (such as
+    "not a Doctor") rejects the answer.
+    """
+    cleaned = " ".join(re.sub(r"[^\w\s-]", " ", text).lower().split())
+    for prefix in ANSWER_PREFIXES:
+        if cleaned.startswith(prefix + " "):
+            cleaned = cleaned[len(prefix) + 1:].lstrip("- ")
+            break
+    cleaned = re.sub(r"^(?:a|an|the) ", "", cleaned)
+    for choice in choices:
+        if choice.lower() == cleaned:
+            return choice
+    return None
+
+
+class Task:
+    """One kind of LLM request: its prompt template, model tier and output contract
+
+    ``template`` is compiled once as a ``string.Template`` and filled with
+    ``$name`` fields per call. Tasks with ``choices`` get a deterministic
+    temperature and only ever return one of the choices; other tasks
+    return the stripped completion.
+    """
+
+    def __init__(self, name, template, tier="large", max_tokens=512, choices=None, temperature=None):
+        self.name = name
+        self.template = string.Template(template)
+        self.tier = tier
+        self.max_tokens = max_tokens
+        self.choices = list(choices) if choices else None
+        if temperature is None and self.choices:
+            temperature = 0.0
+        self.temperature = temperature
+
+    @property
+    def model(self):
+        return model_for_tier(self.tier)
+
+    def render(self, fields):
+        return self.template.substitute(fields)
+
+    def messages(self, fields):
+        # Plain string content: every task is text-only
+        return [{"role": "user", "content": self.render(fields)}]
+
+    def params(self):
+        return {} if self.temperature is None else {"temperature": self.temperature}
+
+    def parse(self, text, choices=None):
+        """Validate a completion against the task's (or the call's) choices"""
+        choices = choices or self.choices
+        text = text.strip()
+        if not choices:
+            return text
+        choice = match_choice(text, choices)
+        if choice is None:
+            LLM_INVALID_ANSWERS.labels(self.name).inc()
+            raise InvalidAnswerError(self.name, text, choices)
+        return choice
+
+
+class TaskUsage:
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.invalid = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class LLMGateway:
+    """Runs Tasks on an LLMClient and accounts for tokens per task"""
+
+    def __init__(self, client=None):
+        self.client = client or get_llm_client()
+        self._usage = {}
+        self._lock = threading.Lock()
+
+    def _task_usage(self, task):
+        with self._lock:
+            return self._usage.setdefault(task.name, TaskUsage())
+
+    def _record_usage(self, task, usage):
+        if not usage:
+            return
+        stats = self._task_usage(task)
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        completion_tokens = usage.get("completion_tokens") or 0
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+        LLM_TASK_TOKENS.labels(task.name, "prompt").inc(prompt_tokens)
+        LLM_TASK_TOKENS.labels(task.name, "completion").inc(completion_tokens)
+
+    async def run(self, task, fields, choices=None, timeout=None):
+        """Run ``task`` with template ``fields`` and return its validated answer
+
+        ``choices`` narrows or replaces the task's choices for this call.
+        Raises LLMError, or InvalidAnswerError for an answer outside the
+        choices.
+        """
+        stats = self._task_usage(task)
+        stats.calls += 1
+        try:
+            result = await self.client.chat(
+                task.messages(fields), model=task.model, max_tokens=task.max_tokens,
+                timeout=timeout, **task.params()
+            )
+        except LLMError:
+            stats.failures += 1
+            raise
+        self._record_usage(task, result.get("usage"))
+        choice = result["choices"][0]
+        if choice.get("finish_reason") == "length":
+            logger.warning(f"{task.name} completion was cut off at max_tokens={task.max_tokens}")
+        try:
+            return task.parse(choice["message"]["content"], choices)
+        except InvalidAnswerError as e:
+            stats.invalid += 1
+            logger.error(f"Rejected LLM answer: {e}")
+            raise
+
+    async def stream(self, task, fields, timeout=None):
+        """Yield a free-text task's completion as it is generated"""
+        stats = self._task_usage(task)
+        stats.calls += 1
+        try:
+            async for token in self.client.stream_chat(
+                task.messages(fields), model=task.model, max_tokens=task.max_tokens, timeout=timeout,
+                on_usage=lambda usage: self._record_usage(task, usage), **task.params()
+            ):
+                yield token
+        except LLMError:
+            stats.failures += 1
+            raise
+
+    def usage(self):
+        """Calls, failures, rejected answers and token totals per task name"""
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in self._usage.items()}
+
+
+_shared_gateway = None
+
+
+def get_llm_gateway():
+    """Return the process-wide LLMGateway on top of the shared LLMClient"""
+    global _shared_gateway
+    if _shared_gateway is None:
+        _shared_gateway = LLMGateway()
+    return _shared_gateway
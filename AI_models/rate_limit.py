@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_duration(value):
+    """Parse Groq reset durations such as ``"2m59.56s"`` or ``"120ms"`` into seconds"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _int_header(headers, name):
+    value = headers.get(name)
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    """Token bucket for LLM requests that adapts to the API's rate-limit headers
+
+    Requests are spaced by a local bucket of ``rate`` requests per second
+    with bursts up to ``burst``. After every response the limiter reads
+    Groq's ``x-ratelimit-*`` headers: when the remaining request or token
+    quota would be exhausted it holds new requests until the advertised
+    reset, and a 429 pauses everyone for ``Retry-After`` seconds. A batch
+    therefore runs as fast as the quota allows without a storm of 429s.
+    """
+
+    def __init__(self, rate=10.0, burst=10, clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._remaining_requests = None
+        self._requests_reset_at = 0.0
+        self._remaining_tokens = None
+        self._tokens_reset_at = 0.0
+        self._lock = asyncio.Lock()
+        self.throttled = 0
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def _wait_time(self, now, cost):
+        waits = [0.0]
+        if self._paused_until > now:
+            waits.append(self._paused_until - now)
+        if self._remaining_requests is not None and self._remaining_requests <= 0 and self._requests_reset_at > now:
+            waits.append(self._requests_reset_at - now)
+        if (self._remaining_tokens is not None and cost and self._remaining_tokens < cost
+                and self._tokens_reset_at > now):
+            waits.append(self._tokens_reset_at - now)
+        if self._tokens < 1.0:
+            waits.append((1.0 - self._tokens) / self.rate)
+        return max(waits)
+
+    async def acquire(self, cost=0):
+        """Wait until one request estimated at ``cost`` tokens may be sent"""
+        async with self._lock:
+            while True:
+                now = self._clock()
+                self._refill(now)
+                wait = self._wait_time(now, cost)
+                if wait <= 0:
+                    break
+                self.throttled += 1
+                await asyncio.sleep(wait)
+            self._tokens -= 1.0
+            if self._remaining_requests is not None:
+                self._remaining_requests -= 1
+            if self._remaining_tokens is not None and cost:
+                self._remaining_tokens -= cost
+
+    def update(self, headers, status_code=None):
+        """Adapt to the rate-limit headers of an API response"""
+        now = self._clock()
+        remaining = _int_header(headers, "x-ratelimit-remaining-requests")
+        if remaining is not None:
+            self._remaining_requests = remaining
+            reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+            self._requests_reset_at = now + (reset or 0.0)
+
+        remaining = _int_header(headers, "x-ratelimit-remaining-tokens")
+        if remaining is not None:
+            self._remaining_tokens = remaining
+            reset = parse_duration(headers.get("x-ratelimit-reset-tokens"))
+            self._tokens_reset_at = now + (reset or 0.0)
+
+        if status_code == 429:
+            retry_after = parse_duration(headers.get("retry-after"))
+            pause = retry_after if retry_after is not None else 1.0 / self.rate
+            self._paused_until = max(self._paused_until, now + pause)
+            logger.info(f"Rate limited by the LLM API, pausing requests for {pause:.2f}s")
+
+
+async def run_bounded(fn, items, concurrency=8):
+    """Apply async ``fn`` to ``items`` with at most ``concurrency`` calls in flight
+
+    Yields ``(index, result, error)`` tuples in completion order; ``error``
+    is the raised exception or None.
+    """
+    semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+
+    async def run(index, item):
+        async with semaphore:
+            try:
+                return index, await fn(item), None
+            except Exception as e:
+                return index, None, e
+
+    tasks = [asyncio.ensure_future(run(i, item)) for i, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -1,25 +1,20 @@
-import base64
-import requests
-import io
-from dotenv import load_dotenv
-import os
-import logging
+# Run from the repository root: python -m AI_models.recommender [events.jsonl]
+import argparse
+import asyncio
 import json
-import pandas as pd
-
-# Setup logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+import logging
+import os
+import time
+from collections import deque
 
-# Load environment variables
-load_dotenv()
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+from AI_models.llm_gateway import Task, get_llm_gateway
+from AI_models.rate_limit import run_bounded
+from AI_models.result_cache import TTLCache
+from AI_models.utils import as_dict
 
-if not GROQ_API_KEY:
-    raise ValueError("GROQ API KEY is not set in the .env file")
+logger = logging.getLogger(__name__)
 
-json_input = """
+EXAMPLE_QUIZ_RESULT = """
 {
   "topic": "Fractions",
   "learning_mode_used": "Gamified Learning",
@@ -27,44 +22,272 @@ json_input = """
 }
 """
 
-student_data = json.loads(json_input)
-mistakes_df = pd.DataFrame([student_data], columns=['learning_mode_used', 'topic', 'quiz_results'])
-
-print(mistakes_df)
-
-def generate_recommendations(mistakes_df):
-        
-        query = (   
-            f"You are an AI educational agent analyzing quiz results of a student learning {mistakes_df['topic'][0]} using {mistakes_df['learning_mode_used'][0]}. "
-            f"The student got {mistakes_df['quiz_results'][0]} quiz result in this topic." 
-            f"Based on the student's result, if the result is false,recommend a better learning mode else continue with the same learning mode."
-            f"from the following: Storytelling, Music-Based Learning, or {mistakes_df['learning_mode_used'][0]}. "
-            f"ONLY respond with the recommended learning mode. Do not add any explanation."
-        )
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": query}
-                ]
-            }
-        ]
-
-        # API Request
-        response = requests.post(
-            GROQ_API_URL,
-            json={"model": "llama-3.2-90b-vision-preview", "messages": messages, "max_tokens": 4000},
-            headers={"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"},
-            timeout=30
-        )
-
-        if response.status_code == 200:
-            result = response.json()
-            return result
-
-        else:
-            logger.error(f"API Error: {response.status_code} - {response.text}")
-            return {"error": f"API Error: {response.status_code}"}
-        
-recommendations = generate_recommendations(mistakes_df)
-print(recommendations["choices"][0]["message"]["content"])
+
+ALTERNATIVE_MODES = ["Storytelling", "Music-Based Learning"]
+
+# Picks one mode from a short list: small model, tiny budget, validated choice.
+# The choices depend on the mode in use, so they are passed per call.
+LEARNING_MODE_TASK = Task(
+    "learning_mode",
+    "You are an AI educational agent analyzing quiz results of a student learning $topic using $learning_mode_used. "
+    "The student got $quiz_results quiz result in this topic."
+    "Based on the student's result, if the result is false,recommend a better learning mode else continue with the same learning mode."
+    "from the following: $alternatives, or $learning_mode_used. "
+    "ONLY respond with the recommended learning mode. Do not add any explanation.",
+    tier="small",
+    max_tokens=10,
+)
+
+
+def learning_mode_choices(mode):
+    return ALTERNATIVE_MODES + ([mode] if mode and mode not in ALTERNATIVE_MODES else [])
+
+
+def recommendation_fields(quiz_result):
+    fields = dict(as_dict(quiz_result))
+    fields['alternatives'] = ', '.join(ALTERNATIVE_MODES)
+    return fields
+
+
+def build_recommendation_prompt(quiz_result):
+    """Build the learning-mode prompt from a quiz result dict or model"""
+    return LEARNING_MODE_TASK.render(recommendation_fields(quiz_result))
+
+
+async def generate_recommendations(quiz_result, gateway=None):
+    """Ask the LLM for the next learning mode, always a known mode; raises LLMError on failure"""
+    gateway = gateway or get_llm_gateway()
+    fields = recommendation_fields(quiz_result)
+    return await gateway.run(LEARNING_MODE_TASK, fields, choices=learning_mode_choices(fields['learning_mode_used']))
+
+
+class TopicState:
+    """Running quiz outcomes of one student on one topic
+
+    ``mode`` is the learning mode the games report the student using;
+    ``recommended_mode`` is the latest recommendation, kept separately so
+    further events in the old mode do not overwrite it.
+    """
+
+    def __init__(self, mode, window):
+        self.mode = mode
+        self.recommended_mode = None
+        self.attempts = 0
+        self.passes = 0
+        self.recent = deque(maxlen=window)
+        self.since_evaluation = 0
+        self.pending = False
+        self.evaluations = 0
+        self.updated_at = None
+
+    @property
+    def pass_rate(self):
+        """Pass rate over the recent attempts in the current mode"""
+        return sum(self.recent) / len(self.recent) if self.recent else None
+
+    def record(self, passed, mode, timestamp):
+        if mode and mode != self.mode:
+            # The student switched modes: judge the new mode on its own results
+            self.mode = mode
+            self.recent.clear()
+            self.since_evaluation = 0
+        self.attempts += 1
+        self.passes += bool(passed)
+        self.recent.append(1 if passed else 0)
+        self.since_evaluation += 1
+        self.updated_at = timestamp
+
+    def as_dict(self):
+        return {
+            "mode": self.mode,
+            "recommended_mode": self.recommended_mode,
+            "attempts": self.attempts,
+            "passes": self.passes,
+            "pass_rate": self.pass_rate,
+            "pending": self.pending,
+            "evaluations": self.evaluations,
+            "updated_at": self.updated_at,
+        }
+
+
+class RecommenderService:
+    """Learning-mode recommender fed by a stream of quiz events
+
+    Each event only updates the (student, topic) state in memory. A topic
+    is queued for evaluation once at least ``min_attempts`` quiz results
+    have arrived since its last evaluation and its recent pass rate is
+    below ``pass_threshold``; students doing fine never reach the LLM.
+    Queued topics are evaluated in batches. All students stuck on the same
+    topic and mode share one prompt, so each distinct prompt is sent once
+    per batch, and its answer is cached for ``cache_ttl`` seconds.
+    """
+
+    def __init__(self, gateway=None, min_attempts=3, pass_threshold=0.5, window=5,
+                 batch_size=32, flush_interval=2.0, concurrency=4, cache_ttl=3600.0):
+        self.gateway = gateway
+        self.min_attempts = min_attempts
+        self.pass_threshold = pass_threshold
+        self.window = window
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.concurrency = concurrency
+        self._states = {}
+        self._pending = deque()
+        self._cache = TTLCache(max_size=1024, ttl=cache_ttl)
+        self._wakeup = None
+        self.events = 0
+        self.evaluated = 0
+        self.llm_calls = 0
+
+    def ingest(self, event):
+        """Apply one quiz event; returns True if it queued a re-evaluation"""
+        event = as_dict(event)
+        student_id, topic = str(event["student_id"]), event["topic"]
+        mode = event.get("learning_mode_used")
+        timestamp = event.get("timestamp") or time.time()
+        states = self._states.setdefault(student_id, {})
+        state = states.get(topic)
+        if state is None:
+            state = states[topic] = TopicState(mode, self.window)
+        state.record(event["quiz_results"], mode, timestamp)
+        self.events += 1
+
+        if state.pending or state.since_evaluation < self.min_attempts:
+            return False
+        if state.pass_rate >= self.pass_threshold:
+            return False
+        state.pending = True
+        self._pending.append((student_id, topic))
+        if self._wakeup is not None and len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def ingest_many(self, events):
+        """Apply several events; returns ``(accepted, queued)`` counts"""
+        accepted = queued = 0
+        for event in events:
+            queued += self.ingest(event)
+            accepted += 1
+        return accepted, queued
+
+    def ingest_jsonl(self, lines):
+        """Apply quiz events from JSON lines, skipping blank and malformed ones"""
+        accepted = queued = 0
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                queued += self.ingest(json.loads(line))
+                accepted += 1
+            except (ValueError, KeyError, TypeError) as e:
+                logger.error(f"Skipping quiz event on line {number}: {e}")
+        return accepted, queued
+
+    def students(self):
+        return list(self._states)
+
+    def learning_modes(self, student_id):
+        """Per-topic state of a student, or None if no events were seen"""
+        states = self._states.get(str(student_id))
+        if states is None:
+            return None
+        return {topic: state.as_dict() for topic, state in states.items()}
+
+    async def _recommend(self, key):
+        topic, mode = key
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        self.llm_calls += 1
+        quiz_result = {"topic": topic, "learning_mode_used": mode, "quiz_results": False}
+        recommendation = await generate_recommendations(quiz_result, gateway=self.gateway)
+        self._cache.set(key, recommendation)
+        return recommendation
+
+    async def evaluate_pending(self):
+        """Evaluate up to ``batch_size`` queued topics; returns how many were evaluated"""
+        batch = []
+        while self._pending and len(batch) < self.batch_size:
+            student_id, topic = self._pending.popleft()
+            batch.append((student_id, topic, self._states[student_id][topic]))
+        if not batch:
+            return 0
+
+        groups = {}
+        for student_id, topic, state in batch:
+            groups.setdefault((topic, state.mode), []).append(state)
+        keys = list(groups)
+        async for index, recommendation, error in run_bounded(self._recommend, keys, self.concurrency):
+            topic, mode = keys[index]
+            if error is not None:
+                logger.error(f"Learning mode evaluation failed for {topic!r} in {mode!r}: {error}")
+            for state in groups[keys[index]]:
+                state.pending = False
+                state.since_evaluation = 0
+                state.evaluations += 1
+                if error is None:
+                    state.recommended_mode = recommendation
+        self.evaluated += len(batch)
+        return len(batch)
+
+    async def drain(self):
+        """Evaluate until nothing is queued"""
+        while self._pending:
+            await self.evaluate_pending()
+
+    async def run(self):
+        """Evaluate queued topics every ``flush_interval`` seconds or when a batch fills up"""
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                await self.drain()
+        finally:
+            self._wakeup = None
+
+    def stats(self):
+        return {
+            "students": len(self._states),
+            "events": self.events,
+            "pending": len(self._pending),
+            "evaluated": self.evaluated,
+            "llm_calls": self.llm_calls,
+        }
+
+
+def main():
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Recommend learning modes from quiz results")
+    parser.add_argument("events", nargs="?", help="JSONL file of quiz events; runs the example without it")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    load_dotenv()
+    if not os.getenv("GROQ_API_KEY"):
+        raise ValueError("GROQ API KEY is not set in the .env file")
+
+    if args.events is None:
+        student_data = json.loads(EXAMPLE_QUIZ_RESULT)
+        print(student_data)
+        print(asyncio.run(generate_recommendations(student_data)))
+        return
+
+    async def replay():
+        service = RecommenderService()
+        with open(args.events) as f:
+            service.ingest_jsonl(f)
+        await service.drain()
+        for student_id in service.students():
+            print(json.dumps({"student_id": student_id, "topics": service.learning_modes(student_id)}))
+        logger.info(f"Recommender stats: {service.stats()}")
+
+    asyncio.run(replay())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """LRU cache whose entries also expire ``ttl`` seconds after being stored
+
+    With ``path`` set, entries are written through to a SQLite file and read
+    back on a memory miss, so they survive restarts. Values must be JSON
+    serialisable when a backing store is used. Async callers use ``aget``
+    and ``aset``, which keep SQLite I/O off the event loop.
+    """
+
+    def __init__(self, max_size=1024, ttl=3600.0, path=None):
+        self.max_size = int(max_size)
+        self.ttl = float(ttl)
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self, key, now):
+        row = self._db.execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return _MISSING
+        value, expires_at = row
+        if expires_at <= now:
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._db.commit()
+            return _MISSING
+        value = json.loads(value)
+        self._store(key, value, expires_at)
+        return value
+
+    def _store(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            if self._db is not None:
+                try:
+                    value = self._load(key, now)
+                except sqlite3.Error as e:
+                    logger.error(f"Cache read error: {e}")
+                    value = _MISSING
+                if value is not _MISSING:
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._store(key, value, expires_at)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(value), expires_at),
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Cache write error: {e}")
+
+    async def aget(self, key, default=None):
+        """``get`` for coroutines; SQLite reads run in a worker thread"""
+        if self._db is None:
+            return self.get(key, default)
+        return await asyncio.to_thread(self.get, key, default)
+
+    async def aset(self, key, value, ttl=None):
+        """``set`` for coroutines; the SQLite write and commit run in a worker thread"""
+        if self._db is None:
+            self.set(key, value, ttl)
+            return
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache")
+                self._db.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
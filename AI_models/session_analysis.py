@@ -0,0 +1,264 @@
+# Run from the repository root: python -m AI_models.session_analysis session.mp4 --out-dir timelines
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing as mp
+import os
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from AI_models.emotion_classifier import ALLOWED_EMOTIONS, EmotionBatcher, EmotionClassifier
+from AI_models.face_detection import FaceDetector, FaceTracker
+
+logger = logging.getLogger(__name__)
+
+# Faces are detected on frames at most this wide, the same setting the live server uses
+DEFAULT_DETECT_WIDTH = int(os.getenv("FACE_DETECT_WIDTH", "320"))
+
+# Per-process state, created once by the pool initializer
+_worker = {}
+
+
+def _pyarrow_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def plan_chunks(path, chunk_seconds=60.0):
+    """Split a video into ``(path, start_frame, end_frame, fps)`` chunks of about ``chunk_seconds``"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video {path!r}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if total <= 0:
+        # Unknown length (e.g. some streamed containers): decode it as one chunk
+        return [(path, 0, None, fps)]
+    step = max(1, round(chunk_seconds * fps))
+    return [(path, start, min(start + step, total), fps) for start in range(0, total, step)]
+
+
+def _init_worker(sample_fps, detect_every, detect_width, batch_frames):
+    # One OpenCV thread per process; the pool provides the parallelism
+    cv2.setNumThreads(1)
+    classifier = EmotionClassifier()
+    _worker.update(
+        classifier=classifier,
+        sample_fps=sample_fps,
+        detect_every=detect_every,
+        detect_width=detect_width,
+        batch_frames=batch_frames,
+    )
+
+
+def analyze_chunk(chunk):
+    """Decode one chunk, sample it and return per-second emotion counts
+
+    Frames between samples are grabbed without being decoded. Sampled faces
+    are classified in batches spanning several frames. Returns
+    ``{second: (frames, faces, counts, confidence_sums)}``.
+    """
+    path, start, end, fps = chunk
+    sample_fps = _worker["sample_fps"]
+    tracker = FaceTracker(FaceDetector(detect_width=_worker["detect_width"]), detect_every=_worker["detect_every"])
+    batcher = EmotionBatcher(_worker["classifier"], max_frames=_worker["batch_frames"])
+
+    seconds = defaultdict(lambda: [0, 0, Counter(), Counter()])
+
+    def collect(results):
+        for second, labels, confidences in results:
+            bucket = seconds[second]
+            bucket[1] += len(labels)
+            for label, confidence in zip(labels, confidences):
+                bucket[2][label] += 1
+                bucket[3][label] += float(confidence)
+
+    cap = cv2.VideoCapture(path)
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    interval = fps / sample_fps if sample_fps and sample_fps < fps else 1.0
+    next_sample = float(start)
+    index = start
+    try:
+        while end is None or index < end:
+            if index + 0.5 < next_sample:
+                if not cap.grab():
+                    break
+                index += 1
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            next_sample += interval
+            second = int(index / fps)
+            index += 1
+
+            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            tracks = tracker.update(gray_frame)
+            seconds[second][0] += 1
+            face_rois = [gray_frame[y:y + h, x:x + w] for (x, y, w, h) in (t.box for t in tracks)]
+            collect(batcher.add(second, face_rois))
+        collect(batcher.flush())
+    finally:
+        cap.release()
+    return {second: tuple(bucket) for second, bucket in seconds.items()}
+
+
+def _merge(timeline, partial):
+    for second, (frames, faces, counts, confidences) in partial.items():
+        bucket = timeline[second]
+        bucket[0] += frames
+        bucket[1] += faces
+        bucket[2].update(counts)
+        bucket[3].update(confidences)
+
+
+def build_rows(timeline, emotions=ALLOWED_EMOTIONS):
+    """Flatten merged per-second buckets into timeline rows sorted by time"""
+    rows = []
+    for second in sorted(timeline):
+        frames, faces, counts, confidences = timeline[second]
+        dominant = max(counts, key=counts.get) if counts else None
+        row = {
+            "second": second,
+            "frames": frames,
+            "faces": faces,
+            "dominant": dominant,
+            "confidence": round(confidences[dominant] / counts[dominant], 2) if dominant else None,
+        }
+        for emotion in emotions:
+            row[emotion] = counts.get(emotion, 0)
+        rows.append(row)
+    return rows
+
+
+def summarize_rows(rows, duration, emotions=ALLOWED_EMOTIONS):
+    """Whole-session distribution and how many seconds each emotion dominated"""
+    totals = Counter({emotion: sum(row[emotion] for row in rows) for emotion in emotions})
+    faces = sum(totals.values())
+    seconds_with_faces = [row for row in rows if row["dominant"]]
+    return {
+        "duration_s": duration,
+        "frames_sampled": sum(row["frames"] for row in rows),
+        "faces": faces,
+        "seconds_with_faces": len(seconds_with_faces),
+        "dominant": totals.most_common(1)[0][0] if faces else None,
+        "distribution": {e: (totals[e] / faces) * 100 if faces else 0.0 for e in emotions},
+        "dominant_seconds": dict(Counter(row["dominant"] for row in seconds_with_faces)),
+    }
+
+
+def analyze_videos(paths, sample_fps=2.0, chunk_seconds=60.0, workers=None, detect_every=1,
+                   detect_width=DEFAULT_DETECT_WIDTH, batch_frames=16):
+    """Analyze several recordings on one process pool
+
+    Every video is cut into chunks of ``chunk_seconds`` which are decoded in
+    parallel, so a single long recording uses all workers. Returns
+    ``{path: (rows, summary)}``; every summary also carries the wall time of
+    the whole batch and its speedup over real time.
+    """
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    plans = {path: plan_chunks(path, chunk_seconds) for path in paths}
+    timelines = {path: defaultdict(lambda: [0, 0, Counter(), Counter()]) for path in paths}
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(sample_fps, detect_every, detect_width, batch_frames),
+    ) as pool:
+        futures = {pool.submit(analyze_chunk, chunk): chunk[0] for chunks in plans.values() for chunk in chunks}
+        for done, future in enumerate(as_completed(futures), 1):
+            _merge(timelines[futures[future]], future.result())
+            logger.info(f"Analyzed chunk {done}/{len(futures)}")
+
+    processing_seconds = time.perf_counter() - started
+    results = {}
+    for path, chunks in plans.items():
+        _, _, end, fps = chunks[-1]
+        rows = build_rows(timelines[path])
+        duration = end / fps if end else (rows[-1]["second"] + 1 if rows else 0)
+        results[path] = (rows, summarize_rows(rows, duration))
+    total_duration = sum(summary["duration_s"] for _, summary in results.values())
+    for _, summary in results.values():
+        summary["batch_processing_s"] = processing_seconds
+        summary["batch_speedup"] = total_duration / processing_seconds if processing_seconds else None
+    return results
+
+
+def output_stems(paths):
+    """Map every video path to a unique file name stem for its outputs
+
+    Stems are the video's base name; videos sharing a base name (the same
+    file name in different directories) get a short hash of their absolute
+    path appended so their outputs do not overwrite each other.
+    """
+    stems = {path: os.path.splitext(os.path.basename(path))[0] for path in paths}
+    seen = Counter(stems.values())
+    for path, stem in stems.items():
+        if seen[stem] > 1:
+            digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]
+            stems[path] = f"{stem}-{digest}"
+    return stems
+
+
+def write_timeline(rows, path, fmt="jsonl"):
+    """Write timeline rows as JSON lines or, when pyarrow is installed, Parquet"""
+    if fmt == "parquet":
+        if not _pyarrow_available():
+            raise RuntimeError("Parquet output needs pyarrow; install it or use --format jsonl")
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pq.write_table(pa.Table.from_pylist(rows), path, compression="zstd")
+        return
+    with open(path, "w") as f:
+        for row in rows:
+            f.write(json.dumps(row, separators=(",", ":")) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Turn recorded session videos into per-second emotion timelines")
+    parser.add_argument("videos", nargs="+", help="Video files to analyze")
+    parser.add_argument("--out-dir", default=".", help="Directory for timelines and summaries")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--sample-fps", type=float, default=2.0, help="Frames analyzed per second of video")
+    parser.add_argument("--chunk-seconds", type=float, default=60.0)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, defaults to the CPU count")
+    parser.add_argument("--detect-every", type=int, default=1, help="Run the face cascade every N sampled frames")
+    parser.add_argument("--detect-width", type=int, default=DEFAULT_DETECT_WIDTH,
+                        help="Maximum frame width for face detection, defaults to FACE_DETECT_WIDTH")
+    parser.add_argument("--batch-frames", type=int, default=16, help="Sampled frames per emotion batch")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    os.makedirs(args.out_dir, exist_ok=True)
+    results = analyze_videos(
+        args.videos, sample_fps=args.sample_fps, chunk_seconds=args.chunk_seconds,
+        workers=args.workers, detect_every=args.detect_every, detect_width=args.detect_width,
+        batch_frames=args.batch_frames,
+    )
+    stems = output_stems(results)
+    for path, (rows, summary) in results.items():
+        stem = stems[path]
+        timeline_path = os.path.join(args.out_dir, f"{stem}.timeline.{args.format}")
+        write_timeline(rows, timeline_path, args.format)
+        with open(os.path.join(args.out_dir, f"{stem}.summary.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"{path}: {summary['duration_s']:.0f}s of video, {summary['faces']} faces -> {timeline_path}")
+    if results:
+        summary = next(iter(results.values()))[1]
+        print(f"Processed in {summary['batch_processing_s']:.1f}s ({summary['batch_speedup']:.1f}x real time)")
+
+
+if __name__ == "__main__":
+    main()
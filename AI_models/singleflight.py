@@ -0,0 +1,39 @@
+import asyncio
+
+
+class SingleFlight:
+    """Coalesce concurrent async calls that share a key into one execution
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same task and receive its result or exception.
+    The shared task is shielded, so one caller being cancelled does not
+    cancel the work for the others.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key, fn):
+        """Run ``fn()`` for ``key`` unless an identical call is already in flight"""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            self.started += 1
+
+            def forget(done, key=key):
+                if self._calls.get(key) is done:
+                    del self._calls[key]
+                # Mark the exception retrieved when every waiter was cancelled
+                if not done.cancelled():
+                    done.exception()
+
+            task.add_done_callback(forget)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
@@ -0,0 +1,249 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS emotion_samples (
+    student_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    emotion TEXT NOT NULL,
+    confidence REAL
+);
+CREATE INDEX IF NOT EXISTS emotion_samples_student_ts ON emotion_samples (student_id, ts);
+
+CREATE TABLE IF NOT EXISTS emotion_minutes (
+    student_id TEXT NOT NULL,
+    minute INTEGER NOT NULL,
+    emotion TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    confidence_sum REAL NOT NULL,
+    PRIMARY KEY (student_id, minute, emotion)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS assessments (
+    id INTEGER PRIMARY KEY,
+    student_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    assessment TEXT NOT NULL,
+    recommendation TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assessments_student_ts ON assessments (student_id, ts);
+"""
+
+
+class HistoryStore:
+    """SQLite-backed history of emotion samples and assessment results
+
+    The database runs in WAL mode so readers never wait for the writer.
+    ``record_*`` calls only append to an in-memory queue; a background
+    thread drains it and commits up to ``batch_size`` records per
+    transaction, at least every ``flush_interval`` seconds. Each batch also
+    updates per-minute emotion rollups, so dashboard reads stay small
+    however many raw samples pile up. When the queue is full new records
+    are dropped and counted rather than blocking the caller.
+    """
+
+    def __init__(self, path, batch_size=500, flush_interval=1.0, max_pending=100000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+
+        db = self._connect()
+        db.executescript(SCHEMA)
+        db.commit()
+        db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _reader(self):
+        # One read connection per thread; WAL lets them run alongside the writer
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = self._connect()
+            db.row_factory = sqlite3.Row
+            # Tracked so close() can reach connections opened by other threads
+            with self._readers_lock:
+                self._readers.append(db)
+        return db
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+            self._thread.start()
+
+    def _put(self, record):
+        if self._closed:
+            return False
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def record_emotions(self, student_id, emotions, confidences=None, timestamp=None):
+        """Queue one frame's emotion labels for ``student_id``"""
+        if not emotions:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        if confidences is None:
+            confidences = [None] * len(emotions)
+        samples = [(student_id, timestamp, emotion, None if c is None else float(c))
+                   for emotion, c in zip(emotions, confidences)]
+        self._put(("emotions", samples))
+
+    def record_assessment(self, student_id, assessment, recommendation, timestamp=None):
+        """Queue an assessment and the recommendation given for it"""
+        timestamp = time.time() if timestamp is None else timestamp
+        self._put(("assessment", (student_id, timestamp, json.dumps(assessment), recommendation)))
+
+    def _run(self):
+        db = self._connect()
+        try:
+            while True:
+                try:
+                    batch = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    if self._closed:
+                        return
+                    continue
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = None in batch
+                records = [record for record in batch if record is not None]
+                try:
+                    self._write(db, records)
+                except sqlite3.Error as e:
+                    logger.error(f"History write error: {e}")
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if stop:
+                    return
+        finally:
+            db.close()
+
+    def _write(self, db, records):
+        samples, assessments = [], []
+        for kind, payload in records:
+            if kind == "emotions":
+                samples.extend(payload)
+            else:
+                assessments.append(payload)
+
+        rollups = defaultdict(lambda: [0, 0.0])
+        for student_id, ts, emotion, confidence in samples:
+            rollup = rollups[(student_id, int(ts // 60), emotion)]
+            rollup[0] += 1
+            rollup[1] += confidence or 0.0
+
+        with db:
+            if samples:
+                db.executemany(
+                    "INSERT INTO emotion_samples (student_id, ts, emotion, confidence) VALUES (?, ?, ?, ?)",
+                    samples,
+                )
+                db.executemany(
+                    "INSERT INTO emotion_minutes (student_id, minute, emotion, count, confidence_sum) "
+                    "VALUES (?, ?, ?, ?, ?) ON CONFLICT (student_id, minute, emotion) DO UPDATE SET "
+                    "count = count + excluded.count, confidence_sum = confidence_sum + excluded.confidence_sum",
+                    [key + tuple(value) for key, value in rollups.items()],
+                )
+            if assessments:
+                db.executemany(
+                    "INSERT INTO assessments (student_id, ts, assessment, recommendation) VALUES (?, ?, ?, ?)",
+                    assessments,
+                )
+        self.written += len(samples) + len(assessments)
+        self.batches += 1
+
+    def flush(self):
+        """Block until every queued record has been written"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def emotion_samples(self, student_id, start, end, limit=10000):
+        """Raw samples of ``student_id`` with ``start <= ts < end``, oldest first"""
+        rows = self._reader().execute(
+            "SELECT ts, emotion, confidence FROM emotion_samples "
+            "WHERE student_id = ? AND ts >= ? AND ts < ? ORDER BY ts LIMIT ?",
+            (student_id, start, end, limit),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def emotion_minutes(self, student_id, start, end):
+        """Per-minute emotion counts and mean confidence of ``student_id`` between ``start`` and ``end``"""
+        rows = self._reader().execute(
+            "SELECT minute, emotion, count, confidence_sum FROM emotion_minutes "
+            "WHERE student_id = ? AND minute >= ? AND minute <= ? ORDER BY minute",
+            (student_id, int(start // 60), int(end // 60)),
+        ).fetchall()
+        minutes = {}
+        for row in rows:
+            minute = minutes.setdefault(row["minute"], {"ts": row["minute"] * 60, "counts": {}, "confidence": {}})
+            minute["counts"][row["emotion"]] = row["count"]
+            minute["confidence"][row["emotion"]] = row["confidence_sum"] / row["count"]
+        for minute in minutes.values():
+            minute["total"] = sum(minute["counts"].values())
+            minute["dominant"] = max(minute["counts"], key=minute["counts"].get)
+        return list(minutes.values())
+
+    def assessments(self, student_id, start, end, limit=100):
+        """Stored assessments of ``student_id`` between ``start`` and ``end``, newest first"""
+        rows = self._reader().execute(
+            "SELECT ts, assessment, recommendation FROM assessments "
+            "WHERE student_id = ? AND ts >= ? AND ts < ? ORDER BY ts DESC LIMIT ?",
+            (student_id, start, end, limit),
+        ).fetchall()
+        return [
+            {"ts": row["ts"], "assessment": json.loads(row["assessment"]), "recommendation": row["recommendation"]}
+            for row in rows
+        ]
+
+    def stats(self):
+        return {
+            "pending": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+        }
+
+    def close(self, timeout=10.0):
+        """Write out everything queued and stop the writer"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                logger.error("History queue full at shutdown, some records were not written")
+            self._thread.join(timeout)
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        for db in readers:
+            db.close()
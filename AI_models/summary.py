@@ -1,25 +1,15 @@
-import base64
-import requests
-import io
-from dotenv import load_dotenv
-import os
-import logging
+# Run from the repository root: python -m AI_models.summary
+import asyncio
 import json
-import pandas as pd
-
-# Setup logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+import logging
+import os
 
-# Load environment variables
-load_dotenv()
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+from AI_models.llm_gateway import Task, get_llm_gateway
+from AI_models.utils import as_dict
 
-if not GROQ_API_KEY:
-    raise ValueError("GROQ API KEY is not set in the .env file")
+logger = logging.getLogger(__name__)
 
-json_input = """
+EXAMPLE_PROFILE = """
 {
   "student_name": "Anmol",
   "age": 10,
@@ -37,54 +27,66 @@ json_input = """
 }
 """
 
-student_data = json.loads(json_input)
-profile_df = pd.DataFrame([student_data], columns=['student_name', 'age', 'current_theme', 'total_questions_solved', 
-                                                 'total_modules_completed', 'current_topic', 'learning_mode_used', 
-                                                 'quiz_results', 'average_accuracy', 'favorite_subject', 
-                                                 'time_spent_learning', 'strengths', 'areas_for_improvement'])
-
-print(profile_df)
-
-def generate_profile_summary(profile_df):
-    query = (
-        f"Generate a positive and encouraging profile summary for {profile_df['student_name'][0]}'s parents. "
-        f"{profile_df['student_name'][0]} is {profile_df['age'][0]} years old and is currently exploring the {profile_df['current_theme'][0]} theme. "
-        f"They have solved {profile_df['total_questions_solved'][0]} questions and completed {profile_df['total_modules_completed'][0]} modules. "
-        f"In their current topic of {profile_df['current_topic'][0]}, they are using {profile_df['learning_mode_used'][0]} and have shown {profile_df['average_accuracy'][0]}% accuracy. "
-        f"They spend {profile_df['time_spent_learning'][0]} on learning and particularly enjoy {profile_df['favorite_subject'][0]}. "
-        f"Their key strengths include {', '.join(profile_df['strengths'][0])}. "
-        f"Areas where they can grow include {', '.join(profile_df['areas_for_improvement'][0])}. "
-        f"Please provide:\n"
-        f"1. A positive summary of their progress\n"
-        f"2. Specific achievements to celebrate\n"
-        f"3. 2-3 constructive suggestions for parents to support their child's learning\n"
-        f"4. 1-2 fun learning activities parents can do with their child\n"
-        f"Keep the tone encouraging and focus on growth mindset."
-    )
-    messages = [
-        {
-            "role": "user",
-            "content": [
-                {"type": "text", "text": query}
-            ]
-        }
-    ]
-
-    # API Request
-    response = requests.post(
-        GROQ_API_URL,
-        json={"model": "llama-3.2-90b-vision-preview", "messages": messages, "max_tokens": 4000},
-        headers={"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"},
-        timeout=30
-    )
-
-    if response.status_code == 200:
-        result = response.json()
-        return result
-
-    else:
-        logger.error(f"API Error: {response.status_code} - {response.text}")
-        return {"error": f"API Error: {response.status_code}"}
-
-recommendations = generate_profile_summary(profile_df)
-print(recommendations["choices"][0]["message"]["content"])
+
+# Free-form prose for parents: large model with room for the four sections
+PROFILE_SUMMARY_TASK = Task(
+    "profile_summary",
+    "Generate a positive and encouraging profile summary for ${student_name}'s parents. "
+    "$student_name is $age years old and is currently exploring the $current_theme theme. "
+    "They have solved $total_questions_solved questions and completed $total_modules_completed modules. "
+    "In their current topic of $current_topic, they are using $learning_mode_used and have shown ${average_accuracy}% accuracy. "
+    "They spend $time_spent_learning on learning and particularly enjoy $favorite_subject. "
+    "Their key strengths include $strengths. "
+    "Areas where they can grow include $areas_for_improvement. "
+    "Please provide:\n"
+    "1. A positive summary of their progress\n"
+    "2. Specific achievements to celebrate\n"
+    "3. 2-3 constructive suggestions for parents to support their child's learning\n"
+    "4. 1-2 fun learning activities parents can do with their child\n"
+    "Keep the tone encouraging and focus on growth mindset.",
+    tier="large",
+    max_tokens=4000,
+)
+
+
+def profile_fields(profile):
+    """Template fields of PROFILE_SUMMARY_TASK for a profile dict or model"""
+    fields = dict(as_dict(profile))
+    fields['strengths'] = ', '.join(fields['strengths'])
+    fields['areas_for_improvement'] = ', '.join(fields['areas_for_improvement'])
+    return fields
+
+
+def build_profile_summary_prompt(profile):
+    """Build the parent-facing profile summary prompt from a profile dict or model"""
+    return PROFILE_SUMMARY_TASK.render(profile_fields(profile))
+
+
+async def generate_profile_summary(profile, gateway=None):
+    """Ask the LLM for the full profile summary; raises LLMError on failure"""
+    gateway = gateway or get_llm_gateway()
+    return await gateway.run(PROFILE_SUMMARY_TASK, profile_fields(profile))
+
+
+async def stream_profile_summary(profile, gateway=None):
+    """Yield the profile summary token by token as the LLM produces it"""
+    gateway = gateway or get_llm_gateway()
+    async for token in gateway.stream(PROFILE_SUMMARY_TASK, profile_fields(profile)):
+        yield token
+
+
+def main():
+    from dotenv import load_dotenv
+
+    logging.basicConfig(level=logging.INFO)
+    load_dotenv()
+    if not os.getenv("GROQ_API_KEY"):
+        raise ValueError("GROQ API KEY is not set in the .env file")
+
+    student_data = json.loads(EXAMPLE_PROFILE)
+    print(student_data)
+    print(asyncio.run(generate_profile_summary(student_data)))
+
+
+if __name__ == "__main__":
+    main()
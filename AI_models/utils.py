@@ -0,0 +1,7 @@
+def as_dict(data):
+    """Return plain dict data for either a dict or a pydantic model"""
+    if hasattr(data, "model_dump"):
+        return data.model_dump()
+    if hasattr(data, "dict"):
+        return data.dict()
+    return dict(data)
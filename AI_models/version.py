@@ -1,3 +1,16 @@
-import tensorflow as tf 
+# Run from the repository root: python -m AI_models.version
+from importlib import metadata
 
-print(tf.__version__)
+
+def tensorflow_version():
+    """Return the installed TensorFlow version without importing TensorFlow"""
+    for distribution in ("tensorflow", "tensorflow-cpu", "tensorflow-macos"):
+        try:
+            return metadata.version(distribution)
+        except metadata.PackageNotFoundError:
+            continue
+    return None
+
+
+if __name__ == "__main__":
+    print(tensorflow_version())
@@ -0,0 +1,358 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+
+from .metrics import VIDEO_FPS, VIDEO_FRAMES, VIDEO_STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Width 0 keeps the native resolution
+EncodingProfile = namedtuple("EncodingProfile", ["width", "quality"])
+DEFAULT_PROFILE = EncodingProfile(0, 95)
+MIN_WIDTH = 160
+MIN_QUALITY = 30
+MAX_QUALITY = 95
+# Distinct profiles kept encoded at once; stale ones are pruned beyond this
+MAX_PROFILES = 16
+
+
+def parse_source(value):
+    """Turn a VIDEO_SOURCE setting into a cv2.VideoCapture argument
+
+    Plain integers select a camera index, anything else is treated as a
+    file path or stream URL so the pipeline can be replayed from a recording.
+    """
+    if value is None or value == "":
+        return 0
+    if isinstance(value, int):
+        return value
+    value = str(value).strip()
+    return int(value) if value.isdigit() else value
+
+
+def negotiate_profile(width=None, quality=None, frame_width=None):
+    """Clamp a client's requested width and JPEG quality onto a shared profile
+
+    Widths are rounded to multiples of 16 and qualities to multiples of 5 so
+    that clients asking for similar settings share one encoding. A width at
+    or above ``frame_width`` means the native resolution and maps to 0.
+    Raises ValueError for values that are not numbers.
+    """
+    width = int(width or 0)
+    if frame_width and width >= frame_width:
+        width = 0
+    if width > 0:
+        width = max(MIN_WIDTH, width - width % 16)
+    quality = DEFAULT_PROFILE.quality if quality is None else int(quality)
+    quality = min(MAX_QUALITY, max(MIN_QUALITY, quality - quality % 5))
+    return EncodingProfile(width, quality)
+
+
+class VideoBroadcaster:
+    """Single capture/inference producer shared by every stream subscriber
+
+    The producer thread starts when the first subscriber arrives and stops
+    when the last one leaves. Each captured frame goes through
+    ``process_frame`` exactly once. JPEG encoding happens lazily per
+    EncodingProfile and at most once per frame, so every subscriber on the
+    same profile shares the same bytes. A subscriber that falls behind
+    simply skips to the newest frame instead of queueing old ones.
+    """
+
+    def __init__(self, source=0, process_frame=None, loop=False, jpeg_quality=None):
+        self.source = parse_source(source)
+        self.process_frame = process_frame
+        self.loop = loop
+        self.default_profile = negotiate_profile(quality=jpeg_quality)
+
+        self._cond = threading.Condition()
+        self._subscribers = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self._seq = 0
+        self._latest = None
+        self._running = False
+        self._encoded = {}
+        self._encode_locks = {}
+        self._async_waiters = set()
+        self.encodes = 0
+        self.error = None
+
+    @property
+    def subscriber_count(self):
+        return self._subscribers
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def frame_width(self):
+        """Width of the newest processed frame, or None before the first one"""
+        latest = self._latest
+        return None if latest is None else latest.shape[1]
+
+    def subscribe(self):
+        """Register a subscriber, starting the producer if it is the first"""
+        with self._cond:
+            self._subscribers += 1
+            if self._thread is None or not self._thread.is_alive() or self._stop.is_set():
+                self._start_locked()
+        return Subscription(self)
+
+    def _unsubscribe(self):
+        with self._cond:
+            self._subscribers = max(0, self._subscribers - 1)
+            if self._subscribers == 0:
+                self._stop.set()
+                self._notify_locked()
+
+    def _start_locked(self):
+        # A producer that is still winding down is joined by its successor
+        # before the device is reopened, never while holding the lock
+        previous = self._thread
+        self._stop = threading.Event()
+        self._latest = None
+        self._encoded = {}
+        self._encode_locks = {}
+        self.error = None
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, args=(self._stop, previous), name="video-broadcaster", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop the producer regardless of remaining subscribers"""
+        with self._cond:
+            self._stop.set()
+            self._notify_locked()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _notify_locked(self):
+        self._cond.notify_all()
+        for loop, event in list(self._async_waiters):
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The waiter's event loop is already closed
+                self._async_waiters.discard((loop, event))
+
+    def _run(self, stop, previous=None):
+        if previous is not None and previous.is_alive():
+            previous.join()
+        if stop.is_set():
+            self._finish(stop)
+            return
+
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            logger.error(f"Could not open video source {self.source!r}")
+            self._finish(stop, error=f"Could not open video source {self.source!r}")
+            return
+
+        # Files are paced to their native frame rate, cameras block on read()
+        is_file = isinstance(self.source, str)
+        fps = cap.get(cv2.CAP_PROP_FPS) if is_file else 0
+        frame_interval = 1.0 / fps if fps and fps > 0 else 0
+        logger.info(f"Video broadcaster started on source {self.source!r}")
+        capture_seconds = VIDEO_STAGE_SECONDS.labels("capture")
+        fps_started = time.perf_counter()
+        fps_frames = 0
+
+        try:
+            while not stop.is_set():
+                started = time.perf_counter()
+                ret, frame = cap.read()
+                capture_seconds.observe(time.perf_counter() - started)
+                if not ret:
+                    if is_file and self.loop:
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        continue
+                    break
+
+                if self.process_frame is not None:
+                    try:
+                        frame = self.process_frame(frame)
+                    except Exception as e:
+                        logger.error(f"Error processing frame: {str(e)}")
+
+                with self._cond:
+                    self._seq += 1
+                    self._latest = frame
+                    self._notify_locked()
+
+                VIDEO_FRAMES.inc()
+                fps_frames += 1
+                elapsed = time.perf_counter() - fps_started
+                if elapsed >= 1.0:
+                    VIDEO_FPS.set(fps_frames / elapsed)
+                    fps_started, fps_frames = time.perf_counter(), 0
+
+                if frame_interval:
+                    remaining = frame_interval - (time.perf_counter() - started)
+                    if remaining > 0:
+                        stop.wait(remaining)
+        finally:
+            cap.release()
+            VIDEO_FPS.set(0)
+            self._finish(stop)
+            logger.info("Video broadcaster stopped")
+
+    def _finish(self, stop, error=None):
+        with self._cond:
+            # Only the current producer may flag the stream as stopped
+            if self._stop is stop:
+                self._running = False
+                if error:
+                    self.error = error
+            self._notify_locked()
+
+    def latest(self):
+        """Return ``(seq, frame)`` for the newest processed frame"""
+        with self._cond:
+            return self._seq, self._latest
+
+    def encode(self, seq, frame, profile=None):
+        """Return the JPEG bytes of frame ``seq`` for ``profile``, encoding it at most once
+
+        Profiles at least as wide as the frame share the native encoding.
+        At most MAX_PROFILES profiles are cached; when full, the ones that
+        were not encoded for this frame are dropped, and if all of them
+        were, the new profile is encoded without being cached.
+        """
+        profile = profile or self.default_profile
+        if profile.width >= frame.shape[1]:
+            profile = profile._replace(width=0)
+        cached = self._encoded.get(profile)
+        if cached is not None and cached[0] == seq:
+            return cached[1]
+
+        with self._cond:
+            lock = self._encode_locks.get(profile)
+            if lock is None:
+                if len(self._encode_locks) >= MAX_PROFILES:
+                    self._prune_profiles_locked(seq)
+                lock = threading.Lock()
+                if len(self._encode_locks) < MAX_PROFILES:
+                    self._encode_locks[profile] = lock
+        with lock:
+            cached = self._encoded.get(profile)
+            if cached is not None and cached[0] >= seq:
+                return cached[1]
+            started = time.perf_counter()
+            image = frame
+            if profile.width and profile.width < frame.shape[1]:
+                height = round(frame.shape[0] * profile.width / frame.shape[1])
+                image = cv2.resize(frame, (profile.width, height), interpolation=cv2.INTER_AREA)
+            ok, buffer = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), profile.quality])
+            VIDEO_STAGE_SECONDS.labels("encode").observe(time.perf_counter() - started)
+            if not ok:
+                return None
+            frame_bytes = buffer.tobytes()
+            if self._encode_locks.get(profile) is lock:
+                self._encoded[profile] = (seq, frame_bytes)
+            self.encodes += 1
+            return frame_bytes
+
+    def _prune_profiles_locked(self, seq):
+        for profile in list(self._encode_locks):
+            cached = self._encoded.get(profile)
+            if cached is None or cached[0] < seq:
+                self._encode_locks.pop(profile, None)
+                self._encoded.pop(profile, None)
+
+    async def wait_for_frame_async(self, last_seq, timeout=1.0):
+        """Wait until a frame newer than ``last_seq`` is available
+
+        Returns ``(seq, frame)``, ``(last_seq, None)`` on timeout, or
+        ``None`` once the producer has stopped. Waiting does not occupy a
+        thread; the producer wakes waiters through their event loops.
+        """
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = (loop, event)
+        with self._cond:
+            self._async_waiters.add(waiter)
+        try:
+            deadline = loop.time() + timeout
+            while True:
+                with self._cond:
+                    if self._seq > last_seq and self._latest is not None:
+                        return self._seq, self._latest
+                    if not self._running:
+                        return None
+                    event.clear()
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return last_seq, None
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+
+
+class Subscription:
+    """Handle returned by VideoBroadcaster.subscribe()"""
+
+    def __init__(self, broadcaster):
+        self.broadcaster = broadcaster
+        self.last_seq = 0
+        self.closed = False
+
+    async def next_frame_async(self, timeout=None, profile=None):
+        """Return the newest unseen frame as JPEG bytes
+
+        Returns None when the stream ended, the subscription was closed or
+        ``timeout`` seconds passed without a new frame. Encoding runs in a
+        worker thread.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while not self.closed:
+            wait = 1.0
+            if deadline is not None:
+                wait = min(wait, deadline - loop.time())
+                if wait <= 0:
+                    return None
+            result = await self.broadcaster.wait_for_frame_async(self.last_seq, wait)
+            if result is None:
+                return None
+            seq, frame = result
+            if frame is not None:
+                self.last_seq = seq
+                frame_bytes = await asyncio.to_thread(self.broadcaster.encode, seq, frame, profile)
+                if frame_bytes is not None:
+                    return frame_bytes
+        return None
+
+    async def aframes(self, profile=None):
+        """Async iterator over frames until the producer stops or the subscription closes"""
+        try:
+            while True:
+                frame_bytes = await self.next_frame_async(profile=profile)
+                if frame_bytes is None:
+                    return
+                yield frame_bytes
+        finally:
+            self.close()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.broadcaster._unsubscribe()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,5 @@
+"""Offline benchmarks for the video pipeline and the LLM-backed endpoints
+
+Every benchmark writes its results as JSON tagged with the current commit
+so runs can be compared across changes.
+"""
@@ -0,0 +1,205 @@
+# Run from the repository root: python -m benchmarks.assess_load --requests 200 --concurrency 20
+import argparse
+import asyncio
+import importlib
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks.common import run_metadata, summarize, write_results
+
+ENDPOINTS = ["assess", "batch", "summary"]
+SUBJECTS = ["Science", "Mathematics", "Art", "Music", "Biology", "Geography", "History", "Reading"]
+HOBBIES = ["Stargazing", "Drawing", "Building models", "Reading", "Gardening", "Swimming", "Puzzles"]
+
+
+def random_assessment(rng):
+    scores = ["space_exploration", "scientific_experiments", "helping_others", "patience", "creativity", "empathy"]
+    return {
+        "responses": {field: float(rng.randint(1, 10)) for field in scores},
+        "additional_info": {
+            "favorite_subjects": rng.sample(SUBJECTS, 2),
+            "hobbies": rng.sample(HOBBIES, 2),
+        },
+    }
+
+
+def random_profile(rng):
+    return {
+        "student_name": f"Student {rng.randint(1, 10 ** 6)}",
+        "age": rng.randint(7, 16),
+        "current_theme": rng.choice(["Astronaut", "Scientist", "Doctor"]),
+        "total_questions_solved": rng.randint(0, 500),
+        "total_modules_completed": rng.randint(0, 20),
+        "current_topic": rng.choice(["Fractions", "Planets", "Plants", "Decimals"]),
+        "learning_mode_used": rng.choice(["Gamified Learning", "Storytelling", "Music-Based Learning"]),
+        "quiz_results": rng.random() < 0.5,
+        "average_accuracy": round(rng.uniform(30, 100), 1),
+        "favorite_subject": rng.choice(SUBJECTS),
+        "time_spent_learning": f"{rng.randint(1, 3)} hours daily",
+        "strengths": rng.sample(["Problem Solving", "Quick Learning", "Memory", "Curiosity"], 2),
+        "areas_for_improvement": rng.sample(["Time Management", "Attention to Detail", "Reading Speed"], 2),
+    }
+
+
+def build_request(endpoint, rng, batch_size):
+    if endpoint == "assess":
+        return "POST", "/assess", random_assessment(rng)
+    if endpoint == "batch":
+        return "POST", "/assess/batch", [random_assessment(rng) for _ in range(batch_size)]
+    return "POST", "/profile_summary", random_profile(rng)
+
+
+async def timed_request(client, method, path, body):
+    """Return ``(status, time to first byte, total time)`` for one request"""
+    started = time.perf_counter()
+    first_byte = None
+    try:
+        async with client.stream(method, path, json=body) as response:
+            async for _ in response.aiter_bytes():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - started
+            status = response.status_code
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    total = time.perf_counter() - started
+    return status, first_byte if first_byte is not None else total, total
+
+
+async def drive(client, endpoint, requests, concurrency, rng, batch_size):
+    """Send ``requests`` requests to one endpoint with at most ``concurrency`` in flight"""
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(build_request(endpoint, rng, batch_size))
+
+    statuses = Counter()
+    latencies, first_bytes = [], []
+
+    async def worker():
+        while True:
+            try:
+                method, path, body = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            status, first_byte, total = await timed_request(client, method, path, body)
+            statuses[str(status)] += 1
+            if status == 200:
+                latencies.append(total)
+                first_bytes.append(first_byte)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "elapsed_s": elapsed,
+        "throughput_rps": requests / elapsed if elapsed else 0.0,
+        "statuses": dict(statuses),
+        "latency_ms": summarize(latencies),
+        "first_byte_ms": summarize(first_bytes),
+    }
+
+
+def start_mock_llm(port, args):
+    command = [
+        sys.executable, "-m", "benchmarks.mock_llm", "--port", str(port),
+        "--latency", str(args.llm_latency), "--jitter", str(args.llm_jitter),
+        "--error-rate", str(args.llm_error_rate), "--token-delay", str(args.llm_token_delay),
+    ]
+    if args.seed is not None:
+        command += ["--seed", str(args.seed)]
+    process = subprocess.Popen(command)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("Mock LLM server exited during startup")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/stats", timeout=1.0)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("Mock LLM server did not start in time")
+
+
+async def run(args, llm_url, history_dir=None):
+    server = None
+    if args.target:
+        transport = None
+        base_url = args.target
+    else:
+        # Configure the app before importing it; settings are read at import time
+        os.environ["GROQ_API_URL"] = llm_url
+        os.environ.setdefault("GROQ_API_KEY", "benchmark")
+        os.environ["CAREER_SCORING_MODE"] = args.scoring_mode
+        os.environ["GROQ_MAX_RPS"] = str(args.max_rps)
+        os.environ["GROQ_BURST"] = str(max(1, int(args.max_rps)))
+        if not args.cache:
+            os.environ["ASSESS_CACHE_SIZE"] = "0"
+        # Keep the benchmark's assessment history out of the working directory
+        os.environ["HISTORY_DB_PATH"] = os.path.join(history_dir, "history.db")
+        server = importlib.import_module("update_server")
+        transport = httpx.ASGITransport(app=server.app)
+        base_url = "http://benchmark"
+
+    rng = random.Random(args.seed)
+    results = {}
+    limits = httpx.Limits(max_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=timeout) as client:
+        for endpoint in args.endpoints:
+            results[endpoint] = await drive(client, endpoint, args.requests, args.concurrency, rng, args.batch_size)
+    if server is not None:
+        await server.llm_client.aclose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /assess and friends against a mock LLM")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=["assess"])
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=10, help="Assessments per /assess/batch request")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--target", help="Base URL of a running server; by default the app runs in-process")
+    parser.add_argument("--llm-port", type=int, default=8100)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-jitter", type=float, default=0.1)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of LLM calls answered with 429")
+    parser.add_argument("--llm-token-delay", type=float, default=0.0)
+    parser.add_argument("--scoring-mode", default="llm", choices=["hybrid", "local", "llm"])
+    parser.add_argument("--max-rps", type=float, default=1000.0, help="Client-side LLM rate limit")
+    parser.add_argument("--cache", action="store_true", help="Keep the assessment result cache enabled")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    llm_url = f"http://127.0.0.1:{args.llm_port}/openai/v1/chat/completions"
+    mock = None if args.target else start_mock_llm(args.llm_port, args)
+    history_dir = tempfile.TemporaryDirectory(prefix="bloom-bench-")
+    try:
+        endpoints = asyncio.run(run(args, llm_url, history_dir.name))
+        llm_stats = None
+        if mock is not None:
+            llm_stats = httpx.get(f"http://127.0.0.1:{args.llm_port}/stats").json()
+    finally:
+        if mock is not None:
+            mock.terminate()
+            mock.wait(10)
+        history_dir.cleanup()
+
+    params = {k: v for k, v in vars(args).items() if k != "output"}
+    results = run_metadata("assess_load", **params)
+    results["endpoints"] = endpoints
+    results["mock_llm"] = llm_stats
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def summarize(samples, scale=1000.0):
+    """Count, mean and p50/p95/p99/max of ``samples`` (seconds, reported in ms)"""
+    if not len(samples):
+        return {"count": 0}
+    values = np.asarray(samples, dtype=np.float64) * scale
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": int(values.size),
+        "mean": float(values.mean()),
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+        "max": float(values.max()),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(name, **params):
+    return {
+        "benchmark": name,
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": params,
+    }
+
+
+def write_results(results, path=None):
+    """Write results as JSON to ``path``, or to stdout when no path is given"""
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if path:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
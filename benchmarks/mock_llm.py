@@ -0,0 +1,114 @@
+# Run from the repository root: python -m benchmarks.mock_llm --port 8100 --latency 0.8 --error-rate 0.05
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_REPLY = "Scientist"
+
+
+def create_app(latency=0.5, jitter=0.1, error_rate=0.0, retry_after=0.1,
+               token_delay=0.0, reply=DEFAULT_REPLY, seed=None):
+    """Build a stand-in for Groq's chat-completions API
+
+    Every request sleeps ``latency`` +/- ``jitter`` seconds before answering.
+    A ``error_rate`` fraction of requests is rejected with 429 and a
+    ``Retry-After`` of ``retry_after`` seconds. Streamed responses send the
+    reply word by word, ``token_delay`` seconds apart.
+    """
+    app = FastAPI(title="Mock LLM API")
+    rng = random.Random(seed)
+    stats = {"requests": 0, "throttled": 0, "completed": 0, "streamed": 0}
+
+    def usage(payload):
+        prompt_tokens = len(json.dumps(payload.get("messages", []))) // 4
+        completion_tokens = max(1, len(reply) // 4)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        stats["requests"] += 1
+        await asyncio.sleep(max(0.0, latency + rng.uniform(-jitter, jitter)))
+
+        if rng.random() < error_rate:
+            stats["throttled"] += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                headers={"retry-after": str(retry_after)},
+            )
+
+        model = payload.get("model", "mock")
+        if payload.get("stream"):
+            stats["streamed"] += 1
+
+            async def chunks():
+                words = reply.split(" ")
+                for i, word in enumerate(words):
+                    delta = {"content": word if i == 0 else " " + word}
+                    yield "data: " + json.dumps({"model": model, "choices": [{"index": 0, "delta": delta}]}) + "\n\n"
+                    if token_delay:
+                        await asyncio.sleep(token_delay)
+                final = {"model": model, "choices": [], "x_groq": {"usage": usage(payload)}}
+                yield "data: " + json.dumps(final) + "\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(chunks(), media_type="text/event-stream")
+
+        stats["completed"] += 1
+        return {
+            "id": f"mock-{stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop",
+            }],
+            "usage": usage(payload),
+        }
+
+    app.add_api_route("/openai/v1/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/v1/chat/completions", chat_completions, methods=["POST"])
+
+    @app.get("/stats")
+    def get_stats():
+        return stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a mock Groq chat-completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds before each response")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Uniform +/- jitter on the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=0.1)
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed words")
+    parser.add_argument("--reply", default=DEFAULT_REPLY)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    app = create_app(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        retry_after=args.retry_after, token_delay=args.token_delay,
+        reply=args.reply, seed=args.seed,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
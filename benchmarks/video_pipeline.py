@@ -0,0 +1,160 @@
+# Run from the repository root: python -m benchmarks.video_pipeline --video clip.mp4
+import argparse
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+from AI_models.emotion_classifier import EMOTION_LABELS, EmotionBatch, EmotionClassifier
+from AI_models.emotion_pipeline import EmotionPipeline, FaceEmotionCache, draw_results
+from AI_models.face_detection import FaceDetector, FaceTracker
+from AI_models.video_stream import VideoBroadcaster, negotiate_profile
+from benchmarks.common import run_metadata, summarize, write_results
+
+STAGES = ["capture", "flip_convert", "detect", "classify", "annotate", "encode"]
+
+
+class _TimedTracker:
+    """Wraps a FaceTracker to time the detection stage inside EmotionPipeline.analyze"""
+
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self.last_seconds = 0.0
+
+    def update(self, gray_frame):
+        started = time.perf_counter()
+        tracks = self.tracker.update(gray_frame)
+        self.last_seconds = time.perf_counter() - started
+        return tracks
+
+
+class _NoEmotion:
+    """Classifier answering "neutral" without a model, to time the other stages on their own"""
+
+    def classify(self, face_rois):
+        probabilities = np.zeros((len(face_rois), len(EMOTION_LABELS)), dtype=np.float32)
+        return EmotionBatch(["neutral"] * len(face_rois), np.full(len(face_rois), 100.0, dtype=np.float32),
+                            probabilities)
+
+
+def replay(video, classifier=None, max_frames=None, warmup_frames=10, detect_every=5,
+           redetect_threshold=0.5, detect_width=320, roi_margin=0.5, full_scan_every=3,
+           cache_threshold=6.0, cache_max_age=1.0, width=0, quality=95):
+    """Push every frame of ``video`` through the server's per-frame stages
+
+    Frames go through the same EmotionPipeline (tracker, FaceEmotionCache
+    and classifier) as ``annotate_frame``, then the broadcaster's JPEG
+    encode, each stage timed one by one. The first ``warmup_frames`` frames
+    are processed but left out of the statistics. ``classifier=None`` skips
+    emotion inference so detection and encoding can be measured on their
+    own; ``cache_max_age=0`` disables the emotion cache.
+    """
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise SystemExit(f"Could not open video {video!r}")
+
+    detector = FaceDetector(detect_width=detect_width, roi_margin=roi_margin)
+    tracker = FaceTracker(detector, detect_every=detect_every, redetect_threshold=redetect_threshold,
+                          full_scan_every=full_scan_every)
+    timed_tracker = _TimedTracker(tracker)
+    cache = None
+    if cache_max_age > 0:
+        cache = FaceEmotionCache(threshold=cache_threshold, max_age=cache_max_age)
+    pipeline = EmotionPipeline(classifier or _NoEmotion(), timed_tracker, cache=cache)
+    encoder = VideoBroadcaster(video)
+    profile = negotiate_profile(width, quality)
+
+    timings = defaultdict(list)
+    faces = []
+    frames = 0
+    measured_started = None
+    try:
+        while max_frames is None or frames < max_frames + warmup_frames:
+            started = time.perf_counter()
+            ret, frame = cap.read()
+            captured = time.perf_counter()
+            if not ret:
+                break
+
+            frame = cv2.flip(frame, 1)
+            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            converted = time.perf_counter()
+
+            results = pipeline.analyze(gray_frame)
+            analyzed = time.perf_counter()
+
+            draw_results(frame, results)
+            annotated = time.perf_counter()
+
+            encoder.encode(frames + 1, frame, profile)
+            encoded = time.perf_counter()
+
+            frames += 1
+            if frames <= warmup_frames:
+                continue
+            if measured_started is None:
+                measured_started = started
+            timings["capture"].append(captured - started)
+            timings["flip_convert"].append(converted - captured)
+            timings["detect"].append(timed_tracker.last_seconds)
+            timings["classify"].append(analyzed - converted - timed_tracker.last_seconds)
+            timings["annotate"].append(annotated - analyzed)
+            timings["encode"].append(encoded - annotated)
+            timings["total"].append(encoded - started)
+            faces.append(len(results))
+    finally:
+        cap.release()
+
+    measured = max(0, frames - warmup_frames)
+    elapsed = time.perf_counter() - measured_started if measured_started is not None else 0.0
+    return {
+        "frames": measured,
+        "fps": measured / elapsed if elapsed else 0.0,
+        "faces_per_frame": sum(faces) / len(faces) if faces else 0.0,
+        "detections": tracker.detections,
+        "emotion_cache": cache.stats() if cache is not None else None,
+        "stages_ms": {stage: summarize(timings[stage]) for stage in STAGES + ["total"]},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded video through the emotion pipeline")
+    parser.add_argument("--video", required=True, help="Video file to replay")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--warmup-frames", type=int, default=10)
+    parser.add_argument("--detect-every", type=int, default=5)
+    parser.add_argument("--redetect-threshold", type=float, default=0.5)
+    parser.add_argument("--detect-width", type=int, default=320, help="Face detection width in pixels")
+    parser.add_argument("--roi-margin", type=float, default=0.5)
+    parser.add_argument("--full-scan-every", type=int, default=3)
+    parser.add_argument("--cache-threshold", type=float, default=6.0, help="Emotion cache threshold in grey levels")
+    parser.add_argument("--cache-max-age", type=float, default=1.0, help="Emotion cache max age, 0 disables it")
+    parser.add_argument("--width", type=int, default=0, help="JPEG width, 0 keeps the native size")
+    parser.add_argument("--quality", type=int, default=95)
+    parser.add_argument("--no-emotion", action="store_true", help="Skip emotion inference")
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    classifier = None
+    warmup = {}
+    if not args.no_emotion:
+        classifier = EmotionClassifier()
+        warmup = classifier.warm_up()
+
+    params = {k: v for k, v in vars(args).items() if k != "output"}
+    results = run_metadata("video_pipeline", **params)
+    results["warmup_s"] = warmup
+    results.update(replay(
+        args.video, classifier=classifier, max_frames=args.max_frames,
+        warmup_frames=args.warmup_frames, detect_every=args.detect_every,
+        redetect_threshold=args.redetect_threshold, detect_width=args.detect_width,
+        roi_margin=args.roi_margin, full_scan_every=args.full_scan_every,
+        cache_threshold=args.cache_threshold, cache_max_age=args.cache_max_age,
+        width=args.width, quality=args.quality,
+    ))
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import React, { useState, useRef, useEffect } from 'react';
 import { Card } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 import { ChevronLeft, AlertTriangle, CheckCircle2, PlayCircle, SmilePlus, Frown, Meh } from 'lucide-react';
+import { useAuth } from '../../contexts/AuthContext';
 
 interface VideoPlayerProps {
   videoUrl: string;
@@ -9,6 +10,14 @@ interface VideoPlayerProps {
   onBack: () => void;
 }
 
+const EMOTION_API_URL = import.meta.env.VITE_EMOTION_API_URL ?? 'https://fluent-divine-ghost.ngrok-free.app';
+const INGEST_URL = `${EMOTION_API_URL.replace(/^http/, 'ws')}/ws/ingest`;
+
+// Browser capture limits; the server skips frames above its INGEST_MAX_FPS
+const CAPTURE_FPS = 5;
+const CAPTURE_WIDTH = 320;
+const CAPTURE_JPEG_QUALITY = 0.7;
+
 interface EmotionResult {
   emotion: string;
   confidence: number;
@@ -23,46 +32,121 @@ const VideoPlayer: React.FC<VideoPlayerProps> = ({ videoUrl, title, onBack }) =>
   const [emotionTracking, setEmotionTracking] = useState(false);
   const [emotionData, setEmotionData] = useState<EmotionResult | null>(null);
   const [emotionError, setEmotionError] = useState<string | null>(null);
+  const [captureError, setCaptureError] = useState<string | null>(null);
+  const cameraRef = useRef<HTMLVideoElement>(null);
+  const { currentUser } = useAuth();
+  // Emotion session of this student; signed-out viewers get an id for the component's lifetime
+  const anonymousSessionRef = useRef<string>(crypto.randomUUID());
+  const sessionId = encodeURIComponent(currentUser?.uid ?? anonymousSessionRef.current);
 
   // Function to toggle emotion tracking
   const toggleEmotionTracking = () => {
     setEmotionTracking(!emotionTracking);
   };
 
-  // Function to fetch emotion data
-  const fetchEmotionData = async () => {
-    try {
-      const response = await fetch('https://fluent-divine-ghost.ngrok-free.app/analyze_emotion');
-      if (!response.ok) {
-        throw new Error(`Error: ${response.status}`);
-      }
-      const data = await response.json();
-      setEmotionData(data);
-      setEmotionError(null);
-    } catch (err) {
-      console.error('Error fetching emotion data:', err);
-      setEmotionError(err instanceof Error ? err.message : 'Unknown error occurred');
+  // Subscribe to pushed emotion changes while tracking is enabled
+  useEffect(() => {
+    if (!emotionTracking) {
+      return;
     }
-  };
 
-  // Poll for emotion data when tracking is enabled
+    // EventSource reconnects on its own and resumes via Last-Event-ID
+    const source = new EventSource(`${EMOTION_API_URL}/emotion_events?session_id=${sessionId}`);
+
+    source.onmessage = (event) => {
+      try {
+        setEmotionData(JSON.parse(event.data));
+        setEmotionError(null);
+      } catch (err) {
+        console.error('Error parsing emotion event:', err);
+      }
+    };
+
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) {
+        setEmotionError('Emotion stream disconnected');
+      }
+    };
+
+    return () => {
+      source.close();
+    };
+  }, [emotionTracking, sessionId]);
+
+  // Capture the webcam in the browser and send downscaled JPEG frames to /ws/ingest
   useEffect(() => {
-    let intervalId: NodeJS.Timeout;
-    
-    if (emotionTracking) {
-      // Start with initial fetch
-      fetchEmotionData();
-      
-      // Then poll every 5 seconds
-      intervalId = setInterval(fetchEmotionData, 5000);
+    if (!emotionTracking) {
+      return;
     }
-    
-    return () => {
-      if (intervalId) {
-        clearInterval(intervalId);
+    setCaptureError(null);
+    if (!navigator.mediaDevices?.getUserMedia) {
+      setCaptureError('Camera capture is not supported in this browser');
+      return;
+    }
+
+    let stream: MediaStream | null = null;
+    let timer: number | undefined;
+    let cancelled = false;
+    // The server answers every frame; wait for the reply before sending the next one
+    let awaitingReply = false;
+    const canvas = document.createElement('canvas');
+    const socket = new WebSocket(`${INGEST_URL}?session_id=${sessionId}`);
+
+    socket.onmessage = () => {
+      // Per-frame replies only gate sending; emotions arrive through /emotion_events
+      awaitingReply = false;
+    };
+
+    socket.onclose = () => {
+      if (!cancelled) {
+        setCaptureError('Frame upload disconnected');
       }
     };
-  }, [emotionTracking]);
+
+    const sendFrame = () => {
+      const camera = cameraRef.current;
+      if (socket.readyState !== WebSocket.OPEN || awaitingReply || !camera || !camera.videoWidth) {
+        return;
+      }
+      const scale = Math.min(1, CAPTURE_WIDTH / camera.videoWidth);
+      canvas.width = Math.round(camera.videoWidth * scale);
+      canvas.height = Math.round(camera.videoHeight * scale);
+      canvas.getContext('2d')?.drawImage(camera, 0, 0, canvas.width, canvas.height);
+      awaitingReply = true;
+      canvas.toBlob((blob) => {
+        if (blob && socket.readyState === WebSocket.OPEN) {
+          socket.send(blob);
+        } else {
+          awaitingReply = false;
+        }
+      }, 'image/jpeg', CAPTURE_JPEG_QUALITY);
+    };
+
+    navigator.mediaDevices
+      .getUserMedia({ video: { width: { ideal: CAPTURE_WIDTH }, frameRate: { ideal: CAPTURE_FPS } }, audio: false })
+      .then((media) => {
+        if (cancelled) {
+          media.getTracks().forEach((track) => track.stop());
+          return;
+        }
+        stream = media;
+        if (cameraRef.current) {
+          cameraRef.current.srcObject = media;
+        }
+        timer = window.setInterval(sendFrame, 1000 / CAPTURE_FPS);
+      })
+      .catch((err) => {
+        console.error('Camera capture failed:', err);
+        setCaptureError('Camera access was denied');
+      });
+
+    return () => {
+      cancelled = true;
+      window.clearInterval(timer);
+      socket.close();
+      stream?.getTracks().forEach((track) => track.stop());
+    };
+  }, [emotionTracking, sessionId]);
 
   const handleError = (e: React.SyntheticEvent<HTMLVideoElement, Event>) => {
     setIsLoading(false);
@@ -178,7 +262,7 @@ const VideoPlayer: React.FC<VideoPlayerProps> = ({ videoUrl, title, onBack }) =>
               )}
             </div>
             
-            {/* Video feed from backend */}
+            {/* Local camera preview; falls back to the backend's annotated feed without browser capture */}
             {emotionTracking && (
               <div className="mt-3 flex justify-center">
                 <div className="relative rounded-lg overflow-hidden" style={{ 
@@ -186,11 +270,20 @@ const VideoPlayer: React.FC<VideoPlayerProps> = ({ videoUrl, title, onBack }) =>
                   width: '360px',
                   maxWidth: '100%'
                 }}>
-                  <img 
-                    src="http://localhost:8000/video_feed" 
-                    alt="Emotion detection feed"
-                    className="w-full h-full object-cover"
+                  <video
+                    ref={cameraRef}
+                    autoPlay
+                    muted
+                    playsInline
+                    className={`w-full h-full object-cover -scale-x-100 ${captureError ? 'hidden' : ''}`}
                   />
+                  {captureError && (
+                    <img 
+                      src={`${EMOTION_API_URL}/video_feed?session_id=${sessionId}`}
+                      alt="Emotion detection feed"
+                      className="w-full h-full object-cover"
+                    />
+                  )}
                 </div>
               </div>
             )}
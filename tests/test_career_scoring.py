@@ -0,0 +1,31 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from AI_models.career_scoring import _keyword_hits, score_assessment  # noqa: E402
+
+
+@pytest.mark.parametrize("items, hits", [
+    (["Start-up clubs"], [0, 0, 0]),
+    (["Stars", "Stargazing"], [2, 0, 0]),
+    (["Career day"], [0, 0, 0]),
+    (["Caring for pets", "First aid"], [0, 0, 2]),
+    (["Mathematics"], [0, 1, 0]),
+    (["Labels", "Building models"], [0, 2, 0]),
+    (["Astronomy", "Planets"], [2, 0, 0]),
+])
+def test_keywords_match_whole_words_and_stems(items, hits):
+    assert _keyword_hits(items) == hits
+
+
+def test_keywords_tip_a_balanced_assessment():
+    responses = {field: 5.0 for field in [
+        "space_exploration", "scientific_experiments", "helping_others", "patience", "creativity", "empathy",
+    ]}
+    assessment = {
+        "responses": responses,
+        "additional_info": {"favorite_subjects": ["Biology"], "hobbies": ["Helping at the animal shelter"]},
+    }
+    career, margin = score_assessment(assessment)
+    assert career == "Doctor"
+    assert margin > 0
@@ -0,0 +1,88 @@
+import asyncio
+
+from AI_models.emotion_aggregator import EmotionFeed, EmotionWindow, SessionRegistry
+
+
+def make_feed(delta=10.0, history=64):
+    window = EmotionWindow(capacity=100, window_seconds=10.0)
+    return window, EmotionFeed(window, delta=delta, history=history)
+
+
+def test_window_counts_expire():
+    window = EmotionWindow(capacity=10, window_seconds=5.0)
+    window.record(["happy", "happy"], now=100.0)
+    window.record("angry", now=103.0)
+    assert window.most_common(now=104.0) == ("happy", 2, 3)
+    assert window.counts(now=106.0) == ({"angry": 1}, 1)
+    assert window.most_common(now=110.0) == (None, 0, 0)
+
+
+def test_window_capacity_evicts_oldest():
+    window = EmotionWindow(capacity=3, window_seconds=60.0)
+    window.record(["happy", "angry", "angry", "neutral"], now=1.0)
+    assert window.counts(now=2.0) == ({"angry": 2, "neutral": 1}, 3)
+
+
+def test_feed_emits_only_on_change():
+    window, feed = make_feed(delta=10.0)
+    window.record("happy", now=1.0)
+    assert feed.last_id == 1
+    # Still 100% happy: no new event
+    window.record("happy", now=1.0)
+    assert feed.last_id == 1
+    window.record("angry", now=1.0)
+    assert feed.last_id == 2
+    assert [data["emotion"] for _, data in feed.events_after(0)] == ["happy", "happy"]
+    assert feed.events_after(2) == []
+
+
+def test_feed_resume_from_buffered_id():
+    window, feed = make_feed(delta=0.0)
+    for emotion in ["happy", "angry", "neutral"]:
+        window.record(emotion, now=1.0)
+    assert [event_id for event_id, _ in feed.events_after(1)] == [2, 3]
+
+
+def test_feed_gap_after_history_overflow_requires_resync():
+    window, feed = make_feed(delta=0.0, history=2)
+    for emotion in ["happy", "angry", "neutral", "happy"]:
+        window.record(emotion, now=1.0)
+    assert feed.events_after(0) is None
+    assert [event_id for event_id, _ in feed.events_after(2)] == [3, 4]
+
+
+def test_feed_resume_with_id_from_before_restart_requires_resync():
+    # The client saw id 57 from a previous process; the new feed has issued one event
+    window, feed = make_feed()
+    window.record("happy", now=1.0)
+    assert feed.last_id == 1
+    assert feed.events_after(57) is None
+
+
+def test_feed_resume_after_registry_eviction_requires_resync():
+    registry = SessionRegistry(capacity=10, window_seconds=10.0, max_sessions=1)
+    feed = registry.feed("a")
+    registry.get("a").record(["happy", "angry", "angry"], now=1.0)
+    last_id = feed.last_id
+    assert last_id > 0
+    # Session "b" evicts "a"; the next feed for "a" starts counting again
+    registry.get("b")
+    fresh = registry.feed("a")
+    assert fresh is not feed
+    assert fresh.events_after(last_id) is None
+
+
+def test_feed_wait_wakes_on_event_from_other_thread():
+    window, feed = make_feed()
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, lambda: loop.run_in_executor(None, window.record, "happy"))
+        return await feed.wait(feed.last_id, timeout=2.0)
+
+    assert asyncio.run(scenario()) is True
+
+
+def test_feed_wait_times_out():
+    _, feed = make_feed()
+    assert asyncio.run(feed.wait(feed.last_id, timeout=0.05)) is False
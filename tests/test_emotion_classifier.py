@@ -0,0 +1,48 @@
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from AI_models.emotion_classifier import EMOTION_LABELS, EmotionClassifier  # noqa: E402
+
+
+class RecordingModel:
+    """Fake Keras model that records how many predict calls overlap"""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def predict(self, batch, verbose=0):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.01)
+        with self._lock:
+            self.active -= 1
+        probabilities = np.zeros((len(batch), len(EMOTION_LABELS)), dtype=np.float32)
+        probabilities[:, EMOTION_LABELS.index("happy")] = 1.0
+        return probabilities
+
+
+def test_classify_picks_dominant_allowed_emotion():
+    classifier = EmotionClassifier(model=RecordingModel())
+    batch = classifier.classify([np.zeros((60, 60), dtype=np.uint8)] * 3)
+    assert batch.labels == ["happy"] * 3
+    assert list(batch.confidences) == [100.0] * 3
+
+
+def test_predict_is_serialized_across_threads():
+    model = RecordingModel()
+    classifier = EmotionClassifier(model=model)
+    faces = [np.zeros((48, 48), dtype=np.uint8)]
+    threads = [threading.Thread(target=classifier.classify, args=(faces,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert model.max_active == 1
@@ -0,0 +1,52 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from AI_models.emotion_classifier import EMOTION_LABELS, EmotionBatch  # noqa: E402
+from AI_models.emotion_pipeline import EmotionPipeline, FaceEmotionCache  # noqa: E402
+from AI_models.face_detection import Track  # noqa: E402
+from AI_models.metrics import VIDEO_FACES  # noqa: E402
+
+
+class FixedTracker:
+    def __init__(self, boxes):
+        self.tracks = [Track(i, box) for i, box in enumerate(boxes, 1)]
+
+    def update(self, gray_frame):
+        return self.tracks
+
+
+class CountingClassifier:
+    def __init__(self):
+        self.crops = 0
+
+    def classify(self, face_rois):
+        self.crops += len(face_rois)
+        n = len(face_rois)
+        return EmotionBatch(["happy"] * n, np.full(n, 80.0, dtype=np.float32),
+                            np.zeros((n, len(EMOTION_LABELS)), dtype=np.float32))
+
+
+def frame(value=0):
+    return np.full((120, 160), value, dtype=np.uint8)
+
+
+def test_cache_skips_unchanged_faces():
+    classifier = CountingClassifier()
+    pipeline = EmotionPipeline(classifier, FixedTracker([(0, 0, 40, 40), (60, 0, 40, 40)]),
+                               cache=FaceEmotionCache(threshold=6.0, max_age=60.0))
+    first = pipeline.analyze(frame(10))
+    second = pipeline.analyze(frame(12))
+    assert [r.emotion for r in second] == [r.emotion for r in first] == ["happy", "happy"]
+    assert classifier.crops == 2
+    pipeline.analyze(frame(200))
+    assert classifier.crops == 4
+    assert pipeline.cache.skip_rate == pytest.approx(2 / 6)
+
+
+def test_only_named_pipelines_report_faces():
+    EmotionPipeline(CountingClassifier(), FixedTracker([(0, 0, 40, 40)] * 3), source="camera").analyze(frame())
+    EmotionPipeline(CountingClassifier(), FixedTracker([(0, 0, 40, 40)])).analyze(frame())
+    assert VIDEO_FACES.labels("camera").value == 3
+    assert list(VIDEO_FACES._children) == [("camera",)]
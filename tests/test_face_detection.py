@@ -0,0 +1,115 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from AI_models.face_detection import FaceDetector, FaceTracker  # noqa: E402
+
+
+def test_detect_width_scales_large_frames_only():
+    detector = FaceDetector(detect_width=320)
+    assert detector.scale_for(640) == 0.5
+    assert detector.scale_for(1280) == 0.25
+    # Browser frames already at or below the target keep their resolution
+    assert detector.scale_for(320) == 1.0
+    assert detector.scale_for(240) == 1.0
+
+
+def test_fixed_scale_without_detect_width():
+    assert FaceDetector(scale=0.5).scale_for(320) == 0.5
+
+
+class StubCascade:
+    """Returns fixed boxes in the coordinates of the image it is given"""
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.calls = []
+
+    def detectMultiScale(self, image, scaleFactor, minNeighbors, minSize):
+        self.calls.append((image.shape, minSize))
+        return list(self.boxes)
+
+
+def stub_detector(boxes, **kwargs):
+    detector = FaceDetector(**kwargs)
+    detector.cascade = StubCascade(boxes)
+    return detector
+
+
+def test_boxes_are_mapped_back_to_full_resolution():
+    detector = stub_detector([(10, 20, 30, 40)], detect_width=160)
+    boxes = detector.detect(np.zeros((480, 640), dtype=np.uint8))
+    assert boxes == [(40, 80, 120, 160)]
+    # The cascade ran on the quarter-size frame with a scaled minimum size
+    assert detector.cascade.calls == [((120, 160), (8, 8))]
+
+
+def test_region_boxes_include_the_region_offset():
+    detector = stub_detector([(4, 5, 10, 10)], detect_width=160, roi_margin=0.5)
+    # Two copies of the same region find the same face only once
+    boxes = detector.detect(np.zeros((480, 640), dtype=np.uint8), regions=[(200, 100, 80, 80)] * 2)
+    # The region grows by half its size on each side to (160, 60)-(320, 220)
+    assert boxes == [(176, 80, 40, 40)]
+    assert [shape for shape, _ in detector.cascade.calls] == [(40, 40), (40, 40)]
+
+
+class BlockDetector:
+    """Stand-in detector that reports the bounding box of all non-black pixels"""
+
+    def __init__(self):
+        self.calls = []
+
+    def detect(self, gray_frame, regions=None):
+        self.calls.append(regions)
+        ys, xs = (gray_frame > 0).nonzero()
+        if not len(xs):
+            return []
+        return [(int(xs.min()), int(ys.min()), int(xs.max() - xs.min() + 1), int(ys.max() - ys.min() + 1))]
+
+
+def textured_frame(x, y, size=60, shape=(240, 320)):
+    rng = np.random.default_rng(0)
+    frame = np.zeros(shape, dtype=np.uint8)
+    texture = rng.integers(40, 255, (size // 6, size // 6), dtype=np.uint8)
+    frame[y:y + size, x:x + size] = np.kron(texture, np.ones((6, 6), dtype=np.uint8))
+    return frame
+
+
+def test_tracker_detects_every_n_frames_and_follows_motion():
+    detector = BlockDetector()
+    tracker = FaceTracker(detector, detect_every=5, full_scan_every=1)
+    for i in range(12):
+        x, y = 50 + 2 * i, 40 + i
+        tracks = tracker.update(textured_frame(x, y))
+        assert len(tracks) == 1
+        tx, ty, _, _ = tracks[0].box
+        assert abs(tx - x) <= 1 and abs(ty - y) <= 1
+    # Frames 1, 6 and 11 ran the detector; the others were tracked
+    assert len(detector.calls) == tracker.detections == 3
+    assert tracks[0].id == 1
+
+
+def test_tracker_alternates_region_and_full_scans():
+    detector = BlockDetector()
+    tracker = FaceTracker(detector, detect_every=1, full_scan_every=3)
+    for i in range(7):
+        tracker.update(textured_frame(50 + i, 40))
+    full_scans = [regions is None for regions in detector.calls]
+    # The first scan has no tracks yet, then every third detection is a full scan
+    assert full_scans == [True, False, True, False, False, True, False]
+    assert detector.calls[1] == [(50, 40, 60, 60)]
+
+
+def test_tracker_redetects_when_confidence_drops():
+    detector = BlockDetector()
+    tracker = FaceTracker(detector, detect_every=100)
+    tracker.update(textured_frame(50, 40))
+    tracker.update(textured_frame(52, 41))
+    assert len(detector.calls) == 1
+    assert tracker.tracks[0].confidence > 0.5
+
+    # A blank frame leaves no features to follow, so the detector runs early
+    tracks = tracker.update(np.zeros((240, 320), dtype=np.uint8))
+    assert len(detector.calls) == 2
+    assert tracks == []
@@ -0,0 +1,102 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from AI_models import inference_pool  # noqa: E402
+from AI_models.inference_pool import InferencePool, JobTimeoutError, WorkerCrashedError  # noqa: E402
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="needs the fork start method")
+
+
+class CrashingClassifier:
+    """Stand-in for the emotion model: all-white crops kill the worker process, mid-gray ones hang it"""
+
+    def warm_up(self):
+        pass
+
+    def predict(self, batch):
+        if batch.mean() > 0.99:
+            os._exit(1)
+        if 0.49 < batch.mean() < 0.51:
+            import time
+
+            time.sleep(3600)
+        return np.full((len(batch), len(inference_pool.EMOTION_LABELS)), 50.0, dtype=np.float32)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # Forked workers inherit the patched classifier
+    monkeypatch.setattr(inference_pool, "EmotionClassifier", CrashingClassifier)
+    pool = InferencePool(workers=1, slots_per_worker=2, max_faces=4, start_method="fork", job_timeout=1.0)
+    pool.start(timeout=10)
+    yield pool
+    pool.close()
+
+
+def face(value):
+    return np.full((48, 48), value, dtype=np.uint8)
+
+
+def test_pool_returns_probabilities(pool):
+    probabilities = pool.predict([face(0), face(100)], timeout=10)
+    assert probabilities.shape == (2, len(inference_pool.EMOTION_LABELS))
+    assert pool.stats()["completed"] == 1
+
+
+def test_pool_recovers_from_worker_crash(pool):
+    crashed = pool.submit([face(255)])
+    with pytest.raises(WorkerCrashedError):
+        crashed.result(timeout=10)
+
+    # The monitor has respawned the worker and returned its slots
+    assert pool.predict([face(0)], timeout=10).shape == (1, len(inference_pool.EMOTION_LABELS))
+    stats = pool.stats()
+    assert stats["restarts"] == 1
+    assert stats["failed"] == 1
+    assert stats["in_flight"] == 0
+    assert stats["free_slots"] == 2
+
+
+def test_pool_restarts_hung_worker(pool):
+    hung = pool.submit([face(128)])
+    with pytest.raises(JobTimeoutError):
+        hung.result(timeout=10)
+
+    # The hung process was replaced and the job's slot returned
+    assert pool.predict([face(0)], timeout=10).shape == (1, len(inference_pool.EMOTION_LABELS))
+    stats = pool.stats()
+    assert stats["restarts"] == 1
+    assert stats["failed"] == 1
+    assert stats["in_flight"] == 0
+    assert stats["free_slots"] == 2
+
+
+class SlowLoadingClassifier(CrashingClassifier):
+    def warm_up(self):
+        import time
+
+        time.sleep(5)
+
+
+def test_implicit_start_is_bounded(monkeypatch):
+    monkeypatch.setattr(inference_pool, "EmotionClassifier", SlowLoadingClassifier)
+    pool = InferencePool(workers=1, max_faces=4, start_method="fork")
+    try:
+        with pytest.raises(inference_pool.PoolBusyError):
+            pool.submit([face(0)], timeout=0.5)
+    finally:
+        pool.close(timeout=0.5)
+
+
+def test_pool_can_restart_after_close(pool):
+    pool.close()
+    assert not pool.started
+    pool.start(timeout=10)
+    assert pool.predict([face(0)], timeout=10).shape == (1, len(inference_pool.EMOTION_LABELS))
+    assert pool.stats()["workers"] == 1
+    assert pool.stats()["free_slots"] == 2
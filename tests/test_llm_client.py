@@ -0,0 +1,172 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from AI_models.llm_client import LLMClient, LLMError  # noqa: E402
+from AI_models.rate_limit import RateLimiter  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "Hi"}]
+
+
+def make_client(handler, **kwargs):
+    kwargs.setdefault("api_key", "test")
+    kwargs.setdefault("api_url", "http://llm.test/chat")
+    client = LLMClient(**kwargs)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def completion(text, **extra):
+    return {"choices": [{"message": {"content": text}, "finish_reason": "stop"}], **extra}
+
+
+def sse(*chunks):
+    lines = [f"data: {chunk if isinstance(chunk, str) else json.dumps(chunk)}\n\n" for chunk in chunks]
+    return "".join(lines).encode()
+
+
+def delta(text):
+    return {"choices": [{"delta": {"content": text}}]}
+
+
+async def collect(client, **kwargs):
+    tokens = []
+    async for token in client.stream_chat(MESSAGES, **kwargs):
+        tokens.append(token)
+    return tokens
+
+
+def test_stream_yields_deltas():
+    def handler(request):
+        return httpx.Response(200, content=sse(delta("Hello"), delta(" world"), "[DONE]"))
+
+    assert asyncio.run(collect(make_client(handler))) == ["Hello", " world"]
+
+
+def test_stream_malformed_chunk_raises_llm_error():
+    def handler(request):
+        return httpx.Response(200, content=sse(delta("Hello"), "{not json", "[DONE]"))
+
+    client = make_client(handler)
+    tokens = []
+
+    async def run():
+        async for token in client.stream_chat(MESSAGES):
+            tokens.append(token)
+
+    with pytest.raises(LLMError) as excinfo:
+        asyncio.run(run())
+    assert excinfo.value.status_code == 502
+    assert tokens == ["Hello"]
+
+
+def test_stream_rate_limit_wait_is_bounded_by_deadline():
+    def handler(request):
+        return httpx.Response(200, content=sse(delta("ok"), "[DONE]"))
+
+    # One request per 100 seconds: the second call would wait far past its deadline
+    client = make_client(handler, rate_limiter=RateLimiter(rate=0.01, burst=1))
+
+    async def run():
+        assert await collect(client) == ["ok"]
+        started = time.monotonic()
+        with pytest.raises(LLMError) as excinfo:
+            await collect(client, timeout=0.2)
+        assert excinfo.value.status_code == 429
+        assert time.monotonic() - started < 2.0
+
+    asyncio.run(run())
+
+
+def test_chat_malformed_body_raises_llm_error():
+    def handler(request):
+        return httpx.Response(200, content=b"<html>bad gateway</html>")
+
+    with pytest.raises(LLMError) as excinfo:
+        asyncio.run(make_client(handler).chat(MESSAGES))
+    assert excinfo.value.status_code == 502
+
+
+class Upstream:
+    """MockTransport handler answering with a scripted sequence of responses"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def __call__(self, request):
+        self.calls += 1
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def fast_client(upstream, **kwargs):
+    kwargs.setdefault("backoff_base", 0.001)
+    kwargs.setdefault("backoff_max", 0.01)
+    return make_client(upstream, **kwargs)
+
+
+def test_retries_5xx_and_429_then_succeeds():
+    upstream = Upstream(
+        httpx.Response(503, text="busy"),
+        httpx.Response(429, text="slow down"),
+        httpx.Response(200, json=completion("Doctor")),
+    )
+    result = asyncio.run(fast_client(upstream).chat(MESSAGES))
+    assert result["choices"][0]["message"]["content"] == "Doctor"
+    assert upstream.calls == 3
+
+
+def test_retries_transport_errors():
+    upstream = Upstream(httpx.ConnectError("refused"), httpx.Response(200, json=completion("ok")))
+    assert asyncio.run(fast_client(upstream).complete("Hi")) == "ok"
+    assert upstream.calls == 2
+
+
+def test_client_errors_are_not_retried():
+    upstream = Upstream(httpx.Response(400, text="bad request"))
+    with pytest.raises(LLMError) as excinfo:
+        asyncio.run(fast_client(upstream).chat(MESSAGES))
+    assert excinfo.value.status_code == 400
+    assert upstream.calls == 1
+
+
+def test_gives_up_after_max_retries():
+    upstream = Upstream(httpx.Response(502, text="bad gateway"))
+    with pytest.raises(LLMError) as excinfo:
+        asyncio.run(fast_client(upstream, max_retries=2).chat(MESSAGES))
+    assert excinfo.value.status_code == 502
+    assert upstream.calls == 3
+
+
+def test_retry_that_would_overrun_the_deadline_fails_fast():
+    # Retry-After asks for 5 s but the call only has 0.5 s
+    upstream = Upstream(httpx.Response(429, headers={"retry-after": "5"}, text="slow down"))
+    started = time.monotonic()
+    with pytest.raises(LLMError) as excinfo:
+        asyncio.run(make_client(upstream, backoff_max=10.0).chat(MESSAGES, timeout=0.5))
+    assert excinfo.value.status_code == 429
+    assert upstream.calls == 1
+    assert time.monotonic() - started < 0.5
+
+
+def test_backoff_is_full_jitter_capped_exponential():
+    client = LLMClient(api_key="test", backoff_base=0.5, backoff_max=4.0)
+    for attempt, cap in [(0, 0.5), (1, 1.0), (2, 2.0), (5, 4.0)]:
+        delays = [client._backoff(attempt) for _ in range(200)]
+        assert all(0 <= delay <= cap for delay in delays)
+        # Jittered, not a fixed schedule
+        assert len(set(delays)) > 1
+
+
+def test_backoff_honours_retry_after_up_to_the_cap():
+    client = LLMClient(api_key="test", backoff_max=4.0)
+    assert client._backoff(0, httpx.Response(429, headers={"retry-after": "2"})) == 2.0
+    assert client._backoff(0, httpx.Response(429, headers={"retry-after": "60"})) == 4.0
+    assert 0 <= client._backoff(0, httpx.Response(429, headers={"retry-after": "soon"})) <= 0.5
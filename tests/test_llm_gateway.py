@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from AI_models.llm_client import LLMError  # noqa: E402
+from AI_models.llm_gateway import InvalidAnswerError, LLMGateway, Task, match_choice  # noqa: E402
+from AI_models.metrics import LLM_INVALID_ANSWERS, LLM_TASK_TOKENS  # noqa: E402
+
+CAREERS = ["Astronaut", "Scientist", "Doctor"]
+
+
+@pytest.mark.parametrize("text, choice", [
+    ("Doctor", "Doctor"),
+    ("  doctor.\n", "Doctor"),
+    ("**Scientist**", "Scientist"),
+    ("A Scientist", "Scientist"),
+    ("Recommended: Astronaut", "Astronaut"),
+    ("Career path - Doctor", "Doctor"),
+])
+def test_match_choice_accepts_exact_answers(text, choice):
+    assert match_choice(text, CAREERS) == choice
+
+
+@pytest.mark.parametrize("text", [
+    "Definitely not Scientist",
+    "Not a Doctor",
+    "Doctor or Scientist",
+    "I would say Astronaut",
+    "Recommended: not Doctor",
+    "Engineer",
+    "",
+])
+def test_match_choice_rejects_anything_else(text):
+    assert match_choice(text, CAREERS) is None
+
+
+def test_match_choice_handles_multi_word_choices():
+    modes = ["Gamified Learning", "Storytelling"]
+    assert match_choice("Learning mode: gamified learning", modes) == "Gamified Learning"
+    assert match_choice("Gamified", modes) is None
+
+
+def test_task_parse_validates_choices():
+    task = Task("test_career", "Pick one of $careers", tier="small", choices=CAREERS)
+    assert task.temperature == 0.0
+    assert task.parse(" Doctor ") == "Doctor"
+    before = LLM_INVALID_ANSWERS.labels("test_career").value
+    with pytest.raises(InvalidAnswerError) as excinfo:
+        task.parse("Not a Doctor")
+    assert excinfo.value.status_code == 502
+    assert excinfo.value.answer == "Not a Doctor"
+    assert LLM_INVALID_ANSWERS.labels("test_career").value == before + 1
+    # Per-call choices replace the task's
+    assert task.parse("Pilot", choices=["Pilot"]) == "Pilot"
+
+
+def test_free_text_task_returns_stripped_completion():
+    task = Task("test_summary", "Summarize $name")
+    assert task.temperature is None
+    assert task.params() == {}
+    assert task.parse("  Great progress!\n") == "Great progress!"
+
+
+class FakeClient:
+    def __init__(self, *answers, fail=False):
+        self.answers = list(answers)
+        self.fail = fail
+        self.requests = []
+
+    async def chat(self, messages, model, max_tokens, timeout=None, **params):
+        self.requests.append({"messages": messages, "model": model, "max_tokens": max_tokens, **params})
+        if self.fail:
+            raise LLMError("upstream down", status_code=503)
+        return {
+            "choices": [{"message": {"content": self.answers.pop(0)}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 2},
+        }
+
+    async def stream_chat(self, messages, model, max_tokens, timeout=None, on_usage=None, **params):
+        for token in self.answers:
+            yield token
+        on_usage({"prompt_tokens": 7, "completion_tokens": len(self.answers)})
+
+
+def test_gateway_runs_task_and_accounts_tokens_per_task():
+    task = Task("test_gateway_run", "Pick for $name", tier="small", max_tokens=10, choices=CAREERS)
+    client = FakeClient("Doctor", "maybe an astronaut", "Scientist")
+    gateway = LLMGateway(client)
+    before = LLM_TASK_TOKENS.labels("test_gateway_run", "prompt").value
+
+    async def scenario():
+        assert await gateway.run(task, {"name": "Ana"}) == "Doctor"
+        with pytest.raises(InvalidAnswerError):
+            await gateway.run(task, {"name": "Ben"})
+        assert await gateway.run(task, {"name": "Cy"}) == "Scientist"
+
+    asyncio.run(scenario())
+    assert client.requests[0]["messages"] == [{"role": "user", "content": "Pick for Ana"}]
+    assert client.requests[0]["max_tokens"] == 10
+    assert client.requests[0]["temperature"] == 0.0
+    assert gateway.usage()["test_gateway_run"] == {
+        "calls": 3, "failures": 0, "invalid": 1, "prompt_tokens": 30, "completion_tokens": 6,
+    }
+    assert LLM_TASK_TOKENS.labels("test_gateway_run", "prompt").value == before + 30
+
+
+def test_gateway_counts_failures_and_streamed_usage():
+    task = Task("test_gateway_stream", "Tell $name a story")
+    gateway = LLMGateway(FakeClient(fail=True))
+    with pytest.raises(LLMError):
+        asyncio.run(gateway.run(task, {"name": "Ana"}))
+
+    streaming = LLMGateway(FakeClient("Once", " upon"))
+
+    async def collect():
+        return [token async for token in streaming.stream(task, {"name": "Ana"})]
+
+    assert asyncio.run(collect()) == ["Once", " upon"]
+    assert gateway.usage()["test_gateway_stream"]["failures"] == 1
+    assert streaming.usage()["test_gateway_stream"] == {
+        "calls": 1, "failures": 0, "invalid": 0, "prompt_tokens": 7, "completion_tokens": 2,
+    }
@@ -0,0 +1,26 @@
+from AI_models.metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_counter_metadata_uses_the_sample_name():
+    registry = Registry()
+    requests = Counter("app_requests", "Requests served", ["route"], registry=registry)
+    Counter("app_errors_total", "Errors raised", registry=registry)
+    requests.labels("/assess").inc(2)
+    lines = registry.render().splitlines()
+    assert lines[:3] == [
+        "# HELP app_requests_total Requests served",
+        "# TYPE app_requests_total counter",
+        'app_requests_total{route="/assess"} 2.0',
+    ]
+    assert "# TYPE app_errors_total counter" in lines
+    assert "app_errors_total 0.0" in lines
+
+
+def test_gauge_and_histogram_keep_their_names():
+    registry = Registry()
+    Gauge("app_workers", "Live workers", registry=registry).set(3)
+    Histogram("app_latency_seconds", "Latency", buckets=(0.1,), registry=registry).observe(0.05)
+    text = registry.render()
+    assert "# TYPE app_workers gauge\napp_workers 3.0\n" in text
+    assert "# TYPE app_latency_seconds histogram" in text
+    assert 'app_latency_seconds_bucket{le="0.1"} 1' in text
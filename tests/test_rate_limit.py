@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from AI_models.rate_limit import RateLimiter, parse_duration, run_bounded
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("2m59.56s", 179.56),
+    ("120ms", 0.12),
+    ("7.66s", 7.66),
+    ("1h2m", 3720.0),
+    ("3", 3.0),
+    ("0.5", 0.5),
+    (" 250ms ", 0.25),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == pytest.approx(seconds)
+
+
+@pytest.mark.parametrize("value", [None, "", "soon", "ms"])
+def test_parse_duration_rejects_garbage(value):
+    assert parse_duration(value) is None
+
+
+def limiter(**kwargs):
+    clock = FakeClock()
+    return RateLimiter(clock=clock, **kwargs), clock
+
+
+def wait_time(rate_limiter, cost=0):
+    """How long acquire(cost) would sleep right now"""
+    now = rate_limiter._clock()
+    rate_limiter._refill(now)
+    return rate_limiter._wait_time(now, cost)
+
+
+def test_exhausted_request_quota_waits_for_reset():
+    rate_limiter, clock = limiter(rate=100.0, burst=100)
+    rate_limiter.update({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2m0.5s"}, 200)
+    assert wait_time(rate_limiter) == pytest.approx(120.5)
+    clock.now += 120.5
+    assert wait_time(rate_limiter) == 0
+
+
+def test_token_quota_only_blocks_requests_that_do_not_fit():
+    rate_limiter, _ = limiter(rate=100.0, burst=100)
+    rate_limiter.update({"x-ratelimit-remaining-tokens": "500", "x-ratelimit-reset-tokens": "750ms"}, 200)
+    assert wait_time(rate_limiter, cost=400) == 0
+    assert wait_time(rate_limiter, cost=600) == pytest.approx(0.75)
+
+
+def test_429_pauses_for_retry_after_or_one_interval():
+    rate_limiter, _ = limiter(rate=4.0, burst=4)
+    rate_limiter.update({"retry-after": "3"}, 429)
+    assert wait_time(rate_limiter) == pytest.approx(3.0)
+
+    rate_limiter, _ = limiter(rate=4.0, burst=4)
+    rate_limiter.update({}, 429)
+    assert wait_time(rate_limiter) == pytest.approx(0.25)
+
+
+def test_malformed_headers_are_ignored():
+    rate_limiter, _ = limiter(rate=100.0, burst=100)
+    rate_limiter.update({"x-ratelimit-remaining-requests": "lots", "x-ratelimit-reset-requests": "soon"}, 200)
+    assert wait_time(rate_limiter) == 0
+
+
+def test_bucket_spaces_requests_after_burst():
+    rate_limiter, clock = limiter(rate=2.0, burst=2)
+
+    async def drain():
+        await rate_limiter.acquire()
+        await rate_limiter.acquire()
+
+    asyncio.run(drain())
+    assert wait_time(rate_limiter) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert wait_time(rate_limiter) == 0
+
+
+def test_run_bounded_limits_concurrency_and_reports_errors():
+    active = 0
+    peak = 0
+
+    async def work(item):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        if item == 3:
+            raise ValueError(item)
+        return item * 10
+
+    async def scenario():
+        return [result async for result in run_bounded(work, range(6), concurrency=2)]
+
+    results = sorted(asyncio.run(scenario()), key=lambda r: r[0])
+    assert peak == 2
+    assert [(i, value) for i, value, _ in results] == [(0, 0), (1, 10), (2, 20), (3, None), (4, 40), (5, 50)]
+    assert isinstance(results[3][2], ValueError)
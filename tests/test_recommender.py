@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from AI_models.llm_gateway import LLMError
+from AI_models.recommender import RecommenderService
+
+
+class FakeGateway:
+    """Answers every learning-mode prompt with the first allowed choice"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    async def run(self, task, fields, choices=None, timeout=None):
+        self.calls.append((fields["topic"], fields["learning_mode_used"]))
+        if self.fail:
+            raise LLMError("model unavailable")
+        return choices[0]
+
+
+def quiz(student_id, passed, topic="Fractions", mode="Gamified Learning"):
+    return {"student_id": student_id, "topic": topic, "learning_mode_used": mode, "quiz_results": passed}
+
+
+def test_topic_is_queued_only_after_min_attempts_below_threshold():
+    service = RecommenderService(gateway=FakeGateway(), min_attempts=3, pass_threshold=0.5)
+    assert not service.ingest(quiz("s1", False))
+    assert not service.ingest(quiz("s1", False))
+    assert service.ingest(quiz("s1", False))
+    # Already pending: further failures do not queue it twice
+    assert not service.ingest(quiz("s1", False))
+    assert service.stats()["pending"] == 1
+
+
+def test_passing_students_never_reach_the_llm():
+    gateway = FakeGateway()
+    service = RecommenderService(gateway=gateway, min_attempts=3, pass_threshold=0.5)
+    accepted, queued = service.ingest_many([quiz("s1", True), quiz("s1", False), quiz("s1", True)])
+    assert (accepted, queued) == (3, 0)
+    asyncio.run(service.drain())
+    assert gateway.calls == []
+
+
+def test_students_on_the_same_topic_and_mode_share_one_prompt():
+    gateway = FakeGateway()
+    service = RecommenderService(gateway=gateway, min_attempts=1)
+    service.ingest_many([
+        quiz("s1", False), quiz("s2", False),
+        quiz("s3", False, mode="Storytelling"),
+        quiz("s4", False, topic="Decimals"),
+    ])
+    assert asyncio.run(service.evaluate_pending()) == 4
+    assert sorted(gateway.calls) == [
+        ("Decimals", "Gamified Learning"),
+        ("Fractions", "Gamified Learning"),
+        ("Fractions", "Storytelling"),
+    ]
+    assert service.stats()["llm_calls"] == 3
+
+
+def test_evaluate_pending_takes_at_most_one_batch():
+    service = RecommenderService(gateway=FakeGateway(), min_attempts=1, batch_size=2)
+    service.ingest_many([quiz(f"s{i}", False) for i in range(5)])
+    assert asyncio.run(service.evaluate_pending()) == 2
+    assert service.stats()["pending"] == 3
+    asyncio.run(service.drain())
+    assert service.stats()["pending"] == 0
+    assert service.stats()["evaluated"] == 5
+
+
+def test_cached_recommendations_skip_the_llm():
+    gateway = FakeGateway()
+    service = RecommenderService(gateway=gateway, min_attempts=1)
+    service.ingest(quiz("s1", False))
+    asyncio.run(service.drain())
+    service.ingest(quiz("s2", False))
+    service.ingest(quiz("s1", False))
+    asyncio.run(service.drain())
+    assert len(gateway.calls) == 1
+    assert service.learning_modes("s2")["Fractions"]["recommended_mode"] == "Storytelling"
+
+
+def test_recommendation_survives_further_events_in_the_old_mode():
+    service = RecommenderService(gateway=FakeGateway(), min_attempts=2)
+    service.ingest_many([quiz("s1", False), quiz("s1", False)])
+    asyncio.run(service.drain())
+    service.ingest(quiz("s1", True))
+    state = service.learning_modes("s1")["Fractions"]
+    assert state["mode"] == "Gamified Learning"
+    assert state["recommended_mode"] == "Storytelling"
+    assert state["attempts"] == 3
+    assert state["evaluations"] == 1
+    assert state["pending"] is False
+
+
+def test_failed_evaluation_leaves_no_recommendation():
+    service = RecommenderService(gateway=FakeGateway(fail=True), min_attempts=1)
+    service.ingest(quiz("s1", False))
+    asyncio.run(service.drain())
+    state = service.learning_modes("s1")["Fractions"]
+    assert state["recommended_mode"] is None
+    assert state["pending"] is False
+    assert service.learning_modes("unknown") is None
+
+
+@pytest.mark.parametrize("line", ["", "not json", '{"topic": "Fractions"}'])
+def test_ingest_jsonl_skips_bad_lines(line):
+    service = RecommenderService(gateway=FakeGateway())
+    lines = [line, '{"student_id": 1, "topic": "Fractions", "learning_mode_used": "Storytelling", "quiz_results": true}']
+    assert service.ingest_jsonl(lines) == (1, 0)
@@ -0,0 +1,56 @@
+import asyncio
+
+from AI_models import result_cache
+from AI_models.result_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def test_lru_eviction_keeps_recently_used_entries():
+    cache = TTLCache(max_size=2, ttl=60.0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(result_cache.time, "time", clock.time)
+    cache = TTLCache(max_size=10, ttl=5.0)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=20.0)
+    clock.now += 10.0
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert len(cache) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_sqlite_store_survives_restart_and_drops_expired(tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(result_cache.time, "time", clock.time)
+    path = str(tmp_path / "cache.db")
+    cache = TTLCache(max_size=1, ttl=5.0, path=path)
+    asyncio.run(cache.aset("a", {"career": "Doctor"}))
+    asyncio.run(cache.aset("b", "Astronaut", ttl=60.0))
+    # "a" was evicted from memory but is still on disk
+    assert asyncio.run(cache.aget("a")) == {"career": "Doctor"}
+    cache.close()
+
+    clock.now += 10.0
+    reopened = TTLCache(max_size=10, ttl=5.0, path=path)
+    assert reopened.get("a") is None
+    assert reopened.get("b") == "Astronaut"
+    reopened.close()
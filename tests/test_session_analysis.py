@@ -0,0 +1,116 @@
+from collections import Counter
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from AI_models import session_analysis  # noqa: E402
+from AI_models.emotion_classifier import EMOTION_LABELS, EmotionClassifier  # noqa: E402
+from AI_models.session_analysis import build_rows, output_stems, summarize_rows  # noqa: E402
+
+
+def test_build_rows_sorts_seconds_and_picks_dominant_emotion():
+    timeline = {
+        1: (2, 0, Counter(), Counter()),
+        0: (2, 3, Counter(happy=2, angry=1), Counter(happy=150.0, angry=40.0)),
+    }
+    rows = build_rows(timeline)
+    assert [row["second"] for row in rows] == [0, 1]
+    assert rows[0] == {"second": 0, "frames": 2, "faces": 3, "dominant": "happy", "confidence": 75.0,
+                       "happy": 2, "angry": 1, "neutral": 0}
+    assert rows[1]["dominant"] is None and rows[1]["confidence"] is None
+
+
+def test_summarize_rows_reports_distribution_and_dominant_seconds():
+    rows = build_rows({
+        0: (2, 2, Counter(happy=2), Counter(happy=180.0)),
+        1: (2, 0, Counter(), Counter()),
+        2: (2, 2, Counter(happy=1, neutral=1), Counter(happy=60.0, neutral=70.0)),
+    })
+    summary = summarize_rows(rows, duration=3.0)
+    assert summary["frames_sampled"] == 6
+    assert summary["faces"] == 4
+    assert summary["seconds_with_faces"] == 2
+    assert summary["dominant"] == "happy"
+    assert summary["distribution"] == {"happy": 75.0, "angry": 0.0, "neutral": 25.0}
+    assert summary["dominant_seconds"] == {"happy": 2}
+
+
+def test_summarize_rows_without_faces():
+    summary = summarize_rows([], duration=0)
+    assert summary["dominant"] is None
+    assert summary["distribution"]["happy"] == 0.0
+
+
+def test_output_stems_are_unique_per_video():
+    stems = output_stems(["a/session.mp4", "b/session.mp4", "c/other.mp4"])
+    assert stems["c/other.mp4"] == "other"
+    assert stems["a/session.mp4"] != stems["b/session.mp4"]
+    assert all(stems[path].startswith("session-") for path in ("a/session.mp4", "b/session.mp4"))
+    # The same inputs always map to the same names
+    assert output_stems(["b/session.mp4", "a/session.mp4"]) == {path: stems[path] for path in stems if "session" in path}
+
+
+class NeutralModel:
+    def predict(self, batch, verbose=0):
+        probabilities = np.zeros((len(batch), len(EMOTION_LABELS)), dtype=np.float32)
+        probabilities[:, EMOTION_LABELS.index("neutral")] = 1.0
+        return probabilities
+
+
+class BlockDetector:
+    """Stand-in for the Haar cascade: reports the bounds of the bright block"""
+
+    widths = []
+
+    def __init__(self, detect_width=None):
+        self.widths.append(detect_width)
+
+    def detect(self, gray_frame, regions=None):
+        ys, xs = (gray_frame > 128).nonzero()
+        if not len(xs):
+            return []
+        return [(int(xs.min()), int(ys.min()), int(xs.max() - xs.min() + 1), int(ys.max() - ys.min() + 1))]
+
+
+@pytest.fixture
+def clip(tmp_path):
+    """Three seconds at 10 fps with a bright block in seconds 0 and 2 only"""
+    path = tmp_path / "session.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10, (160, 120))
+    for index in range(30):
+        frame = np.zeros((120, 160, 3), dtype=np.uint8)
+        if index // 10 != 1:
+            frame[30:90, 50:110] = 255
+        writer.write(frame)
+    writer.release()
+    return str(path)
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    monkeypatch.setattr(session_analysis, "FaceDetector", BlockDetector)
+    monkeypatch.setattr(session_analysis, "_worker", {
+        "classifier": EmotionClassifier(model=NeutralModel()),
+        "sample_fps": 2.0,
+        "detect_every": 1,
+        "detect_width": 320,
+        "batch_frames": 4,
+    })
+    BlockDetector.widths = []
+
+
+def test_analyze_chunk_samples_frames_and_counts_faces(clip, worker):
+    assert session_analysis.plan_chunks(clip, chunk_seconds=1.0)[1] == (clip, 10, 20, 10.0)
+    partial = session_analysis.analyze_chunk((clip, 0, 30, 10.0))
+    # Two sampled frames per second, one face on each frame with the block
+    assert {second: bucket[:2] for second, bucket in partial.items()} == {0: (2, 2), 1: (2, 0), 2: (2, 2)}
+    assert partial[2][2] == Counter(neutral=2)
+    assert partial[2][3]["neutral"] == pytest.approx(200.0)
+    assert BlockDetector.widths == [320]
+
+
+def test_analyze_chunk_starts_at_its_first_frame(clip, worker):
+    partial = session_analysis.analyze_chunk((clip, 20, 30, 10.0))
+    assert {second: bucket[:2] for second, bucket in partial.items()} == {2: (2, 2)}
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from AI_models.singleflight import SingleFlight
+
+
+def test_concurrent_calls_with_one_key_share_a_single_execution():
+    flight = SingleFlight()
+    runs = []
+
+    async def work(value):
+        runs.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def scenario():
+        return await asyncio.gather(
+            flight.do("a", lambda: work(1)),
+            flight.do("a", lambda: work(1)),
+            flight.do("a", lambda: work(1)),
+            flight.do("b", lambda: work(5)),
+        )
+
+    assert asyncio.run(scenario()) == [2, 2, 2, 10]
+    assert runs == [1, 5]
+    assert (flight.started, flight.coalesced) == (2, 2)
+    assert len(flight) == 0
+
+
+def test_sequential_calls_run_again():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        return len(runs)
+
+    async def scenario():
+        return [await flight.do("a", work), await flight.do("a", work)]
+
+    assert asyncio.run(scenario()) == [1, 2]
+
+
+def test_exception_is_shared_by_every_waiter():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def scenario():
+        return await asyncio.gather(flight.do("a", fail), flight.do("a", fail), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert [type(r) for r in results] == [ValueError, ValueError]
+    assert flight.started == 1
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do("a", work))
+        second = asyncio.ensure_future(flight.do("a", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
@@ -0,0 +1,63 @@
+import sqlite3
+import threading
+
+import pytest
+
+from AI_models.storage import HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"), batch_size=10, flush_interval=0.05)
+    yield store
+    store.close()
+
+
+def test_emotions_are_batched_and_rolled_up(store):
+    store.record_emotions("alice", ["happy", "happy", "angry"], [90.0, 70.0, 60.0], timestamp=120.0)
+    store.record_emotions("alice", ["happy"], [50.0], timestamp=130.0)
+    store.record_emotions("bob", ["neutral"], timestamp=125.0)
+    store.flush()
+
+    samples = store.emotion_samples("alice", 0, 200)
+    assert [s["emotion"] for s in samples] == ["happy", "happy", "angry", "happy"]
+    (minute,) = store.emotion_minutes("alice", 0, 200)
+    assert minute["ts"] == 120
+    assert minute["counts"] == {"happy": 3, "angry": 1}
+    assert minute["confidence"]["happy"] == pytest.approx(70.0)
+    assert minute["dominant"] == "happy"
+    assert store.stats()["written"] == 5
+
+
+def test_assessments_newest_first(store):
+    store.record_assessment("alice", {"patience": 3}, "Doctor", timestamp=10.0)
+    store.record_assessment("alice", {"patience": 9}, "Astronaut", timestamp=20.0)
+    store.flush()
+    assert [a["recommendation"] for a in store.assessments("alice", 0, 100)] == ["Astronaut", "Doctor"]
+
+
+def test_close_closes_reader_connections_of_every_thread(store):
+    connections = []
+
+    def read():
+        store.emotion_samples("alice", 0, 1)
+        connections.append(store._reader())
+
+    threads = [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    read()
+
+    store.close()
+    assert len(connections) == 4
+    for db in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            db.execute("SELECT 1")
+
+
+def test_records_after_close_are_ignored(store):
+    store.close()
+    store.record_emotions("alice", ["happy"])
+    assert store.stats()["pending"] == 0
@@ -0,0 +1,183 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from AI_models.video_stream import (  # noqa: E402
+    MAX_PROFILES,
+    EncodingProfile,
+    VideoBroadcaster,
+    negotiate_profile,
+)
+
+
+def test_negotiate_profile_rounds_and_clamps():
+    assert negotiate_profile(330, 72) == EncodingProfile(320, 70)
+    assert negotiate_profile(20, 5) == EncodingProfile(160, 30)
+    assert negotiate_profile(None, 200) == EncodingProfile(0, 95)
+
+
+def test_widths_at_or_above_the_frame_map_to_native():
+    assert negotiate_profile(640, 70, frame_width=640) == EncodingProfile(0, 70)
+    assert negotiate_profile(100000, 70, frame_width=640) == EncodingProfile(0, 70)
+    assert negotiate_profile(639, 70, frame_width=640) == EncodingProfile(624, 70)
+
+
+def test_negotiate_profile_rejects_non_numbers():
+    with pytest.raises(ValueError):
+        negotiate_profile("wide", 70)
+
+
+def test_encode_shares_native_encoding_for_oversized_widths():
+    broadcaster = VideoBroadcaster()
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    for width in range(64, 4096, 16):
+        broadcaster.encode(1, frame, EncodingProfile(width, 70))
+    assert broadcaster.encodes == 1
+
+
+def test_encode_caps_the_number_of_cached_profiles():
+    broadcaster = VideoBroadcaster()
+    frame = np.zeros((48, 480, 3), dtype=np.uint8)
+    widths = range(160, 480, 16)
+    for seq in (1, 2):
+        for width in widths:
+            assert broadcaster.encode(seq, frame, EncodingProfile(width, 70))
+        assert len(broadcaster._encoded) <= MAX_PROFILES
+        assert len(broadcaster._encode_locks) <= MAX_PROFILES
+    # Profiles still cached for the current frame are not encoded again
+    cached = dict(broadcaster._encoded)
+    encodes = broadcaster.encodes
+    for profile in cached:
+        broadcaster.encode(2, frame, profile)
+    assert broadcaster.encodes == encodes
+
+
+FRAMES = 10
+
+
+@pytest.fixture
+def video_file(tmp_path):
+    """Short MJPEG clip whose frames have distinct brightness"""
+    path = tmp_path / "clip.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 100, (64, 48))
+    for i in range(FRAMES):
+        writer.write(np.full((48, 64, 3), i * 20, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+class CountingProcessor:
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, frame):
+        with self.lock:
+            self.calls += 1
+        return frame
+
+
+def wait_stopped(broadcaster, timeout=5.0):
+    broadcaster._thread.join(timeout)
+    return not broadcaster.running
+
+
+def test_producer_runs_from_first_to_last_subscriber(video_file):
+    broadcaster = VideoBroadcaster(video_file, loop=True)
+    assert not broadcaster.running
+    first = broadcaster.subscribe()
+    second = broadcaster.subscribe()
+    assert broadcaster.running
+    assert broadcaster.subscriber_count == 2
+
+    first.close()
+    first.close()
+    assert broadcaster.subscriber_count == 1
+    assert broadcaster.running
+
+    second.close()
+    assert broadcaster.subscriber_count == 0
+    assert wait_stopped(broadcaster)
+
+    # A new subscriber starts a fresh producer
+    with broadcaster.subscribe():
+        assert broadcaster.running
+    assert wait_stopped(broadcaster)
+
+
+def test_each_frame_is_processed_once_for_all_subscribers(video_file):
+    processor = CountingProcessor()
+    broadcaster = VideoBroadcaster(video_file, process_frame=processor)
+    subscriptions = [broadcaster.subscribe() for _ in range(4)]
+
+    async def consume(subscription):
+        return [frame async for frame in subscription.aframes()]
+
+    async def consume_all():
+        return await asyncio.gather(*(consume(s) for s in subscriptions))
+
+    received = asyncio.run(consume_all())
+    assert processor.calls == FRAMES
+    assert all(0 < len(frames) <= FRAMES for frames in received)
+    assert broadcaster.subscriber_count == 0
+
+
+def test_slow_subscriber_skips_to_the_newest_frame(video_file):
+    broadcaster = VideoBroadcaster(video_file)
+    subscription = broadcaster.subscribe()
+    # Fall behind until the whole clip has been produced
+    assert wait_stopped(broadcaster)
+
+    async def read_two():
+        return await subscription.next_frame_async(timeout=1.0), await subscription.next_frame_async(timeout=1.0)
+
+    newest, after = asyncio.run(read_two())
+    subscription.close()
+    assert newest is not None
+    assert subscription.last_seq == FRAMES
+    assert after is None
+    brightness = cv2.imdecode(np.frombuffer(newest, dtype=np.uint8), cv2.IMREAD_GRAYSCALE).mean()
+    assert brightness == pytest.approx((FRAMES - 1) * 20, abs=3)
+
+
+def test_each_profile_is_encoded_once_per_frame():
+    broadcaster = VideoBroadcaster()
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    profiles = [EncodingProfile(0, 70), EncodingProfile(32, 50)]
+    for seq in (1, 2):
+        calls = [profile for profile in profiles for _ in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda profile: broadcaster.encode(seq, frame, profile), calls))
+        assert all(results)
+        # Every caller of the same frame and profile shares the same bytes
+        assert len({id(data) for data in results[:8]}) == 1
+        assert len({id(data) for data in results[8:]}) == 1
+    assert broadcaster.encodes == 4
+
+
+def test_subscribers_on_one_profile_share_encodings(video_file):
+    broadcaster = VideoBroadcaster(video_file)
+    subscriptions = [broadcaster.subscribe() for _ in range(4)]
+    profile = EncodingProfile(32, 50)
+
+    async def consume(subscription):
+        return [frame async for frame in subscription.aframes(profile)]
+
+    async def consume_all():
+        return await asyncio.gather(*(consume(s) for s in subscriptions))
+
+    received = asyncio.run(consume_all())
+    assert broadcaster.encodes <= FRAMES
+    assert sum(len(frames) for frames in received) >= broadcaster.encodes
+
+
+def test_missing_source_reports_an_error(tmp_path):
+    broadcaster = VideoBroadcaster(str(tmp_path / "missing.avi"))
+    with broadcaster.subscribe():
+        assert wait_stopped(broadcaster)
+    assert "Could not open video source" in broadcaster.error
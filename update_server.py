@@ -1,21 +1,37 @@
-import base64
-import requests
-import io
 from dotenv import load_dotenv
 import os
 import logging
 import json
-import pandas as pd
-from fastapi import FastAPI, HTTPException, Depends, Request
-from fastapi.responses import StreamingResponse
+import math
+from fastapi import FastAPI, HTTPException, Depends, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.websockets import WebSocketState
 from pydantic import BaseModel, Field
-from typing import List, Dict, Union, Any
+from typing import List, Dict, Optional, Union, Any
 import cv2
 import numpy as np
-from deepface import DeepFace
 from collections import Counter
 import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from AI_models import career_path, summary
+from AI_models.recommender import RecommenderService
+from AI_models.llm_client import LLMError, get_llm_client
+from AI_models.llm_gateway import LLMGateway
+from AI_models.career_scoring import score_assessments
+from AI_models.rate_limit import run_bounded
+from AI_models.result_cache import TTLCache
+from AI_models.video_stream import VideoBroadcaster, negotiate_profile
+from AI_models.emotion_classifier import EmotionClassifier
+from AI_models.face_detection import FaceDetector, FaceTracker
+from AI_models.emotion_pipeline import EmotionPipeline, FaceEmotionCache, draw_results
+from AI_models.inference_pool import InferencePool, PooledEmotionClassifier
+from AI_models.emotion_aggregator import EmotionWindow, SessionRegistry
+from AI_models.storage import HistoryStore
+from AI_models import metrics
+from AI_models.metrics import VIDEO_STAGE_SECONDS
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -23,17 +39,62 @@ logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
 if not GROQ_API_KEY:
     logger.error("GROQ API KEY is not set in the .env file")
 
+# Shared async LLM client with a keep-alive connection pool
+llm_client = get_llm_client()
+llm_gateway = LLMGateway(llm_client)
+
+# Model warm-up state reported by /ready
+WARMUP_BATCH_SIZE = int(os.getenv("WARMUP_BATCH_SIZE", "4"))
+warmup_state = {"ready": False, "timings": {}, "error": None}
+
+def warm_up_models():
+    """Load the face cascade and emotion model and push a dummy batch through it"""
+    started = time.perf_counter()
+    get_camera_pipeline()
+    warmup_state["timings"]["face_cascade"] = time.perf_counter() - started
+    warmup_state["timings"].update(emotion_classifier.warm_up(WARMUP_BATCH_SIZE))
+    warmup_state["timings"]["total"] = time.perf_counter() - started
+
+async def run_warm_up():
+    try:
+        await asyncio.to_thread(warm_up_models)
+        warmup_state["ready"] = True
+        logger.info(f"Models warmed up: {warmup_state['timings']}")
+    except Exception as e:
+        warmup_state["error"] = str(e)
+        logger.error(f"Model warm-up failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global emotion_classifier, history_store
+    emotion_classifier = create_emotion_classifier()
+    if HISTORY_DB_PATH:
+        history_store = HistoryStore(HISTORY_DB_PATH, batch_size=HISTORY_BATCH_SIZE)
+    # Warm up in the background so the process accepts /ready probes meanwhile
+    warmup_task = asyncio.create_task(run_warm_up())
+    recommender_task = asyncio.create_task(recommender_service.run())
+    yield
+    warmup_task.cancel()
+    recommender_task.cancel()
+    video_broadcaster.stop()
+    if EMOTION_WORKERS > 0:
+        emotion_classifier.pool.close()
+    await llm_client.aclose()
+    assessment_cache.close()
+    if history_store is not None:
+        history_store.close()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Career Assessment API",
     description="API for analyzing student career assessments using Groq AI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware to allow cross-origin requests from your React app
@@ -62,196 +123,749 @@ class CareerAssessment(BaseModel):
     responses: AssessmentResponses
     additional_info: AdditionalInfo
 
+class BatchCareerAssessment(CareerAssessment):
+    student_id: Optional[str] = None
+
 class CareerRecommendation(BaseModel):
     recommendation: str
 
+class BatchCareerRecommendation(BaseModel):
+    index: int
+    recommendation: Optional[str] = None
+    error: Optional[str] = None
+
+class ProfileSummaryRequest(BaseModel):
+    student_name: str
+    age: int
+    current_theme: str
+    total_questions_solved: int
+    total_modules_completed: int
+    current_topic: str
+    learning_mode_used: str
+    quiz_results: bool
+    average_accuracy: float
+    favorite_subject: str
+    time_spent_learning: str
+    strengths: List[str]
+    areas_for_improvement: List[str]
+
+class QuizEvent(BaseModel):
+    student_id: str
+    topic: str
+    learning_mode_used: str
+    quiz_results: bool
+    timestamp: Optional[float] = None
+
 class EmotionResult(BaseModel):
     emotion: str
     confidence: float
     total_detections: int
+    distribution: Dict[str, float] = {}
+
+# Emotion detection state: one time-windowed ring buffer per session
+EMOTION_DETECTION_DURATION = float(os.getenv("EMOTION_DETECTION_DURATION", "10"))  # seconds
+EMOTION_BUFFER_SIZE = int(os.getenv("EMOTION_BUFFER_SIZE", "600"))
+DEFAULT_SESSION = "default"
+emotion_sessions = SessionRegistry(EMOTION_BUFFER_SIZE, EMOTION_DETECTION_DURATION)
+# Aggregates everything the shared camera sees, used for the frame overlay
+stream_emotions = EmotionWindow(EMOTION_BUFFER_SIZE, EMOTION_DETECTION_DURATION)
+# Sessions currently watching the shared stream, with their subscription count
+stream_watchers = Counter()
+stream_watchers_lock = threading.Lock()
+
+# Durable emotion and assessment history; an empty HISTORY_DB_PATH disables it.
+# The store is opened by the lifespan hook, next to this file by default
+HISTORY_DB_PATH = os.getenv(
+    "HISTORY_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "bloom_history.db"))
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "500"))
+history_store = None
 
-# Global variables for emotion detection
-detected_emotions = []
-emotion_start_time = None
-EMOTION_DETECTION_DURATION = 10  # seconds
+def record_session_emotions(session_id, emotions, confidences=None, now=None):
+    """Record emotions in a session's live window and queue them for the history store"""
+    now = time.time() if now is None else now
+    emotion_sessions.get(session_id).record(emotions, now)
+    if history_store is not None:
+        history_store.record_emotions(session_id, emotions, confidences, now)
 
-def analyze_career_path(assessment: CareerAssessment):
+def record_stream_emotions(emotions, confidences=None):
+    """Record emotions seen by the shared camera for every watching session"""
+    now = time.time()
+    stream_emotions.record(emotions, now)
+    with stream_watchers_lock:
+        watchers = list(stream_watchers)
+    for session_id in watchers:
+        record_session_emotions(session_id, emotions, confidences, now)
+
+async def analyze_career_path(assessment: CareerAssessment):
     """Call Groq API to analyze career path based on assessment data"""
-    if not GROQ_API_KEY:
+    if not llm_client.api_key:
         raise HTTPException(status_code=500, detail="API key not configured")
 
-    student_responses = assessment.responses.dict()
-    additional_info = assessment.additional_info.dict()
-    
-    query = (
-        f"Analyze the career assessment responses for the student with ASD. "
-        f"Based on their responses (scale 1-10):\n"
-        f"Space Exploration: {student_responses['space_exploration']}\n"
-        f"Scientific Experiments: {student_responses['scientific_experiments']}\n"
-        f"Helping Others: {student_responses['helping_others']}\n"
-        f"Patience: {student_responses['patience']}\n"
-        f"Creativity: {student_responses['creativity']}\n"
-        f"Empathy: {student_responses['empathy']}\n"
-        f"Additional Information:\n"
-        f"Favorite Subjects: {', '.join(additional_info['favorite_subjects'])}\n"
-        f"Hobbies: {', '.join(additional_info['hobbies'])}\n"
-        f"Recommend a Career Path out of the following options:(Astronaut/Scientist/Doctor) based on their responses and ASD considerations\n"
-        f"ONLY respond with the recommended career path and only one. Do not add any explanation."
-    )
-    
-    messages = [
-        {
-            "role": "user",
-            "content": [
-                {"type": "text", "text": query}
-            ]
-        }
+    try:
+        return await career_path.analyze_career_path(assessment, gateway=llm_gateway)
+    except LLMError as e:
+        raise HTTPException(status_code=e.status_code or 500, detail=str(e))
+
+def sse_event(data, event=None):
+    """Format one Server-Sent Event with a JSON payload"""
+    message = f"data: {json.dumps(data)}\n\n"
+    return f"event: {event}\n{message}" if event else message
+
+# Cache of career recommendations keyed on the normalized assessment
+ASSESS_CACHE_SIZE = int(os.getenv("ASSESS_CACHE_SIZE", "1024"))
+ASSESS_CACHE_TTL = float(os.getenv("ASSESS_CACHE_TTL", "86400"))  # seconds
+ASSESS_CACHE_PATH = os.getenv("ASSESS_CACHE_PATH") or None
+ASSESS_SCORE_STEP = float(os.getenv("ASSESS_SCORE_STEP", "0.5"))
+assessment_cache = TTLCache(ASSESS_CACHE_SIZE, ASSESS_CACHE_TTL, ASSESS_CACHE_PATH)
+
+def assessment_cache_key(assessment: CareerAssessment):
+    """
+    Canonical cache key: model and prompt version, quantized scores, and
+    sorted, case-folded subjects and hobbies
+
+    Switching the model or bumping career_path.PROMPT_VERSION invalidates
+    recommendations cached (possibly on disk) by earlier prompts.
+    """
+    responses = assessment.responses.dict()
+    scores = [
+        round(responses[field] / ASSESS_SCORE_STEP) * ASSESS_SCORE_STEP
+        for field in sorted(responses)
     ]
 
-    try:
-        # API Request
-        response = requests.post(
-            GROQ_API_URL,
-            json={"model": "llama-3.2-90b-vision-preview", "messages": messages, "max_tokens": 4000},
-            headers={"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"},
-            timeout=30
-        )
+    def normalize(items):
+        return sorted({" ".join(item.split()).casefold() for item in items if item.strip()})
+
+    return json.dumps([
+        career_path.CAREER_TASK.model,
+        career_path.PROMPT_VERSION,
+        scores,
+        normalize(assessment.additional_info.favorite_subjects),
+        normalize(assessment.additional_info.hobbies),
+    ], separators=(",", ":"))
+
+async def cached_career_path(assessment: CareerAssessment):
+    """Return a cached recommendation for equivalent assessments, asking Groq on a miss"""
+    key = assessment_cache_key(assessment)
+    recommendation = await assessment_cache.aget(key)
+    if recommendation is None:
+        recommendation = await analyze_career_path(assessment)
+        await assessment_cache.aset(key, recommendation)
+    return recommendation
 
-        if response.status_code == 200:
-            result = response.json()
-            recommendation = result["choices"][0]["message"]["content"].strip()
-            return recommendation
+# Local scoring fast path: the LLM only sees assessments it cannot separate
+CAREER_SCORING_MODE = os.getenv("CAREER_SCORING_MODE", "hybrid")  # hybrid, local or llm
+CAREER_LLM_MARGIN = float(os.getenv("CAREER_LLM_MARGIN", "0.15"))
+
+def score_locally(assessments: List[CareerAssessment]):
+    """Return ``{index: career}`` for confident local decisions and the indices left for the LLM"""
+    if CAREER_SCORING_MODE == "llm":
+        return {}, list(range(len(assessments)))
+    scores = score_assessments(assessments)
+    decided, pending = {}, []
+    for i, (choice, margin) in enumerate(zip(scores.choices, scores.margins)):
+        if CAREER_SCORING_MODE == "local" or margin >= CAREER_LLM_MARGIN:
+            decided[i] = choice
         else:
-            logger.error(f"API Error: {response.status_code} - {response.text}")
-            raise HTTPException(status_code=response.status_code, detail=f"Groq API error: {response.text}")
+            pending.append(i)
+    return decided, pending
 
-    except requests.RequestException as e:
-        logger.error(f"Request error: {e}")
-        raise HTTPException(status_code=500, detail=f"Error communicating with Groq API: {str(e)}")
+async def recommend_career(assessment: CareerAssessment):
+    """Recommend a career locally when the decision is clear, otherwise ask the LLM"""
+    decided, _ = score_locally([assessment])
+    if 0 in decided:
+        return decided[0]
+    return await cached_career_path(assessment)
 
-def generate_frames():
-    """Generate video frames with emotion detection"""
-    global detected_emotions, emotion_start_time
-    
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-    cap = cv2.VideoCapture(0)
-    
-    if not cap.isOpened():
-        raise HTTPException(status_code=500, detail="Could not open camera")
-    
+# Shared capture/inference worker: one producer for any number of viewers
+VIDEO_SOURCE = os.getenv("VIDEO_SOURCE", "0")
+VIDEO_LOOP = os.getenv("VIDEO_LOOP", "false").lower() in ("1", "true", "yes")
+FACE_DETECT_EVERY = int(os.getenv("FACE_DETECT_EVERY", "5"))
+FACE_REDETECT_THRESHOLD = float(os.getenv("FACE_REDETECT_THRESHOLD", "0.5"))
+# Faces are detected on frames downscaled to at most FACE_DETECT_WIDTH pixels;
+# small browser frames from /ws/ingest are analyzed at their own size
+FACE_DETECT_WIDTH = int(os.getenv("FACE_DETECT_WIDTH", "320"))
+FACE_ROI_MARGIN = float(os.getenv("FACE_ROI_MARGIN", "0.5"))
+FACE_FULL_SCAN_EVERY = int(os.getenv("FACE_FULL_SCAN_EVERY", "3"))
+EMOTION_WORKERS = int(os.getenv("EMOTION_WORKERS", "0"))
+EMOTION_JOB_TIMEOUT = float(os.getenv("EMOTION_JOB_TIMEOUT", "30"))
+# Reuse a face's emotion while its crop changes by less than EMOTION_CACHE_THRESHOLD
+# grey levels (mean absolute difference); EMOTION_CACHE_MAX_AGE=0 disables it
+EMOTION_CACHE_THRESHOLD = float(os.getenv("EMOTION_CACHE_THRESHOLD", "6"))
+EMOTION_CACHE_MAX_AGE = float(os.getenv("EMOTION_CACHE_MAX_AGE", "1.0"))  # seconds
+camera_pipeline = None
+
+# Created by the lifespan hook rather than at import: spawned pool workers
+# re-import the main module and must not build pools of their own
+emotion_classifier = None
+
+def create_emotion_classifier():
+    """
+    Build the process-wide emotion classifier
+
+    With EMOTION_WORKERS > 0 inference runs in a pool of model-holding worker
+    processes (started during warm-up); otherwise it stays in-process. A
+    worker stuck on one batch for EMOTION_JOB_TIMEOUT seconds is restarted.
+    """
+    if EMOTION_WORKERS > 0:
+        return PooledEmotionClassifier(InferencePool(workers=EMOTION_WORKERS, job_timeout=EMOTION_JOB_TIMEOUT))
+    return EmotionClassifier()
+
+def new_emotion_pipeline(source=None):
+    """Build a detection/tracking + emotion pipeline for one video stream"""
+    tracker = FaceTracker(
+        FaceDetector(detect_width=FACE_DETECT_WIDTH, roi_margin=FACE_ROI_MARGIN),
+        detect_every=FACE_DETECT_EVERY,
+        redetect_threshold=FACE_REDETECT_THRESHOLD,
+        full_scan_every=FACE_FULL_SCAN_EVERY,
+    )
+    cache = None
+    if EMOTION_CACHE_MAX_AGE > 0:
+        cache = FaceEmotionCache(threshold=EMOTION_CACHE_THRESHOLD, max_age=EMOTION_CACHE_MAX_AGE)
+    return EmotionPipeline(emotion_classifier, tracker, cache=cache, source=source)
+
+def get_camera_pipeline():
+    """Build the shared camera's pipeline once per process"""
+    global camera_pipeline
+    if camera_pipeline is None:
+        camera_pipeline = new_emotion_pipeline(source="camera")
+    return camera_pipeline
+
+def annotate_frame(frame):
+    """Run face detection and emotion analysis on one frame and draw the results"""
+    started = time.perf_counter()
+    # Flip the frame horizontally
+    frame = cv2.flip(frame, 1)
+
+    # Convert frame to grayscale, the emotion model works on grayscale crops
+    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    VIDEO_STAGE_SECONDS.labels("flip_convert").observe(time.perf_counter() - started)
+
+    # Detect faces every FACE_DETECT_EVERY frames, track them in between, and
+    # classify every face in the frame with one batched forward pass
     try:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-                
-            # Flip the frame horizontally
-            frame = cv2.flip(frame, 1)
-            
-            # Convert frame to grayscale
-            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            rgb_frame = cv2.cvtColor(gray_frame, cv2.COLOR_GRAY2RGB)
-            
-            # Detect faces
-            faces = face_cascade.detectMultiScale(gray_frame, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
-            
-            if len(faces) > 0:
-                for (x, y, w, h) in faces:
-                    try:
-                        face_roi = rgb_frame[y:y + h, x:x + w]
-                        allowed_emotions = ['happy', 'angry', 'neutral']
-                        result = DeepFace.analyze(face_roi, actions=['emotion'], enforce_detection=False)
-                        emotion_predictions = result[0]['emotion']
-                        filtered_emotions = {k: v for k, v in emotion_predictions.items() if k in allowed_emotions}
-                        emotion = max(filtered_emotions, key=filtered_emotions.get)
-                        
-                        # Store detected emotion
-                        detected_emotions.append(emotion)
-                        
-                        # Draw rectangle and label
-                        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
-                        cv2.putText(frame, emotion, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
-                        
-                        # Display detection count
-                        cv2.putText(frame, f'Detections: {len(detected_emotions)}', 
-                                  (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                        
-                        # Display most common emotion
-                        if detected_emotions:
-                            emotion_counter = Counter(detected_emotions)
-                            most_common = emotion_counter.most_common(1)[0]
-                            cv2.putText(frame, f'Most common: {most_common[0]} ({most_common[1]})', 
-                                      (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                            
-                    except Exception as e:
-                        logger.error(f"Error in face analysis: {str(e)}")
-            else:
-                cv2.putText(frame, "No face detected", (10, 30), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-            
-            # Encode frame as JPEG
-            ret, buffer = cv2.imencode('.jpg', frame)
-            frame_bytes = buffer.tobytes()
-            
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            
-    finally:
-        cap.release()
+        results = get_camera_pipeline().analyze(gray_frame)
+    except Exception as e:
+        logger.error(f"Error in face analysis: {str(e)}")
+        return frame
+
+    started = time.perf_counter()
+    if results:
+        # Store detected emotions
+        record_stream_emotions([result.emotion for result in results],
+                               [result.confidence for result in results])
+
+        # Draw rectangles and labels
+        draw_results(frame, results)
+
+        # Display detection count and most common emotion over the window
+        most_common, count, total = stream_emotions.most_common()
+        cv2.putText(frame, f'Detections: {total}',
+                  (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        if most_common:
+            cv2.putText(frame, f'Most common: {most_common} ({count})',
+                      (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+    else:
+        cv2.putText(frame, "No face detected", (10, 30),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+    VIDEO_STAGE_SECONDS.labels("annotate").observe(time.perf_counter() - started)
+
+    return frame
+
+video_broadcaster = VideoBroadcaster(VIDEO_SOURCE, process_frame=annotate_frame, loop=VIDEO_LOOP)
+
+async def generate_frames(subscription, first_frame=None):
+    """Yield multipart JPEG chunks from the shared video broadcaster"""
+    if first_frame is not None:
+        yield (b'--frame\r\n'
+               b'Content-Type: image/jpeg\r\n\r\n' + first_frame + b'\r\n')
+    async for frame_bytes in subscription.aframes():
+        yield (b'--frame\r\n'
+               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+
+def watch_stream(session_id):
+    with stream_watchers_lock:
+        stream_watchers[session_id] += 1
+
+def unwatch_stream(session_id):
+    with stream_watchers_lock:
+        stream_watchers[session_id] -= 1
+        if stream_watchers[session_id] <= 0:
+            del stream_watchers[session_id]
 
 @app.get("/video_feed")
-async def video_feed():
+async def video_feed(session_id: str = DEFAULT_SESSION):
     """Stream video feed with emotion detection"""
+    subscription = video_broadcaster.subscribe()
+    first_frame = await subscription.next_frame_async(timeout=10.0)
+    if first_frame is None:
+        subscription.close()
+        detail = video_broadcaster.error or "Could not open camera"
+        raise HTTPException(status_code=500, detail=detail)
+
+    watch_stream(session_id)
+
+    async def stream():
+        try:
+            async for chunk in generate_frames(subscription, first_frame):
+                yield chunk
+        finally:
+            subscription.close()
+            unwatch_stream(session_id)
+
     return StreamingResponse(
-        generate_frames(),
+        stream(),
         media_type='multipart/x-mixed-replace; boundary=frame'
     )
 
+VIDEO_MAX_FPS = float(os.getenv("VIDEO_MAX_FPS", "30"))
+
+def negotiate_video_settings(settings):
+    """
+    Clamp requested width, JPEG quality and fps onto a shared encoding profile
+
+    Raises ValueError if the settings are not an object of finite numbers.
+    """
+    if not isinstance(settings, dict):
+        raise ValueError("Settings must be a JSON object")
+    for key in ("width", "quality", "fps"):
+        value = settings.get(key)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))
+                                  or not math.isfinite(value)):
+            raise ValueError(f"{key} must be a finite number")
+    profile = negotiate_profile(settings.get("width"), settings.get("quality"),
+                                frame_width=video_broadcaster.frame_width)
+    fps = float(settings.get("fps") or VIDEO_MAX_FPS)
+    return profile, min(max(fps, 1.0), VIDEO_MAX_FPS)
+
+@app.websocket("/ws/video")
+async def video_websocket(websocket: WebSocket, session_id: str = DEFAULT_SESSION,
+                          width: int = 0, quality: int = 70, fps: float = 15):
+    """
+    Stream annotated frames as binary JPEG WebSocket messages
+
+    The client picks width, JPEG quality and maximum fps through query
+    parameters and may renegotiate at any time by sending a JSON text
+    message with the same keys; invalid settings get an ``error`` reply and
+    leave the current ones in place. Every frame is encoded once per
+    distinct profile and shared by all subscribers on it; a slow client
+    skips straight to the newest frame.
+    """
+    await websocket.accept()
+    try:
+        profile, max_fps = negotiate_video_settings({"width": width, "quality": quality, "fps": fps})
+    except ValueError as e:
+        await websocket.close(code=1008, reason=f"Invalid video settings: {e}")
+        return
+    await websocket.send_json({"width": profile.width, "quality": profile.quality, "fps": max_fps})
+
+    subscription = video_broadcaster.subscribe()
+    watch_stream(session_id)
+
+    async def receive_settings():
+        nonlocal profile, max_fps
+        while True:
+            try:
+                message = await websocket.receive_json()
+                profile, max_fps = negotiate_video_settings(message)
+            except ValueError as e:
+                await websocket.send_json({"error": f"Invalid video settings: {e}"})
+                continue
+            await websocket.send_json({"width": profile.width, "quality": profile.quality, "fps": max_fps})
+
+    receiver = asyncio.create_task(receive_settings())
+    try:
+        next_due = 0.0
+        while not receiver.done():
+            # Respect the negotiated frame rate; frames produced meanwhile are skipped
+            wait = next_due - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            frame_bytes = await subscription.next_frame_async(timeout=5.0, profile=profile)
+            if frame_bytes is None:
+                if not video_broadcaster.running:
+                    break
+                continue
+            await websocket.send_bytes(frame_bytes)
+            next_due = time.monotonic() + 1.0 / max_fps
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        receiver.cancel()
+        subscription.close()
+        unwatch_stream(session_id)
+        if video_broadcaster.error and websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.close(code=1011, reason=video_broadcaster.error)
+
+INGEST_MAX_FPS = float(os.getenv("INGEST_MAX_FPS", "10"))
+INGEST_MAX_FRAME_BYTES = int(os.getenv("INGEST_MAX_FRAME_BYTES", str(256 * 1024)))
+
+def analyze_ingested_frame(pipeline, frame_bytes):
+    """Decode a browser JPEG straight to grayscale and run it through a session pipeline"""
+    with VIDEO_STAGE_SECONDS.labels("decode").time():
+        gray_frame = cv2.imdecode(np.frombuffer(frame_bytes, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if gray_frame is None:
+        return None
+    return pipeline.analyze(gray_frame)
+
+@app.websocket("/ws/ingest")
+async def ingest_websocket(websocket: WebSocket, session_id: str = DEFAULT_SESSION):
+    """
+    Run emotion tracking on frames captured by the browser
+
+    The client sends small downscaled JPEG frames as binary messages and
+    gets one JSON reply per frame with the detected faces and the session's
+    dominant emotion. Each connection has its own tracking state, and its
+    results are recorded under ``session_id``. Frames arriving faster than
+    INGEST_MAX_FPS are acknowledged as skipped without being analyzed.
+    """
+    await websocket.accept()
+    pipeline = new_emotion_pipeline()
+    min_interval = 1.0 / INGEST_MAX_FPS
+    last_analyzed = 0.0
+    frame_number = 0
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            frame_bytes = message.get("bytes")
+            if frame_bytes is None:
+                # Text messages carry no frame
+                continue
+            frame_number += 1
+            now = time.monotonic()
+            if len(frame_bytes) > INGEST_MAX_FRAME_BYTES:
+                await websocket.send_json({"frame": frame_number, "error": "Frame too large"})
+                continue
+            if now - last_analyzed < min_interval:
+                await websocket.send_json({"frame": frame_number, "skipped": True})
+                continue
+            last_analyzed = now
+
+            try:
+                results = await asyncio.to_thread(analyze_ingested_frame, pipeline, frame_bytes)
+            except Exception as e:
+                logger.error(f"Error in face analysis: {str(e)}")
+                await websocket.send_json({"frame": frame_number, "error": "Analysis failed"})
+                continue
+            if results is None:
+                await websocket.send_json({"frame": frame_number, "error": "Could not decode frame"})
+                continue
+
+            if results:
+                record_session_emotions(session_id, [result.emotion for result in results],
+                                        [result.confidence for result in results])
+            emotion, count, total = emotion_sessions.get(session_id).most_common()
+            await websocket.send_json({
+                "frame": frame_number,
+                "faces": [
+                    {"id": r.track_id, "box": list(r.box), "emotion": r.emotion, "confidence": r.confidence}
+                    for r in results
+                ],
+                "emotion": emotion or "neutral",
+                "confidence": (count / total) * 100 if total else 100.0,
+                "total_detections": total,
+            })
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+
 @app.get("/analyze_emotion", response_model=EmotionResult)
-async def analyze_emotion():
-    """Analyze emotions from the video feed and return the most common emotion"""
-    global detected_emotions, emotion_start_time
-    
-    if not detected_emotions:
+async def analyze_emotion(session_id: str = DEFAULT_SESSION):
+    """Return the most common emotion of a session over the last EMOTION_DETECTION_DURATION seconds"""
+    window = emotion_sessions.peek(session_id)
+    counts, total_detections = window.counts() if window is not None else ({}, 0)
+
+    if not total_detections:
         # Return a default emotion if nothing is detected yet
         return EmotionResult(
             emotion="neutral",
             confidence=100.0,
             total_detections=0
         )
-    
-    # Calculate the most common emotion
-    emotion_counter = Counter(detected_emotions)
-    most_common = emotion_counter.most_common(1)[0]
-    total_detections = len(detected_emotions)
-    
-    # Calculate confidence (percentage of most common emotion)
-    confidence = (most_common[1] / total_detections) * 100
-    
-    # Keep only the last 20 detections to avoid old data influencing results
-    if len(detected_emotions) > 20:
-        detected_emotions = detected_emotions[-20:]
-    
+
+    # Confidence is the percentage of the most common emotion
+    emotion = max(counts, key=counts.get)
+    distribution = {k: (v / total_detections) * 100 for k, v in counts.items()}
+
     return EmotionResult(
-        emotion=most_common[0],
-        confidence=confidence,
-        total_detections=total_detections
+        emotion=emotion,
+        confidence=distribution[emotion],
+        total_detections=total_detections,
+        distribution=distribution
+    )
+
+EMOTION_PUSH_DELTA = float(os.getenv("EMOTION_PUSH_DELTA", "10"))  # percentage points
+EMOTION_HEARTBEAT_SECONDS = float(os.getenv("EMOTION_HEARTBEAT_SECONDS", "15"))
+
+@app.get("/emotion_events")
+async def emotion_events(request: Request, session_id: str = DEFAULT_SESSION,
+                         last_event_id: Optional[int] = None):
+    """
+    Push emotion updates for a session as Server-Sent Events
+
+    An event is sent only when the dominant emotion changes or its
+    confidence moves by EMOTION_PUSH_DELTA percentage points. Comment lines
+    are sent as heartbeats every EMOTION_HEARTBEAT_SECONDS. A reconnecting
+    client resumes through the ``Last-Event-ID`` header (or the
+    ``last_event_id`` query parameter). If the missed events are no longer
+    buffered, or the id is unknown because the server restarted or the
+    session was evicted, it receives the current state and ids restart
+    from the feed's counter.
+    """
+    feed = emotion_sessions.feed(session_id, EMOTION_PUSH_DELTA)
+    header_id = request.headers.get("last-event-id")
+    if header_id and header_id.isdigit():
+        last_event_id = int(header_id)
+
+    def format_event(event_id, data):
+        return f"id: {event_id}\n" + sse_event(data)
+
+    async def events():
+        last_id = last_event_id
+        yield "retry: 3000\n\n"
+        backlog = feed.events_after(last_id) if last_id is not None else None
+        if backlog is None:
+            # Fresh connection or missed events were dropped: send current state
+            last_id = feed.last_id
+            yield format_event(last_id, feed.snapshot())
+        else:
+            for event_id, data in backlog:
+                last_id = event_id
+                yield format_event(event_id, data)
+
+        while not await request.is_disconnected():
+            if not await feed.wait(last_id, EMOTION_HEARTBEAT_SECONDS):
+                # Detections expiring from the window can change the state too
+                feed.observe()
+                yield ": heartbeat\n\n"
+                continue
+            backlog = feed.events_after(last_id)
+            if backlog is None:
+                last_id = feed.last_id
+                yield format_event(last_id, feed.snapshot())
+                continue
+            for event_id, data in backlog:
+                last_id = event_id
+                yield format_event(event_id, data)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 @app.post("/assess", response_model=CareerRecommendation)
-def assess_career(assessment: CareerAssessment):
+async def assess_career(assessment: CareerAssessment, student_id: Optional[str] = None):
     """
     Analyze career assessment data and provide a recommendation
     
-    Returns a recommended career path based on the student's responses
+    Returns a recommended career path based on the student's responses.
+    With ``student_id`` the assessment and its result are kept in the
+    history store.
     """
     try:
-        recommendation = analyze_career_path(assessment)
+        recommendation = await recommend_career(assessment)
+        if student_id and history_store is not None:
+            history_store.record_assessment(student_id, assessment.dict(), recommendation)
         return CareerRecommendation(recommendation=recommendation)
     except Exception as e:
         logger.error(f"Error processing assessment: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+ASSESS_BATCH_CONCURRENCY = int(os.getenv("ASSESS_BATCH_CONCURRENCY", "8"))
+ASSESS_BATCH_MAX_SIZE = int(os.getenv("ASSESS_BATCH_MAX_SIZE", "1000"))
+
+def batch_item_result(index, recommendation, error):
+    if error is not None:
+        detail = error.detail if isinstance(error, HTTPException) else str(error)
+        logger.error(f"Error processing assessment {index}: {detail}")
+        return BatchCareerRecommendation(index=index, error=str(detail))
+    return BatchCareerRecommendation(index=index, recommendation=recommendation)
+
+def record_batch_item(assessment, index, recommendation, error):
+    """Keep a successful batch result in the history store when the item names a student"""
+    if error is None and assessment.student_id and history_store is not None:
+        history_store.record_assessment(assessment.student_id, assessment.dict(exclude={"student_id"}), recommendation)
+    return index, recommendation, error
+
+@app.post("/assess/batch", response_model=List[BatchCareerRecommendation])
+async def assess_career_batch(assessments: List[BatchCareerAssessment], stream: bool = False):
+    """
+    Analyze a cohort of career assessments
+
+    Runs at most ASSESS_BATCH_CONCURRENCY assessments at once, paced by the
+    LLM client's rate limiter. Results come back in request order, or as
+    NDJSON lines in completion order when ``stream=true``. Items carrying a
+    ``student_id`` are kept in the history store like ``/assess`` does.
+    """
+    if len(assessments) > ASSESS_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {ASSESS_BATCH_MAX_SIZE} assessments per batch")
+
+    # Score the whole cohort in one array operation, then send only the
+    # ambiguous assessments to the LLM
+    decided, pending = score_locally(assessments)
+
+    async def results():
+        for index, recommendation in decided.items():
+            yield record_batch_item(assessments[index], index, recommendation, None)
+        pending_assessments = [assessments[i] for i in pending]
+        async for i, recommendation, error in run_bounded(
+            cached_career_path, pending_assessments, ASSESS_BATCH_CONCURRENCY
+        ):
+            yield record_batch_item(pending_assessments[i], pending[i], recommendation, error)
+
+    if stream:
+        async def ndjson():
+            async for index, recommendation, error in results():
+                yield batch_item_result(index, recommendation, error).json() + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    ordered = [None] * len(assessments)
+    async for index, recommendation, error in results():
+        ordered[index] = batch_item_result(index, recommendation, error)
+    return ordered
+
+# Learning-mode recommendations re-evaluated from the quiz event stream
+recommender_service = RecommenderService(
+    llm_gateway,
+    min_attempts=int(os.getenv("RECOMMENDER_MIN_ATTEMPTS", "3")),
+    pass_threshold=float(os.getenv("RECOMMENDER_PASS_THRESHOLD", "0.5")),
+    batch_size=int(os.getenv("RECOMMENDER_BATCH_SIZE", "32")),
+    flush_interval=float(os.getenv("RECOMMENDER_FLUSH_INTERVAL", "2")),
+)
+
+@app.post("/quiz_events")
+async def quiz_events(events: List[QuizEvent]):
+    """
+    Ingest quiz outcomes from the games
+
+    Events only update in-memory per-student, per-topic state. Topics
+    whose recent pass rate drops below the threshold are queued and
+    re-evaluated in the background, so this returns without waiting for
+    the LLM.
+    """
+    accepted, queued = recommender_service.ingest_many(events)
+    return {"accepted": accepted, "queued": queued}
+
+@app.get("/learning_mode/{student_id}")
+async def learning_mode(student_id: str):
+    """Learning mode in use, latest recommended mode and quiz statistics of a student, per topic"""
+    topics = recommender_service.learning_modes(student_id)
+    if topics is None:
+        raise HTTPException(status_code=404, detail="No quiz events for this student")
+    return {"student_id": student_id, "topics": topics}
+
+@app.post("/profile_summary")
+async def profile_summary(profile: ProfileSummaryRequest):
+    """
+    Stream a parent-facing profile summary as Server-Sent Events
+
+    Each ``data`` event carries a ``{"token": ...}`` chunk as soon as Groq
+    produces it; the stream ends with a ``done`` event, or an ``error``
+    event if the completion fails midway.
+    """
+    if not llm_client.api_key:
+        raise HTTPException(status_code=500, detail="API key not configured")
+
+    async def events():
+        try:
+            async for token in summary.stream_profile_summary(profile, gateway=llm_gateway):
+                yield sse_event({"token": token})
+        except LLMError as e:
+            logger.error(f"Error streaming profile summary: {e}")
+            yield sse_event({"status_code": e.status_code, "detail": str(e)}, event="error")
+            return
+        yield sse_event({}, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/assess/cache_stats")
+def assess_cache_stats():
+    """Hit/miss counters of the assessment result cache"""
+    return assessment_cache.stats()
+
+HISTORY_DEFAULT_WINDOW = 24 * 3600  # seconds
+
+def history_range(start: Optional[float], end: Optional[float]):
+    end = time.time() if end is None else end
+    start = end - HISTORY_DEFAULT_WINDOW if start is None else start
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    return start, end
+
+def require_history_store():
+    if history_store is None:
+        raise HTTPException(status_code=503, detail="History storage is disabled")
+    return history_store
+
+@app.get("/history/{student_id}/emotions")
+async def emotion_history(student_id: str, start: Optional[float] = None, end: Optional[float] = None,
+                          resolution: str = "minute", limit: int = 10000):
+    """
+    Emotion history of a student between ``start`` and ``end`` (Unix seconds)
+
+    Defaults to the last 24 hours. ``resolution=minute`` reads the
+    pre-aggregated per-minute rollups, ``resolution=raw`` the individual
+    samples (at most ``limit``).
+    """
+    store = require_history_store()
+    start, end = history_range(start, end)
+    if resolution == "minute":
+        minutes = await asyncio.to_thread(store.emotion_minutes, student_id, start, end)
+        return {"student_id": student_id, "start": start, "end": end, "minutes": minutes}
+    if resolution == "raw":
+        samples = await asyncio.to_thread(store.emotion_samples, student_id, start, end, limit)
+        return {"student_id": student_id, "start": start, "end": end, "samples": samples}
+    raise HTTPException(status_code=400, detail="resolution must be 'minute' or 'raw'")
+
+@app.get("/history/{student_id}/assessments")
+async def assessment_history(student_id: str, start: Optional[float] = None, end: Optional[float] = None,
+                             limit: int = 100):
+    """Stored assessments of a student, newest first; defaults to the last 24 hours"""
+    store = require_history_store()
+    start, end = history_range(start, end)
+    assessments = await asyncio.to_thread(store.assessments, student_id, start, end, limit)
+    return {"student_id": student_id, "start": start, "end": end, "assessments": assessments}
+
+@app.get("/llm/usage")
+def llm_usage():
+    """Calls, failures, rejected answers and tokens per LLM task"""
+    return llm_gateway.usage()
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 503 until the face cascade and emotion model are warmed up"""
+    status_code = 200 if warmup_state["ready"] else 503
+    return JSONResponse(status_code=status_code, content=warmup_state)
+
+# Gauges computed only when /metrics is scraped
+metrics.Gauge("bloom_video_subscribers", "Clients subscribed to the shared video stream").set_function(
+    lambda: video_broadcaster.subscriber_count)
+metrics.Gauge("bloom_emotion_sessions", "Sessions with an emotion window").set_function(
+    lambda: len(emotion_sessions))
+metrics.Gauge("bloom_assess_cache_hit_rate", "Hit rate of the assessment result cache").set_function(
+    lambda: assessment_cache.stats()["hit_rate"])
+if EMOTION_WORKERS > 0:
+    metrics.Gauge("bloom_inference_in_flight", "Emotion jobs running on the inference pool").set_function(
+        lambda: emotion_classifier.pool.stats()["in_flight"])
+
+metrics.Gauge("bloom_camera_emotion_skip_rate", "Share of camera face crops that reused a cached emotion").set_function(
+    lambda: camera_pipeline.cache.skip_rate if camera_pipeline is not None and camera_pipeline.cache else 0.0)
+if HISTORY_DB_PATH:
+    metrics.Gauge("bloom_history_pending", "Records queued for the history store").set_function(
+        lambda: history_store.stats()["pending"])
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Pipeline stage timings, video rates and LLM call metrics in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/")
 def read_root():
     return {"message": "Emotion Tracking and Career Assessment API is running"}